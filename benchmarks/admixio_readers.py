@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the shared ADMIXTURE/CLUMPP readers.
+
+Writes a synthetic `.P` matrix and CLUMPP indfile, times the readers in
+bin/admixio.py against the parsers the scripts used before (np.loadtxt
+for `.P`/`.Q`, compare_admixture's whitespace DataFrame and
+plot_admixture's split on ':' for CLUMPP), and checks that every parser
+returns the same matrix.
+
+    python benchmarks/admixio_readers.py --loci 1000000 --k 5 --samples 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "bin"))
+from admixio import iter_blocks, read_clumpp, read_matrix  # noqa: E402
+
+
+def matrix_loadtxt(path):
+    """Previous .P/.Q reader (infocalc, panel_optimizer, project_q)."""
+    return np.loadtxt(path, ndmin=2)
+
+
+def clumpp_whitespace(path):
+    """Previous compare_admixture reader: whitespace DataFrame, ':' column."""
+    df = pd.read_csv(path, sep=r"\s+", comment="#", header=None)
+    q_start = df.columns[df.iloc[0] == ":"].tolist()[0] + 1
+    return df.iloc[:, q_start:].astype(float).values
+
+
+def clumpp_split(path):
+    """Previous plot_admixture reader: split on ':', then on whitespace."""
+    q_raw = pd.read_csv(path, sep=":", header=None)
+    return q_raw[1].str.strip().str.split(expand=True).astype(float).to_numpy()
+
+
+def blocks_sum(path):
+    """Stream a .P in row blocks (what infocalc does) and reduce each."""
+    return sum(float(block.sum()) for block in iter_blocks(path))
+
+
+def write_inputs(tmp, n_loci, k, n_samples, rng):
+    pfile = os.path.join(tmp, f"synthetic.{k}.P")
+    np.savetxt(pfile, rng.random((n_loci, k)), fmt="%.6f")
+    q = rng.dirichlet(np.ones(k), n_samples)
+    clumpp = os.path.join(tmp, "synthetic.clumpp")
+    with open(clumpp, "w") as fh:
+        for i, row in enumerate(q, 1):
+            fh.write(f"{i} {i} (0) 1 : " + " ".join(f"{x:.4f}" for x in row) + "\n")
+    return pfile, clumpp
+
+
+def bench(fn, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(path)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the .P/.Q and CLUMPP readers")
+    parser.add_argument("--loci", type=int, default=1_000_000, help="Rows of the .P")
+    parser.add_argument("--k", type=int, default=5, help="Columns (K)")
+    parser.add_argument("--samples", type=int, default=200_000, help="CLUMPP rows")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeats (best kept)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        pfile, clumpp = write_inputs(tmp, args.loci, args.k, args.samples, rng)
+        runs = [
+            (f".P {args.loci:,} × {args.k}", pfile, [
+                ("np.loadtxt", matrix_loadtxt),
+                ("admixio.read_matrix", read_matrix),
+            ]),
+            (f"CLUMPP {args.samples:,} × {args.k}", clumpp, [
+                ("whitespace DataFrame", clumpp_whitespace),
+                ("split on ':'", clumpp_split),
+                ("admixio.read_clumpp", read_clumpp),
+            ]),
+        ]
+        for title, path, readers in runs:
+            print(title)
+            ref = None
+            for name, fn in readers:
+                t, out = bench(fn, path, args.repeat)
+                if ref is None:
+                    ref = out
+                elif not np.array_equal(ref, out):
+                    sys.exit(f"❌ {name} disagrees with {readers[0][0]}")
+                print(f"  {name:22s}: {t:8.3f} s")
+        t, total = bench(blocks_sum, pfile, args.repeat)
+        if not np.isclose(total, read_matrix(pfile).sum()):
+            sys.exit("❌ iter_blocks disagrees with read_matrix")
+        print(f"  {'admixio.iter_blocks':22s}: {t:8.3f} s  (row blocks, .P)")
+    print("outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the GENERATE_CONSENSUS kernel.
+
+Times `compute_consensus` from bin/loci_to_consensus.py against the previous
+per-column np.unique implementation on a synthetic RAD catalog, and checks
+that both return the same consensus for every locus and that unaligned
+loci are rejected.
+
+    python benchmarks/consensus_kernel.py --loci 5000 --samples 48
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "bin"))
+from loci_to_consensus import compute_consensus  # noqa: E402
+
+
+def compute_consensus_unique(index_and_sequences):
+    """Previous kernel: U1 array, one np.unique per alignment column."""
+    index, sequences = index_and_sequences
+    arr = np.array([list(seq) for seq in sequences], dtype="U1")
+    consensus = []
+
+    for col in arr.T:
+        mask = (col != "-") & (col != "N") & (col != "n")
+        filtered = col[mask]
+        if filtered.size == 0:
+            consensus.append("N")
+        else:
+            values, counts = np.unique(filtered, return_counts=True)
+            consensus.append(values[np.argmax(counts)])
+
+    return index, "".join(consensus)
+
+
+def synthetic_catalog(n_loci, n_samples, rng):
+    """Aligned loci with SNPs, IUPAC codes, Ns, gaps and ragged ends."""
+    catalog = []
+    for index in range(n_loci):
+        length = int(rng.integers(60, 150))
+        depth = int(rng.integers(2, n_samples + 1))
+        base = rng.choice(np.frombuffer(b"ACGT", dtype=np.uint8), length)
+        seqs = np.tile(base, (depth, 1))
+        noise = rng.random(seqs.shape) < 0.05
+        seqs[noise] = rng.choice(np.frombuffer(b"ACGTRYNn-", dtype=np.uint8), noise.sum())
+        trim = rng.integers(0, 12, depth)
+        for row, t in enumerate(trim):
+            seqs[row, :t] = ord("-")
+        if index % 50 == 0:
+            seqs[:, : length // 10] = ord("N")  # fully masked columns
+        catalog.append((index, [row.tobytes().decode("ascii") for row in seqs]))
+    return catalog
+
+
+# Unaligned loci, including one whose lengths add up to a rectangle
+RAGGED = [
+    (1, ["ACGT", "ACG", "ACGTA"]),
+    (2, ["ACGT", "ACGTA"]),
+]
+
+
+def check_ragged(fn):
+    """True when `fn` raises ValueError for every unaligned locus."""
+    for locus in RAGGED:
+        try:
+            fn(locus)
+        except ValueError:
+            continue
+        return False
+    return True
+
+
+def bench(fn, catalog, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = [fn(locus) for locus in catalog]
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the consensus kernel")
+    parser.add_argument("--loci", type=int, default=5000, help="Synthetic loci")
+    parser.add_argument("--samples", type=int, default=48, help="Max sequences per locus")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeats (best kept)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    catalog = synthetic_catalog(args.loci, args.samples, np.random.default_rng(args.seed))
+    columns = sum(len(seqs[0]) for _, seqs in catalog)
+
+    t_old, old = bench(compute_consensus_unique, catalog, args.repeat)
+    t_new, new = bench(compute_consensus, catalog, args.repeat)
+    if old != new:
+        sys.exit("❌ Kernels disagree")
+    if not check_ragged(compute_consensus):
+        sys.exit("❌ Unaligned locus accepted")
+
+    print(f"{args.loci} loci, {columns} columns")
+    print(f"np.unique per column : {t_old:8.3f} s  ({columns / t_old:12,.0f} columns/s)")
+    print(f"uint8 bincount       : {t_new:8.3f} s  ({columns / t_new:12,.0f} columns/s)")
+    print(f"speed-up             : {t_old / t_new:8.1f}x   (outputs identical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+admixio.py
+==========
+
+Shared readers for ADMIXTURE `.P`/`.Q` matrices and CLUMPP indfiles, and
+the CLUMPP indfile writer.
+
+Text is parsed by pandas' C reader: `.P`/`.Q` rows are whitespace‑separated
+numbers, and CLUMPP rows (`1 1 (0) 1 : q1 … qK`) are read as the columns
+after the `:` token, located once from the first row. CLUMPP files that
+do not fit that layout fall back to a line‑by‑line parse. `.P` files can
+also be read in row blocks (`iter_blocks`), so a caller holds one block in
+memory, not the whole text.
+
+Parse times on large matrices: `benchmarks/admixio_readers.py`.
+
+```bash
+python admixio.py mydata.5.P mydata.5.Q best.clumpp   # parse and summarise
+python admixio.py --popmap inds.txt --out popmap.txt clumpp_indfile.out
+```
+"""
+
+import argparse, sys
+
+import numpy as np
+import pandas as pd
+
+BLOCK_ROWS = 200_000
+
+
+def _check(block: np.ndarray, path: str) -> np.ndarray:
+    """Row‑major copy of a parsed block (pandas returns column‑major)."""
+    if np.isnan(block).any():
+        raise ValueError(f"{path}: missing or non-numeric values")
+    return np.ascontiguousarray(block)
+
+
+def _read(path: str, **kwargs):
+    return pd.read_csv(
+        path, sep=r"\s+", header=None, dtype=np.float64, engine="c", **kwargs
+    )
+
+
+def iter_blocks(path: str, rows: int = BLOCK_ROWS):
+    """Yield consecutive (rows × K) float64 blocks of a whitespace matrix."""
+    with _read(path, chunksize=rows) as reader:
+        for chunk in reader:
+            yield _check(chunk.to_numpy(), path)
+
+
+def read_matrix(path: str) -> np.ndarray:
+    """ADMIXTURE `.P` (L × K) or `.Q` (N × K) as float64."""
+    try:
+        return _check(_read(path).to_numpy(), path)
+    except pd.errors.EmptyDataError:
+        return np.empty((0, 0))
+
+
+def read_clumpp(path: str) -> np.ndarray:
+    """Q columns (after the ':') of a CLUMPP indfile, as float64."""
+    with open(path) as fh:
+        first = next((line for line in fh if ":" in line), None)
+    if first is None:
+        return np.empty((0, 0))
+    tokens = first.split()
+    if ":" in tokens:
+        j = tokens.index(":")
+        k = len(tokens) - j - 1
+        with open(path, "rb") as fh:
+            n = fh.read().count(b":")
+        try:
+            Q = pd.read_csv(
+                path, sep=r"\s+", header=None, usecols=range(j + 1, j + 1 + k),
+                dtype=np.float64, engine="c",
+            ).to_numpy()
+            if Q.shape[0] == n and not np.isnan(Q).any():
+                return np.ascontiguousarray(Q)
+        except (ValueError, pd.errors.ParserError):
+            pass
+    # Irregular layout: split each line at its ':'
+    rows = []
+    with open(path) as fh:
+        for line in fh:
+            if ":" in line:
+                rows.append([float(x) for x in line.split(":", 1)[1].split()])
+    return np.asarray(rows)
+
+
+def write_clumpp(path: str, Q: np.ndarray, pops=None):
+    """
+    CLUMPP indfile layout: index, index, (missing %), population, ':', Q.
+    `pops` (one label per row) is coded 1, 2, … in order of appearance;
+    every row is population 1 without it.
+    """
+    if pops is None:
+        codes = np.ones(len(Q), dtype=int)
+    else:
+        codes = pd.factorize(pd.Series(pops))[0] + 1
+    with open(path, "w") as out:
+        for i, (q, p) in enumerate(zip(Q, codes), start=1):
+            out.write(f"{i:>4} {i:>4} (0) {p:>4} :  " + " ".join(f"{x:.4f}" for x in q) + "\n")
+
+
+def n_columns(path: str) -> int:
+    """K of a `.P`/`.Q` file, from its first row."""
+    with open(path) as fh:
+        return len(fh.readline().split())
+
+
+# ------------------------------------------------ command line
+
+
+def popmap(clumpp: str, inds: str, output: str):
+    """Individual → K<dominant cluster> (first on a tie), one per line."""
+    Q = read_clumpp(clumpp)
+    with open(inds) as fh:
+        ids = [line.split()[0] for line in fh if line.strip()]
+    if len(ids) != len(Q):
+        sys.exit(
+            f"❌ Mismatch: CLUMPP file has {len(Q)} rows, "
+            f"inds file has {len(ids)} lines"
+        )
+    with open(output, "w") as out:
+        out.writelines(f"{i}\tK{k + 1}\n" for i, k in zip(ids, Q.argmax(axis=1)))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parse ADMIXTURE .P/.Q and CLUMPP files")
+    ap.add_argument(
+        "files", nargs="+", help=".P/.Q files or CLUMPP indfiles (detected by ':')"
+    )
+    ap.add_argument(
+        "--popmap",
+        metavar="INDS",
+        help="Write individual → dominant cluster for one CLUMPP file",
+    )
+    ap.add_argument(
+        "--out", default="popmap.txt", help="Output of --popmap (default: popmap.txt)"
+    )
+    args = ap.parse_args()
+
+    if args.popmap:
+        if len(args.files) != 1:
+            ap.error("--popmap takes one CLUMPP file")
+        popmap(args.files[0], args.popmap, args.out)
+        return
+
+    for path in args.files:
+        with open(path) as fh:
+            kind = "clumpp" if ":" in fh.readline() else "matrix"
+        M = read_clumpp(path) if kind == "clumpp" else read_matrix(path)
+        print(f"{path}: {kind} {M.shape[0]} × {M.shape[1]}")
+
+
+if __name__ == "__main__":
+    main()
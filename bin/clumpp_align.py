@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+clumpp_align.py
+===============
+
+Align ADMIXTURE replicates and find their major mode without CLUMPAK,
+CLUMPP or distruct, writing the files `BESTK` and the reports read.
+
+For each K, every replicate `.Q` (N × K) is compared with every other one.
+All replicate columns are stacked into one N × (R·K) matrix, so the overlap
+of every column pair of every replicate pair comes from a single matrix
+product. For a pair of replicates the column permutation minimising
+‖Q_i − Q_j P‖ is found by Hungarian assignment (greedy matching above
+`--greedy-k` clusters), and their similarity is CLUMPP's
+G = 1 − ‖Q_i − Q_j P‖_F / √(2N).
+
+Replicates with G ≥ `--threshold` are linked and each connected group is a
+mode; the largest mode (highest mean G on a tie) is the major mode. Its
+runs are permuted onto the run most similar to the others and averaged.
+Major‑mode Q matrices of successive K are then aligned so that clusters
+keep their column (and colour) as K grows. K values run in parallel
+(`--threads`).
+
+Output (`--outdir`):
+
+* `best_results/ClumppIndFile.output.<K>` – major‑mode Q, CLUMPP indfile layout
+* `MajorClusterRuns.txt`  – K, run, mode and G to the reference run
+* `cv_output.txt` / `ll_output.txt` – mean and SD over the major‑mode runs
+  of the CV error and log‑likelihood in each run's ADMIXTURE `.stdout`
+  (the layout of AdmixPipe's `cvSum.py`)
+
+```bash
+python clumpp_align.py --qfiles *.Q --logs *.stdout --pops data_pops.txt \\
+        --threshold 0.9 --threads 4
+```
+"""
+
+import argparse, os, re, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+from admixio import read_matrix, write_clumpp
+
+CV = re.compile(r"CV error \(K=(\d+)\):\s*(\S+)")
+LOGLIK = re.compile(r"^Loglikelihood:\s*(\S+)", re.M)
+
+
+# ------------------------------------------------ input
+
+
+def read_runs(paths) -> dict:
+    """{K: {run name: Q}} from ADMIXTURE .Q files."""
+    runs = {}
+    for path in sorted(paths):
+        q = read_matrix(path)
+        runs.setdefault(q.shape[1], {})[os.path.basename(path)[: -len(".Q")]] = q
+    return runs
+
+
+def read_logs(paths) -> pd.DataFrame:
+    """CV error and final log‑likelihood of each run's ADMIXTURE stdout."""
+    rows = []
+    for path in paths:
+        with open(path) as fh:
+            text = fh.read()
+        cv = CV.search(text)
+        ll = LOGLIK.findall(text)
+        rows.append(
+            {
+                "run": os.path.basename(path)[: -len(".stdout")],
+                "CV": float(cv.group(2)) if cv else np.nan,
+                "Loglik": float(ll[-1]) if ll else np.nan,
+            }
+        )
+    return pd.DataFrame(rows, columns=["run", "CV", "Loglik"]).set_index("run")
+
+
+# ------------------------------------------------ alignment
+
+
+def match(cost: np.ndarray, greedy: bool) -> np.ndarray:
+    """perm with column perm[a] of the second matrix matched to column a of the first."""
+    if not greedy:
+        return linear_sum_assignment(cost)[1]
+    k = cost.shape[0]
+    perm = np.full(k, -1)
+    used = np.zeros(k, dtype=bool)
+    for flat in np.argsort(cost, axis=None, kind="stable"):
+        a, b = divmod(int(flat), k)
+        if perm[a] < 0 and not used[b]:
+            perm[a], used[b] = b, True
+    return perm
+
+
+def pairwise(qs: list, greedy: bool):
+    """G and permutations of every replicate pair (perm[i, j] maps j onto i)."""
+    r = len(qs)
+    n, k = qs[0].shape
+    X = np.concatenate(qs, axis=1)  # N × R·K
+    gram = (X.T @ X).reshape(r, k, r, k).transpose(0, 2, 1, 3)  # [i, j, a, b]
+    sq = np.einsum("nc,nc->c", X, X).reshape(r, k)
+    G = np.eye(r)
+    perm = np.tile(np.arange(k), (r, r, 1))
+    for i in range(r):
+        for j in range(i + 1, r):
+            cost = sq[i][:, None] + sq[j][None, :] - 2 * gram[i, j]  # ‖Q_i[:, a] − Q_j[:, b]‖²
+            p = match(cost, greedy)
+            d = max(cost[np.arange(k), p].sum(), 0.0)
+            G[i, j] = G[j, i] = 1 - np.sqrt(d) / np.sqrt(2 * n)
+            perm[i, j] = p
+            perm[j, i] = np.argsort(p)
+    return G, perm
+
+
+def modes(G: np.ndarray, threshold: float) -> np.ndarray:
+    """Mode label of each replicate: connected groups of G ≥ threshold."""
+    r = G.shape[0]
+    label = np.arange(r)
+    for i, j in zip(*np.nonzero(np.triu(G >= threshold, 1))):
+        a, b = label[i], label[j]
+        if a != b:
+            label[label == b] = a
+    return pd.factorize(label)[0]
+
+
+def align_k(task):
+    """Major mode of one K: (K, averaged Q, run table)."""
+    k, names, qs, threshold, greedy = task
+    G, perm = pairwise(qs, greedy)
+    label = modes(G, threshold)
+    sizes = np.bincount(label)
+    mean_g = np.array([G[np.ix_(label == m, label == m)].mean() for m in range(sizes.size)])
+    major = max(range(sizes.size), key=lambda m: (sizes[m], mean_g[m]))
+    members = np.flatnonzero(label == major)
+    ref = members[np.argmax(G[np.ix_(members, members)].sum(axis=1))]
+    Q = np.mean([qs[j][:, perm[ref, j]] for j in members], axis=0)
+    table = pd.DataFrame(
+        {"K": k, "run": names, "mode": label + 1, "major": label == major, "G_to_reference": G[ref]}
+    )
+    return k, Q, table
+
+
+def chain_clusters(results: dict) -> dict:
+    """Reorder clusters of each K so the first K−1 follow the previous K."""
+    ks = sorted(results)
+    for prev, k in zip(ks, ks[1:]):
+        a, b = results[prev], results[k]
+        cost = -(a.T @ b)  # (K_prev × K) overlap
+        rows, cols = linear_sum_assignment(cost)
+        order = list(cols[np.argsort(rows)]) + [c for c in range(k) if c not in set(cols)]
+        results[k] = b[:, order]
+    return results
+
+
+# ------------------------------------------------ output
+
+
+def summarise(values: pd.DataFrame, column: str) -> pd.DataFrame:
+    g = values.dropna(subset=[column]).groupby("K")[column]
+    return pd.DataFrame({"Mean": g.mean(), "StDev": g.std(ddof=1).fillna(0.0)}).reset_index()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Align ADMIXTURE replicates and find the major mode of each K")
+    ap.add_argument("--qfiles", nargs="+", required=True, help="ADMIXTURE .Q files (all K, all replicates)")
+    ap.add_argument("--logs", nargs="*", default=[], help="ADMIXTURE .stdout of the same runs")
+    ap.add_argument("--pops", help="Population of each individual, one per line (CLUMPP column 4)")
+    ap.add_argument("--threshold", type=float, default=0.9, help="G linking two replicates into a mode (default: 0.9)")
+    ap.add_argument("--greedy-k", type=int, default=15, help="Greedy matching above this many clusters (default: 15)")
+    ap.add_argument("--threads", type=int, default=1, help="Worker processes (default: 1)")
+    ap.add_argument("--outdir", default=".", help="Output directory")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    runs = read_runs(args.qfiles)
+    pops = None
+    if args.pops:
+        with open(args.pops) as fh:
+            pops = [line.strip() for line in fh if line.strip()]
+    tasks = [
+        (k, list(r), list(r.values()), args.threshold, k > args.greedy_k) for k, r in sorted(runs.items())
+    ]
+    if args.threads > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(align_k, tasks))
+    else:
+        results = [align_k(t) for t in tasks]
+
+    best = chain_clusters({k: Q for k, Q, _ in results})
+    table = pd.concat([t for _, _, t in results], ignore_index=True)
+
+    os.makedirs(os.path.join(args.outdir, "best_results"), exist_ok=True)
+    for k, Q in best.items():
+        if pops is not None and len(pops) != len(Q):
+            sys.exit(f"--pops has {len(pops)} lines, K={k} .Q files {len(Q)} rows")
+        write_clumpp(os.path.join(args.outdir, "best_results", f"ClumppIndFile.output.{k}"), Q, pops)
+
+    logs = read_logs(args.logs)
+    table = table.join(logs, on="run")
+    table.to_csv(os.path.join(args.outdir, "MajorClusterRuns.txt"), sep="\t", index=False, float_format="%.6g")
+    major = table[table["major"]]
+    summarise(major, "CV").to_csv(os.path.join(args.outdir, "cv_output.txt"), sep="\t", index=False, float_format="%.6g")
+    summarise(major, "Loglik").to_csv(os.path.join(args.outdir, "ll_output.txt"), sep="\t", index=False, float_format="%.6g")
+
+    for k, t in table.groupby("K"):
+        print(f"K={k}: {t['major'].sum()} of {len(t)} runs in the major mode ({t['mode'].max()} modes)")
+    print(f"Done → {args.outdir}/best_results   ({len(best)} K values, {time.time() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
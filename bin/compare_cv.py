@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+compare_cv.py
+=============
+
+Check the two‑phase best‑K search: ADMIXTURE CV error of the K sweep on the
+locus subset against the runs on all loci (best K, and K±1 when re‑run).
+
+Both inputs are `cv_output.txt` files of CVSUM (`K Mean StDev`). Best K is
+chosen as in BESTK, the lowest mean CV error with K=1 excluded.
+
+Output: `<prefix>.tsv` (one row per K with the subset and full CV error and
+the best K of each run) and `<prefix>_mqc.html`, a MultiQC line plot.
+"""
+
+import argparse, sys
+import pandas as pd
+import plotly.graph_objs as go
+
+from render_report import build_comment, figure_html, parse_template, read_cv
+
+
+def best_k(df: pd.DataFrame) -> int:
+    """Lowest mean CV error, K=1 excluded (as in BESTK)."""
+    cand = df[df["K"] != 1]
+    return int(cand.loc[cand["Mean"].idxmin(), "K"])
+
+
+def plot_comparison(subset, full, output, header_comment):
+    fig = go.Figure()
+    for df, name in [(subset, "Locus subset (K sweep)"), (full, "All loci")]:
+        fig.add_trace(
+            go.Scatter(
+                x=df["K"],
+                y=df["Mean"],
+                error_y=dict(type="data", array=df["StDev"], visible=True),
+                mode="lines+markers",
+                name=name,
+                marker=dict(size=8),
+                line=dict(width=2),
+            )
+        )
+    fig.update_layout(
+        title="Cross-validation Error by K: locus subset vs all loci",
+        xaxis_title="K",
+        yaxis_title="Mean CV Error",
+        template="plotly_white",
+    )
+    html = figure_html(fig)
+    with open(output, "w") as f:
+        f.write(header_comment + "\n" + html)
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Compare CV error of the subset K sweep with the all-loci runs"
+    )
+    ap.add_argument("--subset", required=True, help="cv_output.txt of the subset K sweep")
+    ap.add_argument("--full", required=True, help="cv_output.txt of the all-loci runs")
+    ap.add_argument("--prefix", default="cv_subset", help="Output prefix")
+    ap.add_argument("--template", help="HTML file with the MultiQC metadata comment block")
+    args = ap.parse_args()
+
+    subset, full = read_cv(args.subset), read_cv(args.full)
+    k_subset, k_full = best_k(subset), best_k(full)
+
+    table = subset[["K", "Mean", "StDev"]].merge(
+        full[["K", "Mean", "StDev"]], on="K", how="outer", suffixes=("_subset", "_full")
+    )
+    table["Best_subset"] = table["K"] == k_subset
+    table["Best_full"] = table["K"] == k_full
+    table.to_csv(f"{args.prefix}.tsv", sep="\t", index=False, float_format="%.6g")
+
+    metadata = parse_template(args.template) if args.template else {"id": "cv_subset", "plot_type": "html"}
+    metadata["description"] = (
+        f"{metadata.get('description', '')} Best K: {k_subset} on the locus subset, "
+        f"{k_full} on all loci."
+    ).strip()
+    plot_comparison(subset, full, f"{args.prefix}_mqc.html", build_comment(metadata))
+
+    print(table.to_string(index=False))
+    if k_subset != k_full:
+        print(
+            f"⚠️  Best K differs: {k_subset} on the locus subset, {k_full} on all loci",
+            file=sys.stderr,
+        )
+    print(f"Done → {args.prefix}.tsv, {args.prefix}_mqc.html")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+genostore.py
+============
+
+Compact on‑disk genotype store shared by the SNPio steps.
+
+`SNPIO_FILTER` parses the VCF once and writes `<prefix>.gstore/`:
+
+    genotypes.npy   uint8, n_sites × ceil(n_samples / 4), 2 bits per call
+    samples.tsv     sample  population  kept
+    sites.tsv       CHROM  POS  A1  A2  kept
+    meta.json       shape and encoding
+
+Calls are coded 0 = A1/A1, 1 = A1/A2, 2 = A2/A2, 3 = missing; sample `s`
+sits in bits `2·(s % 4)` of byte `s // 4` of its site row. The store holds
+the *unfiltered* alignment; `kept` flags the samples and sites that passed
+the SNPio filters, so both the pre‑ and post‑filter views come from one
+file. Later steps memory‑map `genotypes.npy` and unpack only the site
+blocks they touch.
+
+A1 is the REF base when REF is one of the two observed bases; A2 is the
+other observed base. Calls that do not fit a biallelic A1/A2 site are
+stored as missing and counted in `meta.json`.
+
+```bash
+python genostore.py mydata.gstore          # print a short summary
+```
+"""
+
+import argparse, json, os
+import numpy as np
+import pandas as pd
+
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+MISSING = 3
+
+# IUPAC character → bitmask of its bases (A=1, C=2, G=4, T=8); 0 = missing
+IUPAC_BITS = np.zeros(256, dtype=np.uint8)
+for _code, _bits in {
+    "A": 1, "C": 2, "G": 4, "T": 8,
+    "M": 3, "R": 5, "W": 9, "S": 6, "Y": 10, "K": 12,
+}.items():
+    IUPAC_BITS[ord(_code)] = IUPAC_BITS[ord(_code.lower())] = _bits
+
+SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+# ------------------------------------------------ encode / pack
+
+
+def iupac_to_bits(snp) -> np.ndarray:
+    """IUPAC characters (any shape, str or bytes) → base bitmasks."""
+    arr = np.asarray(snp)
+    if arr.dtype.kind == "U":
+        raw = np.ascontiguousarray(arr, dtype="<U1").view(np.uint32)
+        raw = np.where(raw < 256, raw, 0).astype(np.uint8)
+    elif arr.dtype.kind == "S":
+        raw = np.ascontiguousarray(arr, dtype="S1").view(np.uint8)
+    else:
+        raw = np.ascontiguousarray(arr.astype("<U1")).view(np.uint32)
+        raw = np.where(raw < 256, raw, 0).astype(np.uint8)
+    return IUPAC_BITS[raw.reshape(arr.shape)]
+
+
+def encode_sites(bits: np.ndarray, ref=None):
+    """
+    Bitmasks (sites × samples) → (codes, a1, a2, n_dropped).
+
+    a1/a2 are ASCII base codes per site (N when the site has fewer than two
+    observed bases).
+    """
+    seen = np.bitwise_or.reduce(bits, axis=1)
+    lowest = seen & (~seen + 1)  # lowest set bit
+    a1 = lowest
+    if ref is not None:
+        first = "".join((str(r) or "N")[0] for r in ref).encode("ascii", "replace")
+        ref_bits = IUPAC_BITS[np.frombuffer(first, dtype=np.uint8)]
+        use_ref = (ref_bits & seen) != 0
+        a1 = np.where(use_ref, ref_bits, lowest)
+    rest = seen & ~a1
+    a2 = rest & (~rest + 1)
+
+    A1, A2 = a1[:, None], a2[:, None]
+    codes = np.full(bits.shape, MISSING, dtype=np.uint8)
+    codes[bits == A1] = 0
+    codes[(bits == (A1 | A2)) & (A2 != 0)] = 1
+    codes[(bits == A2) & (A2 != 0)] = 2
+    dropped = int(((codes == MISSING) & (bits != 0)).sum())
+
+    to_base = np.full(16, ord("N"), dtype=np.uint8)
+    to_base[[1, 2, 4, 8]] = BASES
+    return codes, to_base[a1], to_base[a2], dropped
+
+
+def pack(codes: np.ndarray) -> np.ndarray:
+    """2‑bit codes (sites × samples) → packed bytes (sites × ceil(samples/4))."""
+    n_sites, n = codes.shape
+    width = -(-n // 4)
+    padded = np.full((n_sites, width * 4), MISSING, dtype=np.uint8)
+    padded[:, :n] = codes
+    q = padded.reshape(n_sites, width, 4)
+    return q[..., 0] | (q[..., 1] << 2) | (q[..., 2] << 4) | (q[..., 3] << 6)
+
+
+def unpack(packed: np.ndarray, n_samples: int) -> np.ndarray:
+    """Packed bytes (sites × width) → 2‑bit codes (sites × n_samples)."""
+    codes = (np.asarray(packed)[:, :, None] >> SHIFTS) & 3
+    return codes.reshape(packed.shape[0], -1)[:, :n_samples]
+
+
+# ------------------------------------------------ write
+
+
+def write_store(
+    path,
+    snp_data,
+    samples,
+    populations,
+    chrom,
+    pos,
+    ref=None,
+    kept_samples=None,
+    kept_sites=None,
+    block=20000,
+):
+    """
+    Write a store from a SNPio‑style IUPAC alignment (samples × sites).
+    Sites are encoded in blocks of `block` so only one block of 1‑byte codes
+    is held at a time.
+    """
+    snp_data = np.asarray(snp_data)
+    n_samples, n_sites = snp_data.shape
+    os.makedirs(path, exist_ok=True)
+
+    width = -(-n_samples // 4)
+    out = np.lib.format.open_memmap(
+        os.path.join(path, "genotypes.npy"), mode="w+", dtype=np.uint8, shape=(n_sites, width)
+    )
+    a1 = np.empty(n_sites, dtype=np.uint8)
+    a2 = np.empty(n_sites, dtype=np.uint8)
+    dropped = 0
+    for s in range(0, n_sites, block):
+        e = min(s + block, n_sites)
+        bits = iupac_to_bits(snp_data[:, s:e]).T
+        codes, a1[s:e], a2[s:e], d = encode_sites(bits, None if ref is None else ref[s:e])
+        out[s:e] = pack(codes)
+        dropped += d
+    out.flush()
+    del out
+
+    kept_samples = np.ones(n_samples, bool) if kept_samples is None else np.asarray(kept_samples, bool)
+    kept_sites = np.ones(n_sites, bool) if kept_sites is None else np.asarray(kept_sites, bool)
+    pd.DataFrame(
+        {"sample": samples, "population": populations, "kept": kept_samples.astype(int)}
+    ).to_csv(os.path.join(path, "samples.tsv"), sep="\t", index=False)
+    pd.DataFrame(
+        {
+            "CHROM": np.asarray(chrom).astype(str),
+            "POS": np.asarray(pos).astype(np.int64),
+            "A1": a1.view("S1").astype(str),
+            "A2": a2.view("S1").astype(str),
+            "kept": kept_sites.astype(int),
+        }
+    ).to_csv(os.path.join(path, "sites.tsv"), sep="\t", index=False)
+    with open(os.path.join(path, "meta.json"), "w") as fh:
+        json.dump(
+            {
+                "format": "gstore",
+                "version": 1,
+                "n_samples": int(n_samples),
+                "n_sites": int(n_sites),
+                "encoding": "2-bit: 0=A1/A1 1=A1/A2 2=A2/A2 3=missing",
+                "non_biallelic_calls_dropped": dropped,
+            },
+            fh,
+            indent=2,
+        )
+    return path
+
+
+# ------------------------------------------------ read
+
+
+class GenoStore:
+    """Memory‑mapped view of a `.gstore` directory."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as fh:
+            self.meta = json.load(fh)
+        self.samples = pd.read_csv(
+            os.path.join(path, "samples.tsv"),
+            sep="\t",
+            dtype={"sample": str, "population": str},
+            keep_default_na=False,
+        )
+        self.sites = pd.read_csv(
+            os.path.join(path, "sites.tsv"), sep="\t", dtype={"CHROM": str}, keep_default_na=False
+        )
+        self.packed = np.load(os.path.join(path, "genotypes.npy"), mmap_mode="r")
+        self.n_samples = self.meta["n_samples"]
+        self.n_sites = self.meta["n_sites"]
+
+    # ---- selections (all return integer index arrays)
+
+    def kept_samples(self) -> np.ndarray:
+        return np.flatnonzero(self.samples["kept"].to_numpy() == 1)
+
+    def kept_sites(self) -> np.ndarray:
+        return np.flatnonzero(self.sites["kept"].to_numpy() == 1)
+
+    def site_keys(self) -> pd.Series:
+        return self.sites["CHROM"] + ":" + self.sites["POS"].astype(str)
+
+    def select_samples(self, names) -> np.ndarray:
+        """Indices of `names`, in the given order; unknown names raise."""
+        index = pd.Index(self.samples["sample"])
+        idx = index.get_indexer(list(names))
+        if (idx < 0).any():
+            missing = [n for n, i in zip(names, idx) if i < 0][:5]
+            raise KeyError(f"Samples not in {self.path}: {', '.join(missing)}")
+        return idx
+
+    def select_sites(self, keys) -> np.ndarray:
+        """
+        Indices of CHROM:POS `keys`, in the given order; unknown keys raise.
+        When positions repeat (split multi‑allelic records), `keys` must be
+        in store order and are matched as an ordered subsequence.
+        """
+        keys = list(keys)
+        index = pd.Index(self.site_keys())
+        if index.is_unique:
+            idx = index.get_indexer(keys)
+        else:
+            idx = np.full(len(keys), -1, dtype=np.int64)
+            store_keys = index.to_numpy()
+            j = 0
+            for i, key in enumerate(keys):
+                while j < store_keys.size and store_keys[j] != key:
+                    j += 1
+                if j == store_keys.size:
+                    break
+                idx[i] = j
+                j += 1
+        if (idx < 0).any():
+            missing = [k for k, i in zip(keys, idx) if i < 0][:5]
+            raise KeyError(f"Sites not in {self.path}: {', '.join(missing)}")
+        return idx
+
+    # ---- access
+
+    def iter_codes(self, sites=None, samples=None, block=20000):
+        """Yield (site indices, codes[len(block) × len(samples)]) per block."""
+        sites = np.arange(self.n_sites) if sites is None else np.asarray(sites)
+        for s in range(0, sites.size, block):
+            idx = sites[s : s + block]
+            codes = unpack(self.packed[idx], self.n_samples)
+            yield idx, (codes if samples is None else codes[:, samples])
+
+    def iter_sample_codes(self, sites=None, samples=None, block=256):
+        """
+        Yield (sample indices, codes[len(block) × len(sites)]) per block of
+        samples, reading only the packed byte columns that hold them.
+        """
+        sites = np.arange(self.n_sites) if sites is None else np.asarray(sites)
+        samples = np.arange(self.n_samples) if samples is None else np.asarray(samples)
+        for s in range(0, samples.size, block):
+            idx = samples[s : s + block]
+            cols, where = np.unique(idx // 4, return_inverse=True)
+            strip = np.take(self.packed, cols, axis=1)[sites]
+            codes = (strip[:, where] >> SHIFTS[idx % 4]) & 3
+            yield idx, codes.T
+
+    def sample_stats(self, sites=None, samples=None, block=20000) -> pd.DataFrame:
+        """
+        Per‑sample missing proportion and heterozygosity. As in SNPio's
+        N‑coded genotype matrix, missing calls stay in the heterozygosity
+        denominator (het / sites).
+        """
+        samples = np.arange(self.n_samples) if samples is None else np.asarray(samples)
+        n_sites = self.n_sites if sites is None else len(sites)
+        missing = np.zeros(samples.size, dtype=np.int64)
+        het = np.zeros(samples.size, dtype=np.int64)
+        for _, codes in self.iter_codes(sites, samples, block):
+            missing += (codes == MISSING).sum(axis=0)
+            het += (codes == 1).sum(axis=0)
+        return pd.DataFrame(
+            {
+                "SampleID": self.samples["sample"].to_numpy()[samples],
+                "Missing": missing / max(n_sites, 1),
+                "Heterozygosity": het / max(n_sites, 1),
+            }
+        )
+
+
+def read_vcf_sites(path) -> list:
+    """CHROM:POS of every record of a (b)gzipped or plain VCF, in file order."""
+    import gzip
+
+    opener = gzip.open if path.endswith(".gz") else open
+    keys = []
+    with opener(path, "rt") as fh:
+        for line in fh:
+            if line.startswith("#"):
+                continue
+            chrom, pos = line.split("\t", 2)[:2]
+            keys.append(f"{chrom}:{pos}")
+    return keys
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Summarise a .gstore genotype store")
+    ap.add_argument("store", help=".gstore directory")
+    args = ap.parse_args()
+
+    gs = GenoStore(args.store)
+    kept_s, kept_l = gs.kept_samples(), gs.kept_sites()
+    print(f"{args.store}: {gs.n_samples} samples × {gs.n_sites} sites")
+    print(f"  kept after filtering: {kept_s.size} samples × {kept_l.size} sites")
+    print(f"  packed size: {gs.packed.nbytes / 2**20:.1f} MiB")
+    stats = gs.sample_stats(kept_l, kept_s)
+    print(f"  mean missing (kept): {stats.Missing.mean():.4f}")
+    print(f"  mean heterozygosity (kept): {stats.Heterozygosity.mean():.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,86 +28,456 @@ Usage
 ```bash
 python infocalc_from_PQ.py \
         --pfile  mydata.5.P   \
-        --qfile  mydata.5.Q   # optional, choose priors
+        --qfile  mydata.5.Q   \
+        --chunk-size 50000    # optional, rows of .P held in memory
 ```
 If `--qfile` is omitted the prior is uniform and **In** = **Ia** = log‑likelihood
 reductions under that assumption.
+
+All three statistics are evaluated on whole L × K blocks with NumPy array
+operations. The `.P` file is parsed and processed in blocks of
+`--chunk-size` rows (see `admixio.py`), so memory use is bounded by the
+block size rather than by the number of loci.
+
+Genotype mode
+-------------
+With `--stru` the script is instead a drop‑in replacement for Rosenberg's
+`infocalc.pl`: allele frequencies are tallied from a two‑line STRUCTURE file
+and the output reproduces the Perl `-output` layout
+
+    Locus   I_n   I_a   ORCA[1-allele]   ORCA[2-allele]
+
+followed by the `Command:` and `PriorWeights:` trailer lines. Where the
+Perl script prints −9999 for I_a (a zero denominator in its eq. 14
+evaluation, e.g. at every monomorphic locus) the real value is reported
+instead, 0 for a monomorphic locus. `tests/test_infocalc_stru.py` checks
+the output against `infocalc.pl` on a small fixture.
+
+```bash
+python infocalc.py --stru data.labeled.stru --numpops 5 \\
+        --column 2 --label-cols 2 --outfile locus_metrics.txt
+```
+
+Multi‑K batch mode
+------------------
+With `--pbatch` every K of an ADMIXTURE sweep is scored in one run. The
+argument is a directory (all `*.P` in it) or a quoted glob; each `.P` is
+paired with the `.Q` of the same name. Work is split into (K, row block)
+tasks on a process pool so one large K does not hold up the batch. The
+output is one wide table (`In_K2 Ia_K2 ORCA_K2 In_K3 …`) plus `--summary`,
+which gives Kendall τ and top‑N overlap of each metric between consecutive K.
+
+```bash
+python infocalc.py --pbatch 'admix/mydata.*.P' --threads 8 \\
+        --outfile infocalc_multik.tsv --summary infocalc_stability.tsv
+```
 """
 
-import argparse, math, sys
+import argparse, glob, gzip, os, sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+
 import numpy as np
 
+from admixio import iter_blocks, n_columns, read_matrix
+
 # ------------------------------------------------ utility functions
 
 
-def factorial(n: int) -> int:
-    return math.prod(range(1, n + 1)) or 1
+def xlogx(x: np.ndarray) -> np.ndarray:
+    """Elementwise x·log(x) with the limit 0·log(0) = 0."""
+    out = np.zeros_like(x)
+    np.log(x, out=out, where=x > 0)
+    return x * out
 
 
-def unsigned_stirling_first(n: int, k: int) -> int:
-    """Unsigned Stirling number of the first kind |s(n,k)| (small n,k)."""
-    if k == 0:
-        return int(n == 0)
-    if k == n:
-        return 1
-    s = np.zeros((n + 1, k + 1), dtype=object)
-    s[0, 0] = 1
-    for i in range(1, n + 1):
-        for j in range(1, min(i, k) + 1):
-            s[i, j] = s[i - 1, j - 1] + (i - 1) * s[i - 1, j]
-    return int(s[n, k])
+def load_priors(qfile, K: int) -> np.ndarray:
+    """Prior q_i: column means of .Q, or uniform when no .Q is given."""
+    if not qfile:
+        return np.full(K, 1.0 / K)
+    Q = read_matrix(qfile)
+    if Q.shape[1] != K:
+        sys.exit(f"{qfile}: .Q columns ≠ K clusters in .P")
+    q = Q.mean(axis=0)
+    return q / q.sum()
 
 
 # ------------------------------------------------ In (assignment)
 
 
-def In_locus(p_vec: np.ndarray, q: np.ndarray) -> float:
-    """Rosenberg eq. 4 with arbitrary priors q_i."""
-    info = 0.0
-    for allele in (p_vec, 1.0 - p_vec):
-        p_bar = (q * allele).sum()
-        if p_bar in (0.0, 1.0):
-            continue
-        info -= p_bar * math.log(p_bar)
-        info += (q * allele * np.log(allele, where=allele > 0)).sum()
+def In_loci(P: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Rosenberg eq. 4 with arbitrary priors q_i, for every row of P."""
+    info = np.zeros(P.shape[0])
+    for allele in (P, 1.0 - P):
+        p_bar = (q * allele).sum(axis=1)
+        ok = (p_bar != 0.0) & (p_bar != 1.0)
+        log_allele = np.zeros_like(allele)
+        np.log(allele, out=log_allele, where=allele > 0)
+        term = (q * allele * log_allele).sum(axis=1)
+        info = np.where(ok, info - xlogx(p_bar) + term, info)
     return info
 
 
 # ----------------------------------------------- Ia (uniform prior)
 
 
-def Ia_locus_uniform(p_vec: np.ndarray) -> float:
-    """Rosenberg eq. 14. Returns −9999 when denominator → 0."""
-    K = p_vec.size
-    if K > 24:
-        return float("nan")
-    S = unsigned_stirling_first(K - 1, 2)
-    Kfac = factorial(K)
-    Ia = 0.0
-    for allele in (p_vec, 1.0 - p_vec):
-        pj = allele.mean()
-        if pj in (0.0, 1.0):
-            continue
-        Ia += pj * (1.0 - math.log(pj) - S / Kfac)
-        for i, p_ij in enumerate(allele):
-            if p_ij == 0.0:
-                continue
-            denom = K * np.prod([p_ij - allele[r] for r in range(K) if r != i])
-            if denom == 0.0:
-                return -9999.0
-            Ia += (p_ij**K) * math.log(p_ij) / denom
+# Eq. 14 contains, for each allele j, the alternating sum
+#
+#     Σ_i p_ij^K ln p_ij / (K Π_{l≠i} (p_ij − p_lj))
+#
+# i.e. 1/K times the (K−1)th divided difference φ[p_1j … p_Kj] of
+# φ(x) = x^K ln x. Evaluated term by term it divides by products of
+# pairwise differences, so near‑equal frequencies cancel catastrophically
+# and exact ties give 0/0. Writing ln x = ∫_0^∞ (1/(1+s) − 1/(x+s)) ds and
+# taking divided differences under the integral gives
+#
+#     φ[x_1 … x_K] = ∫_0^∞ ( Σ_i x_i / (1+s) + expm1(−Σ_i log1p(x_i / s)) ) ds
+#
+# which has no differences in any denominator and is smooth in ln s, so the
+# trapezoid rule on a uniform ln s grid converges exponentially. Ties,
+# zeros and any K are handled without special cases.
+
+
+@lru_cache(maxsize=None)
+def Ia_constants(K: int, step: float = 0.5, decades: float = 14.0):
+    """K‑only constants for eq. 14: H_K and the ln s quadrature nodes/weights."""
+    H_K = (1.0 / np.arange(1, K + 1)).sum()
+    w = np.arange(-decades * np.log(10), decades * np.log(10) + step / 2, step)
+    s = np.exp(w)
+    return H_K, s, step * s
+
+
+def phi_divided_difference(X: np.ndarray) -> np.ndarray:
+    """φ[x_1 … x_K] for φ(x) = x^K ln x, for every row of X (L × K)."""
+    _, nodes, weights = Ia_constants(X.shape[1])
+    e1 = X.sum(axis=1)
+    total = np.zeros(X.shape[0])
+    buf = np.empty_like(X)
+    for s, w in zip(nodes, weights):
+        np.multiply(X, 1.0 / s, out=buf)
+        np.log1p(buf, out=buf)
+        total += w * (e1 / (1.0 + s) + np.expm1(-buf.sum(axis=1)))
+    return total
+
+
+def Ia_loci_uniform(P: np.ndarray) -> np.ndarray:
+    """Rosenberg eq. 14 for every row of P (any K, ties allowed)."""
+    L, K = P.shape
+    H_K, _, _ = Ia_constants(K)
+    Ia = np.zeros(L)
+    for allele in (P, 1.0 - P):
+        pj = allele.mean(axis=1)
+        ok = (pj != 0.0) & (pj != 1.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            term = pj * (1.0 - np.log(pj) - H_K) + phi_divided_difference(allele) / K
+        Ia = np.where(ok, Ia + term, Ia)
     return Ia
 
 
 # ------------------------------------------- ORCA diploid (biallelic)
 
 
-def orca_diploid(p_vec: np.ndarray, q: np.ndarray) -> float:
-    """Diploid genotype optimal assignment (eq. 12, L = 1)."""
-    P_A = p_vec
-    P_B = 1.0 - p_vec
-    geno = np.stack([P_A**2, 2 * P_A * P_B, P_B**2])  # AA, AB, BB
-    return sum((q * geno[g]).max() for g in range(3))
+def orca_diploid_loci(P: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Diploid genotype optimal assignment (eq. 12, L = 1), for every row."""
+    P_A = P
+    P_B = 1.0 - P
+    geno = (P_A**2, 2 * P_A * P_B, P_B**2)  # AA, AB, BB
+    return sum((q * g).max(axis=1) for g in geno)
+
+
+# ------------------------------------------- genotype (STRUCTURE) mode
+
+
+def read_weightfile(path: str) -> dict:
+    """Population → prior weight, as accepted by infocalc.pl -weightfile."""
+    weights = {}
+    with open(path) as fh:
+        for line in fh:
+            fields = line.split()
+            if not fields:
+                continue
+            if len(fields) != 2:
+                sys.exit(f"weightfile {path} does not have exactly two columns")
+            weights[fields[0]] = float(fields[1])
+    if (sum(weights.values()) - 1) ** 2 > 1e-6:
+        sys.exit(f"sum of weights in weightfile {path} is not 1")
+    return weights
+
+
+def read_stru_counts(path: str, column: int, label_cols: int, chunk_rows: int = 0):
+    """
+    Tally allele counts from a two‑line STRUCTURE file.
+
+    Returns (loci, pops, codes, counts) where counts[a, k, l] is the number
+    of copies of allele codes[a] seen in population pops[k] at locus loci[l].
+    Non‑positive values are missing data, as in infocalc.pl. Gzipped files
+    (`.gz`) are read transparently.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as fh:
+        loci = fh.readline().split()
+        L = len(loci)
+        if not chunk_rows:
+            chunk_rows = max(2, (1 << 22) // max(L, 1))
+
+        pops, pop_idx = [], {}
+        codes = np.empty(0, dtype=np.int64)
+        counts = np.zeros((0, 0, L), dtype=np.int64)
+        n_data = None
+
+        while True:
+            lines = list(islice(fh, chunk_rows))
+            if not lines:
+                break
+            lines = [ln for ln in lines if ln.strip()]
+            if not lines:
+                continue
+
+            # ---- population column and genotype block
+            labels = [ln.split(None, label_cols)[:label_cols] for ln in lines]
+            for lab in labels:
+                if lab[column] not in pop_idx:
+                    pop_idx[lab[column]] = len(pops)
+                    pops.append(lab[column])
+            row_pop = np.array([pop_idx[lab[column]] for lab in labels])
+
+            n_cols = len(lines[0].split())
+            if n_data is None:
+                n_data = n_cols - label_cols
+                if n_data > L:
+                    sys.exit(
+                        f"{path}: {n_data} genotype columns but {L} loci in header"
+                    )
+            G = np.loadtxt(
+                lines, dtype=np.int64, usecols=range(label_cols, label_cols + n_data)
+            )
+            G = G.reshape(len(lines), n_data)
+
+            # ---- extend the allele‑code table with any new codes
+            chunk_codes = np.unique(G[G > 0])
+            new_codes = np.union1d(codes, chunk_codes)
+            K = len(pops)
+            if len(new_codes) != len(codes) or K != counts.shape[1]:
+                grown = np.zeros((len(new_codes), K, L), dtype=np.int64)
+                grown[
+                    np.searchsorted(new_codes, codes)[:, None],
+                    np.arange(counts.shape[1])[None, :],
+                ] = counts
+                codes, counts = new_codes, grown
+
+            # ---- one bincount over (allele, pop, locus) for the whole chunk
+            A = len(codes)
+            valid = G > 0
+            a_idx = np.searchsorted(codes, G[valid])
+            k_idx = np.broadcast_to(row_pop[:, None], G.shape)[valid]
+            l_idx = np.broadcast_to(np.arange(n_data), G.shape)[valid]
+            flat = (a_idx * K + k_idx) * L + l_idx
+            counts += np.bincount(flat, minlength=A * K * L).reshape(A, K, L)
+
+    return loci, pops, codes, counts
+
+
+def stru_metrics(counts: np.ndarray, w: np.ndarray, compute_Ia: bool):
+    """I_n, I_a, ORCA[1-allele] and ORCA[2-allele] from allele counts."""
+    A, K, L = counts.shape
+    sampsize = counts.sum(axis=0)  # K × L
+    rel = counts / np.where(sampsize > 0, sampsize, 1)  # A × K × L
+    wrel = w[None, :, None] * rel
+    pbar = wrel.sum(axis=1)  # A × L
+
+    In = -xlogx(pbar).sum(axis=0) + (w[None, :, None] * xlogx(rel)).sum(axis=(0, 1))
+    orca1 = wrel.max(axis=1).sum(axis=0)
+    orca2 = np.zeros(L)
+    for a in range(A):
+        orca2 += (wrel[a][None, :, :] * rel).max(axis=1).sum(axis=0)
+
+    Ia = None
+    if compute_Ia:
+        H_K, _, _ = Ia_constants(K)
+        a_idx, l_idx = np.nonzero(pbar > 0)
+        X = rel[a_idx, :, l_idx]  # observed (allele, locus) pairs × K
+        pj = pbar[a_idx, l_idx]
+        term = pj * (1.0 - np.log(pj) - H_K) + phi_divided_difference(X) / K
+        Ia = np.bincount(l_idx, weights=term, minlength=L)
+        # I_a ≥ 0 and is exactly 0 for a monomorphic locus; drop the
+        # quadrature round‑off (about 1e-14) there
+        Ia[(pbar > 0).sum(axis=0) <= 1] = 0.0
+        np.maximum(Ia, 0.0, out=Ia)
+
+    return In, Ia, orca1, orca2
+
+
+def run_stru(args):
+    loci, pops, codes, counts = read_stru_counts(
+        args.stru, args.column - 1, args.label_cols
+    )
+    K = len(pops)
+    if K != args.numpops:
+        sys.exit(
+            "number of populations detected is not the same as in --numpops.\n"
+            "    (1) Check that --numpops reflects the correct number of\n"
+            "        populations in the appropriate column of the data file.\n"
+            "    (2) Check that the correct column was specified in --column."
+        )
+
+    if args.weightfile:
+        weights = read_weightfile(args.weightfile)
+        missing = [p for p in pops if p not in weights]
+        if missing:
+            sys.exit(f"populations missing from weightfile: {' '.join(missing)}")
+        w = np.array([weights[p] for p in pops])
+        if ((w < 0) | (w >= 1)).any():
+            sys.exit("population weights must lie in [0,1)")
+    else:
+        w = np.full(K, 1.0 / K)
+    uniform = bool(np.all(w * K == 1))
+
+    In, Ia, orca1, orca2 = stru_metrics(counts, w, compute_Ia=uniform)
+
+    # infocalc.pl only reports loci with at least one observed allele and
+    # prints them in string‑sorted order
+    observed = counts.sum(axis=(0, 1)) > 0
+    order = sorted((loci[l], l) for l in np.nonzero(observed)[0])
+
+    with open(args.outfile, "w") as fh:
+        fh.write("%10s\t%10s\t%10s\t" % ("Locus", "I_n", "I_a"))
+        fh.write("ORCA[1-allele]\tORCA[2-allele]\n")
+        fh.writelines(
+            "%10s\t%10g\t%s\t%10g\t%10g\n"
+            % (
+                name,
+                In[l],
+                "%10g" % Ia[l] if Ia is not None else "%10s" % "NA",
+                orca1[l],
+                orca2[l],
+            )
+            for name, l in order
+        )
+        fh.write(
+            "Command:             "
+            f"infocalc.py    --column {args.column}    "
+            f"--numpops {args.numpops}    "
+            f"--stru {args.stru}    "
+            f"--outfile {args.outfile}    "
+            f"--weightfile {args.weightfile or '[none]'}\n"
+        )
+        fh.write("PriorWeights:    ")
+        for p in sorted(pops):
+            fh.write("%s %g     " % (p, w[pops.index(p)]))
+        fh.write("\n")
+
+    print(f"Done → {args.outfile}   (L={len(order)}, K={K}, alleles={len(codes)})")
+
+
+# ------------------------------------------- locus metrics (one block)
+
+
+def locus_metrics(P: np.ndarray, q: np.ndarray):
+    """(In, Ia, ORCA) for every row of a .P block."""
+    return In_loci(P, q), Ia_loci_uniform(P), orca_diploid_loci(P, q)
+
+
+# ------------------------------------------- multi‑K batch mode
+
+
+def find_pq_pairs(spec: str) -> dict:
+    """
+    K → (.P, .Q or None) for a directory or glob of ADMIXTURE outputs.
+
+    K is read from the number of .P columns; the .Q is the file with the
+    same name and a .Q suffix. K = 1 is skipped (every metric is 0) and,
+    when several replicates share a K, the first in name order is used.
+    """
+    paths = sorted(glob.glob(os.path.join(spec, "*.P") if os.path.isdir(spec) else spec))
+    pairs = {}
+    for pfile in paths:
+        K = n_columns(pfile)
+        if K < 2:
+            continue
+        if K in pairs:
+            print(f"K={K}: using {pairs[K][0]}, ignoring {pfile}")
+            continue
+        qfile = pfile[:-2] + ".Q" if pfile.endswith(".P") else None
+        pairs[K] = (pfile, qfile if qfile and os.path.exists(qfile) else None)
+    if not pairs:
+        sys.exit(f"no ADMIXTURE .P files with K ≥ 2 found in {spec}")
+    return dict(sorted(pairs.items()))
+
+
+def rank_stability(table: dict, Ks: list, top_n: int) -> list:
+    """Kendall τ and top‑N overlap of each metric between consecutive K."""
+    from scipy.stats import kendalltau
+
+    rows = []
+    for metric in ("In", "Ia", "ORCA"):
+        for K1, K2 in zip(Ks, Ks[1:]):
+            a, b = table[f"{metric}_K{K1}"], table[f"{metric}_K{K2}"]
+            tau = kendalltau(a, b).statistic
+            n = min(top_n, len(a))
+            top_a = np.argpartition(-a, n - 1)[:n]
+            top_b = np.argpartition(-b, n - 1)[:n]
+            overlap = len(np.intersect1d(top_a, top_b)) / n if n else float("nan")
+            rows.append((metric, K1, K2, tau, overlap))
+    return rows
+
+
+def run_batch(args):
+    pairs = find_pq_pairs(args.pbatch)
+    Ks = list(pairs)
+
+    order = sorted(Ks, reverse=True)  # largest K first so it never trails
+    priors = {}
+    for K in order:
+        pfile, qfile = pairs[K]
+        priors[K] = load_priors(qfile, K)
+        print(f"K={K}: {os.path.basename(pfile)}  "
+              f"({'priors from ' + os.path.basename(qfile) if qfile else 'uniform priors'})")
+
+    # ---- one task per (K, row block): .P blocks are streamed here and at
+    # most 4 per worker are in flight, so memory is bounded by --chunk-size
+    parts = {K: [] for K in Ks}
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=args.threads) as pool:
+        for K in order:
+            for P in iter_blocks(pairs[K][0], args.chunk_size):
+                pending.append((K, pool.submit(locus_metrics, P, priors[K])))
+                if len(pending) >= 4 * args.threads:
+                    k, fut = pending.popleft()
+                    parts[k].append(fut.result())
+        while pending:
+            k, fut = pending.popleft()
+            parts[k].append(fut.result())
+
+    table = {}
+    L = None
+    for K in Ks:
+        n = sum(len(p[0]) for p in parts[K])
+        if L is None:
+            L = n
+        elif n != L:
+            sys.exit(f"{pairs[K][0]} has {n} loci, expected {L}")
+        for i, m in enumerate(("In", "Ia", "ORCA")):
+            table[f"{m}_K{K}"] = np.concatenate([p[i] for p in parts[K]] or [np.empty(0)])
+
+    # ---- wide per‑K table
+    cols = list(table)
+    with open(args.outfile, "w") as fh:
+        fh.write("locus_idx\t" + "\t".join(cols) + "\n")
+        block = np.column_stack([table[c] for c in cols])
+        fh.writelines(
+            f"{i}\t" + "\t".join(f"{v:.10g}" for v in row) + "\n"
+            for i, row in enumerate(block)
+        )
+
+    # ---- cross‑K rank stability
+    with open(args.summary, "w") as fh:
+        fh.write(f"metric\tK_from\tK_to\tkendall_tau\ttop{args.top_n}_overlap\n")
+        for metric, K1, K2, tau, overlap in rank_stability(table, Ks, args.top_n):
+            fh.write(f"{metric}\t{K1}\t{K2}\t{tau:.6g}\t{overlap:.6g}\n")
+
+    print(f"Done → {args.outfile}, {args.summary}   (L={L}, K={Ks})")
 
 
 # ------------------------------------------------------------- main
@@ -115,50 +485,94 @@ def orca_diploid(p_vec: np.ndarray, q: np.ndarray) -> float:
 
 def main():
     ap = argparse.ArgumentParser(
-        description="Compute In, Ia and diploid ORCA from ADMIXTURE .P/.Q"
+        description="Compute In, Ia and diploid ORCA from ADMIXTURE .P/.Q "
+        "or from a STRUCTURE genotype file"
+    )
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--pfile", help=".P file (L × K)")
+    src.add_argument("--stru", help="two‑line STRUCTURE file (genotype mode)")
+    src.add_argument(
+        "--pbatch",
+        help="Directory or quoted glob of .P/.Q pairs, one per K (batch mode)",
     )
-    ap.add_argument("--pfile", required=True, help=".P file (L × K)")
     ap.add_argument("--qfile", help=".Q file (N × K) – optional")
     ap.add_argument("--outfile", default="infocalc.tsv")
+    ap.add_argument(
+        "--numpops", type=int, help="Number of populations (genotype mode)"
+    )
+    ap.add_argument(
+        "--column",
+        type=int,
+        default=3,
+        help="1‑based column holding the population label (genotype mode, default: 3)",
+    )
+    ap.add_argument(
+        "--label-cols",
+        type=int,
+        default=5,
+        help="Number of label columns before the genotypes (genotype mode, default: 5)",
+    )
+    ap.add_argument("--weightfile", help="Population prior weights (genotype mode)")
+    ap.add_argument(
+        "--chunk-size",
+        type=int,
+        default=50000,
+        help="Number of .P rows processed per block (default: 50000)",
+    )
+    ap.add_argument(
+        "--threads",
+        type=int,
+        default=os.cpu_count(),
+        help="Worker processes in batch mode (default: all CPUs)",
+    )
+    ap.add_argument(
+        "--summary",
+        default="infocalc_stability.tsv",
+        help="Cross‑K rank‑stability table (batch mode)",
+    )
+    ap.add_argument(
+        "--top-n",
+        type=int,
+        default=500,
+        help="Top‑N size for the cross‑K overlap (batch mode, default: 500)",
+    )
     args = ap.parse_args()
 
-    # ---- read .P
-    P = np.loadtxt(args.pfile)
-    L, K = P.shape
+    if args.pbatch:
+        run_batch(args)
+        return
+
+    if args.stru:
+        if args.numpops is None:
+            ap.error("--stru requires --numpops")
+        if not 1 <= args.column <= args.label_cols:
+            ap.error("--column must lie within the --label-cols label columns")
+        run_stru(args)
+        return
+
+    # ---- .P is read in blocks; peek at the first row for K
+    K = n_columns(args.pfile)
 
     # ---- population priors q_i
+    q = load_priors(args.qfile, K)
     if args.qfile:
-        Q = np.loadtxt(args.qfile)
-        if Q.shape[1] != K:
-            sys.exit(".Q columns ≠ K clusters in .P")
-        q = Q.mean(axis=0)
-        q /= q.sum()
         print("Priors from .Q (mean of rows)")
     else:
-        q = np.full(K, 1.0 / K)
         print("Using uniform priors (no .Q provided)")
 
-    q_uniform = np.full(K, 1.0 / K)
-
-    # ---- allocate result arrays
-    In_vals = np.empty(L)
-    Ia_vals = np.empty(L)
-    ORCA_vals = np.empty(L)
-
-    # ---- compute per locus
-    for i in range(L):
-        p_vec = P[i]
-        In_vals[i] = In_locus(p_vec, q)
-        Ia_vals[i] = Ia_locus_uniform(p_vec)
-        ORCA_vals[i] = orca_diploid(p_vec, q)  # same priors as In
-
-    # ---- write TSV
+    # ---- compute and write block by block
+    L = 0
     with open(args.outfile, "w") as fh:
         fh.write("locus_idx\tIn\tIa\tORCA\n")
-        for idx in range(L):
-            fh.write(
-                f"{idx}\t{In_vals[idx]:.10g}\t{Ia_vals[idx]:.10g}\t{ORCA_vals[idx]:.10g}\n"
+        for P in iter_blocks(args.pfile, args.chunk_size):
+            if P.shape[1] != K:
+                sys.exit(f".P rows {L}–{L + len(P)} do not have K={K} columns")
+            In_vals, Ia_vals, ORCA_vals = locus_metrics(P, q)  # ORCA uses In's q
+            fh.writelines(
+                f"{L + j}\t{a:.10g}\t{b:.10g}\t{c:.10g}\n"
+                for j, (a, b, c) in enumerate(zip(In_vals, Ia_vals, ORCA_vals))
             )
+            L += len(P)
 
     print(f"Done → {args.outfile}   (L={L}, K={K})")
     print("q_i priors:", " ".join(f"{x:.4f}" for x in q))
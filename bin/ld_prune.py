@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+ld_prune.py
+===========
+
+Windowed LD pruning of the filtered VCF before ADMIXTURE, in the manner of
+PLINK `--indep-pairwise <window> <step> <r2>`.
+
+Genotypes come from the `.gstore` of `SNPIO_FILTER` (kept samples only).
+Each site's dosages are centred and scaled to unit length, with missing
+calls set to the site mean, so r between two sites is a dot product. On
+each chromosome the r² of every pair less than `--window` sites apart is
+computed in row blocks, one matrix product per block of unpacked sites, and
+kept as a band (sites × window). A window of `--window` sites then slides
+by `--step`; inside it, whenever two remaining sites have r² > `--r2`, the
+one with the lower minor allele frequency is removed (the later one on a
+tie).
+
+Chromosomes are grouped into tasks of similar size and run on a process
+pool (`--threads`). Output:
+
+* `<prefix>.vcf`           – records of the input VCF that were kept
+* `<prefix>.prune.out`     – removed sites (CHROM, POS, partner POS, r²)
+* `<prefix>_report.tsv`    – per chromosome: sites, kept, removed
+
+```bash
+python ld_prune.py --vcf filtered.vcf.gz --store filtered.gstore \\
+        --window 50 --step 5 --r2 0.2 --threads 4 --prefix filtered_pruned
+```
+"""
+
+import argparse, gzip, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from genostore import MISSING, GenoStore, read_vcf_sites, unpack
+
+
+def standardise(codes: np.ndarray):
+    """2‑bit codes (sites × samples) → unit‑length centred dosages, MAF."""
+    called = codes != MISSING
+    g = np.where(called, codes, 0).astype(np.float64)
+    n = np.maximum(called.sum(axis=1), 1)
+    mean = g.sum(axis=1) / n
+    z = np.where(called, g - mean[:, None], 0.0)
+    norm = np.sqrt((z * z).sum(axis=1))
+    z /= np.where(norm > 0, norm, 1.0)[:, None]
+    p = mean / 2.0
+    return z.astype(np.float32), np.minimum(p, 1.0 - p)
+
+
+def r2_band(gs: GenoStore, sites: np.ndarray, samples: np.ndarray, window: int, block: int = 2048):
+    """
+    band[i, d-1] = r²(i, i+d) for d = 1 … window-1 (0 past the end), and
+    the MAF of each site. Only `block + window` sites are unpacked at a time.
+    """
+    n = sites.size
+    w = window - 1
+    band = np.zeros((n, w), dtype=np.float32)
+    maf = np.empty(n)
+    offsets = np.arange(1, window)
+    for s in range(0, n, block):
+        e = min(s + block, n)
+        hi = min(e + w, n)
+        z, m = standardise(unpack(gs.packed[sites[s:hi]], gs.n_samples)[:, samples])
+        maf[s:e] = m[: e - s]
+        r = z[: e - s] @ z.T  # (e-s) × (hi-s)
+        rows = np.arange(e - s)[:, None]
+        col = rows + offsets[None, :]
+        valid = col < hi - s
+        band[s:e] = np.where(valid, r[rows, np.minimum(col, hi - s - 1)], 0.0) ** 2
+    return band, maf
+
+
+def prune(band: np.ndarray, maf: np.ndarray, window: int, step: int, threshold: float):
+    """Kept mask and (removed, partner, r²) of the sliding‑window pass."""
+    n = maf.size
+    kept = np.ones(n, dtype=bool)
+    removed = []
+    for s in range(0, n, step):
+        e = min(s + window, n)
+        w = s + np.flatnonzero(kept[s:e])
+        if w.size > 1:
+            off = w[None, :] - w[:, None]
+            m = np.where(off > 0, band[w[:, None], np.clip(off - 1, 0, window - 2)], 0.0)
+            for a, b in np.argwhere(m > threshold):
+                i, j = w[a], w[b]
+                if kept[i] and kept[j]:
+                    drop, other = (i, j) if maf[i] < maf[j] else (j, i)
+                    kept[drop] = False
+                    removed.append((drop, other, float(m[a, b])))
+        if e == n:
+            break
+    return kept, removed
+
+
+def prune_task(task):
+    """Prune a group of chromosomes; returns (kept sites, removed, per‑chrom rows)."""
+    store, groups, samples, window, step, threshold = task
+    gs = GenoStore(store)
+    kept_all, removed_all, rows = [], [], []
+    for chrom, sites in groups:
+        if sites.size > 1:
+            band, maf = r2_band(gs, sites, samples, window)
+            kept, removed = prune(band, maf, window, step, threshold)
+        else:
+            kept, removed = np.ones(sites.size, dtype=bool), []
+        kept_all.append(sites[kept])
+        removed_all += [(sites[i], sites[j], r2) for i, j, r2 in removed]
+        rows.append({"CHROM": chrom, "Sites": sites.size, "Kept": int(kept.sum()), "Removed": len(removed)})
+    return np.concatenate(kept_all), removed_all, rows
+
+
+def split_tasks(chroms: np.ndarray, n_tasks: int):
+    """Contiguous chromosome groups of similar site count."""
+    codes, names = pd.factorize(chroms)
+    groups = [(names[c], np.flatnonzero(codes == c)) for c in range(len(names))]
+    target = max(1, chroms.size // max(n_tasks, 1))
+    tasks, current, size = [], [], 0
+    for g in groups:
+        current.append(g)
+        size += g[1].size
+        if size >= target:
+            tasks.append(current)
+            current, size = [], 0
+    if current:
+        tasks.append(current)
+    return tasks
+
+
+def write_vcf(vcf: str, keep: np.ndarray, output: str):
+    opener = gzip.open if vcf.endswith(".gz") else open
+    i = 0
+    with opener(vcf, "rt") as fh, open(output, "w") as out:
+        for line in fh:
+            if line.startswith("#"):
+                out.write(line)
+                continue
+            if keep[i]:
+                out.write(line)
+            i += 1
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Windowed LD pruning (r²) of a VCF using its .gstore")
+    ap.add_argument("--vcf", required=True, help="Filtered VCF (.vcf or .vcf.gz)")
+    ap.add_argument("--store", required=True, help=".gstore of the SNPio filter step")
+    ap.add_argument("--window", type=int, default=50, help="Window size in sites (default: 50)")
+    ap.add_argument("--step", type=int, default=5, help="Window step in sites (default: 5)")
+    ap.add_argument("--r2", type=float, default=0.2, help="r² threshold (default: 0.2)")
+    ap.add_argument("--threads", type=int, default=1, help="Worker processes (default: 1)")
+    ap.add_argument("--prefix", default="pruned", help="Output prefix")
+    args = ap.parse_args()
+    if args.window < 2 or args.step < 1:
+        sys.exit("--window must be ≥ 2 and --step ≥ 1")
+
+    t0 = time.time()
+    gs = GenoStore(args.store)
+    sites = gs.select_sites(read_vcf_sites(args.vcf))
+    samples = gs.kept_samples()
+    chroms = gs.sites["CHROM"].to_numpy()[sites]
+    print(f"{sites.size} sites × {samples.size} samples, window {args.window}, step {args.step}, r² > {args.r2}")
+
+    # Work in VCF record order: task groups hold record numbers, mapped to store sites
+    tasks = []
+    for group in split_tasks(chroms, 4 * args.threads):
+        tasks.append(
+            (args.store, [(c, sites[idx]) for c, idx in group], samples, args.window, args.step, args.r2)
+        )
+    if args.threads > 1:
+        with ProcessPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(prune_task, tasks))
+    else:
+        results = [prune_task(t) for t in tasks]
+
+    kept_sites = np.concatenate([k for k, _, _ in results])
+    keep = np.isin(sites, kept_sites)
+    write_vcf(args.vcf, keep, f"{args.prefix}.vcf")
+
+    pos = gs.sites["POS"].to_numpy()
+    removed = [r for _, rem, _ in results for r in rem]
+    pd.DataFrame(
+        {
+            "CHROM": gs.sites["CHROM"].to_numpy()[[r[0] for r in removed]],
+            "POS": pos[[r[0] for r in removed]],
+            "PARTNER_POS": pos[[r[1] for r in removed]],
+            "R2": [r[2] for r in removed],
+        }
+    ).to_csv(f"{args.prefix}.prune.out", sep="\t", index=False, float_format="%.4f")
+    report = pd.DataFrame([row for _, _, rows in results for row in rows])
+    report.to_csv(f"{args.prefix}_report.tsv", sep="\t", index=False)
+
+    print(f"Done → {args.prefix}.vcf   ({keep.sum()} of {sites.size} sites kept, {time.time() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
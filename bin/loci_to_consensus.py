@@ -1,18 +1,28 @@
 #!/usr/bin/env python3
 import argparse
+import gzip
 import numpy as np
 import re
+import sys
+from collections import deque
+from itertools import islice
 from multiprocessing import Pool, cpu_count
 
 
+def open_loci(filepath):
+    """Open a .loci file, transparently decompressing .loci.gz."""
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, "rt")
+    return open(filepath)
+
+
 def parse_loci_file(filepath):
-    """Parse .loci file into list of (index, [sequences]) tuples."""
-    alignments = []
+    """Yield (index, [sequences]) tuples from a .loci file, one locus at a time."""
     current_locus = []
     index = 0
     idx_regex = re.compile(r"\|(\d+)\|$")
 
-    with open(filepath) as f:
+    with open_loci(filepath) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -24,7 +34,7 @@ def parse_loci_file(filepath):
                 else:
                     raise ValueError(f"Could not parse index from line: {line}")
                 if current_locus:
-                    alignments.append((index, current_locus))
+                    yield index, current_locus
                     current_locus = []
             else:
                 parts = line.split(maxsplit=1)
@@ -32,33 +42,76 @@ def parse_loci_file(filepath):
                     _, seq = parts
                     current_locus.append(seq.replace(">", "").strip())
 
-    return alignments
-
 
-def compute_consensus(index_and_sequences):
-    """Return (index, consensus sequence) for one locus."""
-    index, sequences = index_and_sequences
-    arr = np.array([list(seq) for seq in sequences], dtype="U1")
-    consensus = []
+def batched(iterable, size):
+    """Yield lists of up to `size` consecutive items."""
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
 
-    for col in arr.T:
-        mask = (col != "-") & (col != "N") & (col != "n")
-        filtered = col[mask]
-        if filtered.size == 0:
-            consensus.append("N")
-        else:
-            values, counts = np.unique(filtered, return_counts=True)
-            consensus.append(values[np.argmax(counts)])
 
-    return index, "".join(consensus)
+# Bytes that never vote in a consensus column: gap, N and n
+MASKED = np.frombuffer(b"-Nn", dtype=np.uint8)
 
 
-def write_fasta(consensus_dict, prefix, output_path):
-    lines = []
-    for index in sorted(consensus_dict):
-        lines.append(f">{prefix}_{index}\n{consensus_dict[index]}")
+def compute_consensus(index_and_sequences):
+    """Return (index, consensus sequence) for one locus."""
+    index, sequences = index_and_sequences
+    width = len(sequences[0])
+    if any(len(seq) != width for seq in sequences):
+        raise ValueError(f"Locus {index}: sequences are not aligned to equal length")
+    raw = "".join(sequences).encode("ascii")
+    arr = np.frombuffer(raw, dtype=np.uint8).reshape(len(sequences), -1)
+    ncol = arr.shape[1]
+
+    # Count every byte value in every column in one pass: column c, byte b
+    # lands in bin c*256 + b. Ties go to the lowest byte (A < C < G < T),
+    # as np.unique + argmax did.
+    bins = arr + np.arange(0, ncol * 256, 256, dtype=np.intp)
+    counts = np.bincount(bins.ravel(), minlength=ncol * 256).reshape(ncol, 256)
+    counts[:, MASKED] = 0
+
+    consensus = counts.argmax(axis=1).astype(np.uint8)
+    consensus[counts.max(axis=1) == 0] = ord("N")
+    return index, consensus.tobytes().decode("ascii")
+
+
+def consensus_batch(batch):
+    """compute_consensus for a list of loci (one pool task)."""
+    return [compute_consensus(item) for item in batch]
+
+
+def ordered_results(pool, batches, depth):
+    """
+    Consensus records of every batch in input order, with at most `depth`
+    batches submitted and not yet written. A worker error is raised here.
+    """
+    pending = deque()
+    for batch in batches:
+        pending.append(pool.apply_async(consensus_batch, (batch,)))
+        if len(pending) >= depth:
+            yield from pending.popleft().get()
+    while pending:
+        yield from pending.popleft().get()
+
+
+def write_fasta(records, prefix, output_path):
+    """Write (index, consensus) records in arrival order; return the count."""
+    n = 0
+    last = -1
     with open(output_path, "w") as out:
-        out.write("\n".join(lines) + "\n")
+        for index, seq in records:
+            if index <= last >= 0:
+                print(
+                    f"⚠️  Locus {index} follows {last}; loci are written in file order",
+                    file=sys.stderr,
+                )
+                last = -2  # warn once
+            elif last != -2:
+                last = index
+            out.write(f">{prefix}_{index}\n{seq}\n")
+            n += 1
+    return n
 
 
 def main():
@@ -71,16 +124,24 @@ def main():
     parser.add_argument(
         "--threads", type=int, default=cpu_count(), help="Number of processes to use"
     )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=64,
+        help="Loci sent to a worker per task (default: 64)",
+    )
 
     args = parser.parse_args()
 
-    loci = parse_loci_file(args.input)
+    # Loci stream from the parser through the pool to the writer in file
+    # order. At most 4 chunks per worker are in flight, so peak memory
+    # depends on --chunksize and --threads, not on the catalog size. The
+    # main thread does the throttling, so a failing locus ends the run.
+    batches = batched(parse_loci_file(args.input), args.chunksize)
 
     with Pool(processes=args.threads) as pool:
-        results = pool.map(compute_consensus, loci)
-
-    consensus_dict = dict(results)
-    write_fasta(consensus_dict, args.prefix, args.output)
+        results = ordered_results(pool, batches, 4 * args.threads)
+        write_fasta(results, args.prefix, args.output)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+panel_curve.py
+==============
+
+Assignment accuracy as a function of panel size, from one pipeline run.
+
+The ranked loci of `RANK_LOCI` (or `PANEL_OPTIMIZER`) are taken in order
+and nested panels of the first 25, 50, 100, … `--max-size` loci are scored
+on individuals simulated from the best‑K ADMIXTURE solution:
+
+* each simulated individual takes the ancestry vector q of a sample drawn
+  from the `.Q` file, and its genotypes are drawn from Binomial(2, q·P);
+* **accuracy** – share of individuals whose maximum‑likelihood source
+  cluster (pure clusters, HWE) is their majority ancestry cluster;
+* **Q r / RMSE** – Pearson correlation and RMSE between the true q and
+  the q re‑estimated from the panel loci with `.P` fixed (the EM of
+  `project_q.py`).
+
+All sizes of one replicate are scored in a single batched pass: the
+per‑locus log‑likelihoods are accumulated once and read off at every size,
+and Q is re‑estimated for every size at once by masking the loci beyond
+each size. Replicates (split further into size blocks when there are more
+workers than replicates) run on a process pool, each with its own stream
+of a `SeedSequence` so results do not depend on `--threads`.
+
+Output: `<prefix>.tsv` (mean and s.d. over replicates per size) and
+`<prefix>_mqc.html`, a MultiQC custom‑content line plot.
+
+```bash
+python panel_curve.py --pfile mydata.5.P --qfile mydata.5.Q \\
+        --map mydata.map --vcf candidates.vcf.gz --top-loci top_loci.txt \\
+        --max-size 500 --replicates 10 --threads 4 --template header.html
+```
+"""
+
+import argparse, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+from admixio import read_matrix
+from panel_optimizer import EPS, align_to_vcf
+from project_q import project
+from render_report import build_comment, figure_html, parse_template
+
+
+def default_sizes(max_size: int, start: int = 25) -> list:
+    """25, 50, 100, … doubling, always ending at max_size."""
+    sizes, s = [], start
+    while s < max_size:
+        sizes.append(s)
+        s *= 2
+    return sizes + [max_size]
+
+
+def ranked_rows(top_loci: str, mapfile: str, vcf: str, L: int) -> np.ndarray:
+    """.P rows of the ranked loci, in rank order (Index = candidate VCF record)."""
+    rows, vcf_idx = align_to_vcf(mapfile, vcf, L)
+    row_of = dict(zip(vcf_idx.tolist(), rows.tolist()))
+    ranked = pd.read_csv(top_loci, sep="\t")["Index"].astype(int)
+    out = [row_of[i] for i in ranked if i in row_of]
+    if len(out) < len(ranked):
+        print(f"⚠️  {len(ranked) - len(out)} ranked loci not in {mapfile}", file=sys.stderr)
+    return np.asarray(out, dtype=np.int64)
+
+
+def score_replicate(task):
+    """Accuracy, Q r and Q RMSE of one replicate for a block of sizes."""
+    P, Q_src, sizes, n_sim, seed, max_iter, tol = task
+    rng = np.random.default_rng(seed)
+    L, K = P.shape
+
+    q = Q_src[rng.integers(0, Q_src.shape[0], n_sim)]
+    G = rng.binomial(2, np.clip(q @ P.T, 0.0, 1.0)).astype(np.int8)
+    truth = q.argmax(axis=1)
+
+    # Pure‑cluster log‑likelihoods, accumulated over the ranked loci
+    p = np.clip(P, EPS, 1.0 - EPS)
+    logp, log1mp = np.log(p), np.log1p(-p)
+    ll = G[:, :, None] * logp[None] + (2 - G)[:, :, None] * log1mp[None]
+    cum = np.cumsum(ll, axis=1)  # n_sim × L × K
+    accuracy = [(cum[:, s - 1].argmax(axis=1) == truth).mean() for s in sizes]
+
+    # Q for every size at once: loci beyond each size are masked
+    n = len(sizes)
+    G_all = np.tile(G, (n, 1))
+    called = np.zeros((n * n_sim, L), dtype=bool)
+    for b, s in enumerate(sizes):
+        called[b * n_sim : (b + 1) * n_sim, :s] = True
+    Q_hat, _, _ = project(G_all, called, P, max_iter, tol)
+
+    q_r, rmse = [], []
+    for b in range(n):
+        est = Q_hat[b * n_sim : (b + 1) * n_sim]
+        q_r.append(np.corrcoef(est.ravel(), q.ravel())[0, 1])
+        rmse.append(np.sqrt(np.mean((est - q) ** 2)))
+    return sizes, accuracy, q_r, rmse
+
+
+def plot_curve(summary: pd.DataFrame, output: str, header_comment: str):
+    fig = go.Figure()
+    for col, name in [("Accuracy", "Assignment accuracy"), ("Q_r", "Q correlation (r)")]:
+        fig.add_trace(
+            go.Scatter(
+                x=summary["Size"],
+                y=summary[f"{col}_mean"],
+                error_y=dict(type="data", array=summary[f"{col}_sd"], visible=True),
+                mode="lines+markers",
+                name=name,
+                marker=dict(size=8),
+                line=dict(width=2),
+            )
+        )
+    fig.update_layout(
+        title="Panel accuracy by number of loci",
+        xaxis_title="Panel size (top-ranked loci)",
+        yaxis_title="Accuracy / correlation",
+        yaxis_range=[0, 1.02],
+        template="plotly_white",
+    )
+    html = figure_html(fig)
+    with open(output, "w") as f:
+        f.write(header_comment + "\n" + html)
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Panel-size accuracy curve from ranked loci and ADMIXTURE .P/.Q"
+    )
+    ap.add_argument("--pfile", required=True, help=".P file (L × K)")
+    ap.add_argument("--qfile", required=True, help=".Q file (N × K)")
+    ap.add_argument("--map", required=True, help="PLINK .map of the ADMIXTURE run")
+    ap.add_argument("--vcf", required=True, help="Candidate VCF the ranked indices refer to")
+    ap.add_argument("--top-loci", required=True, help="Ranked loci (Index column, best first)")
+    ap.add_argument("--max-size", type=int, default=500, help="Largest panel (default: 500)")
+    ap.add_argument("--sizes", help="Comma-separated panel sizes (default: 25, 50, 100, … max)")
+    ap.add_argument("--replicates", type=int, default=10, help="Simulation replicates (default: 10)")
+    ap.add_argument(
+        "--n-sim",
+        type=int,
+        default=0,
+        help="Individuals simulated per replicate (default: number of .Q rows)",
+    )
+    ap.add_argument("--threads", type=int, default=1, help="Worker processes (default: 1)")
+    ap.add_argument("--seed", type=int, default=1, help="Random seed (default: 1)")
+    ap.add_argument("--max-iter", type=int, default=2000, help="EM iterations (default: 2000)")
+    ap.add_argument("--tol", type=float, default=1e-5, help="EM tolerance (default: 1e-5)")
+    ap.add_argument("--prefix", default="panel_curve", help="Output prefix")
+    ap.add_argument("--template", help="HTML file with the MultiQC metadata comment block")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    P_all = read_matrix(args.pfile)
+    Q_src = read_matrix(args.qfile)
+    L, K = P_all.shape
+    if Q_src.shape[1] != K:
+        sys.exit(f"{args.qfile}: .Q columns ≠ K clusters in .P")
+
+    rows = ranked_rows(args.top_loci, args.map, args.vcf, L)
+    if args.sizes:
+        sizes = sorted({int(s) for s in args.sizes.split(",")})
+    else:
+        sizes = default_sizes(min(args.max_size, rows.size))
+    sizes = [s for s in sizes if 0 < s <= rows.size]
+    if not sizes:
+        sys.exit("No panel size fits the number of ranked loci")
+    P = P_all[rows[: sizes[-1]]]
+    n_sim = args.n_sim or Q_src.shape[0]
+
+    # One task per (replicate, size block); seeds depend only on --seed
+    seeds = np.random.SeedSequence(args.seed).spawn(args.replicates)
+    blocks = max(1, min(len(sizes), -(-args.threads // args.replicates)))
+    tasks = [
+        (P, Q_src, [int(s) for s in block], n_sim, seed, args.max_iter, args.tol)
+        for seed in seeds
+        for block in np.array_split(sizes, blocks)
+    ]
+    print(f"Scoring {len(sizes)} panel sizes × {args.replicates} replicates (K={K}, {n_sim} individuals)")
+
+    records = []
+    if args.threads > 1:
+        with ProcessPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(score_replicate, tasks))
+    else:
+        results = [score_replicate(t) for t in tasks]
+    for r, (block, acc, q_r, rmse) in enumerate(results):
+        for s, a, c, e in zip(block, acc, q_r, rmse):
+            records.append({"Replicate": r // blocks, "Size": s, "Accuracy": a, "Q_r": c, "Q_RMSE": e})
+
+    per_rep = pd.DataFrame.from_records(records)
+    summary = per_rep.groupby("Size")[["Accuracy", "Q_r", "Q_RMSE"]].agg(["mean", "std"])
+    summary.columns = [f"{m}_{s.replace('std', 'sd')}" for m, s in summary.columns]
+    summary = summary.fillna(0.0).reset_index()
+    summary.to_csv(f"{args.prefix}.tsv", sep="\t", index=False, float_format="%.6g")
+
+    metadata = parse_template(args.template) if args.template else {"id": "panel_curve", "plot_type": "html"}
+    plot_curve(summary, f"{args.prefix}_mqc.html", build_comment(metadata))
+    print(summary.to_string(index=False))
+    print(f"Done → {args.prefix}.tsv, {args.prefix}_mqc.html   ({time.time() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
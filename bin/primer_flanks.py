@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+primer_flanks.py
+================
+
+Reference flanks and primer suitability of every candidate SNP.
+
+The reference FASTA is memory‑mapped, never read into RAM. Its `.fai`
+(name, length, byte offset, bases and bytes per line) is read when present
+next to the FASTA and built otherwise: headers are located with
+`mmap.find` and line layout is checked with strided views of the mapped
+bytes. A gzip/bgzip FASTA is first streamed to an uncompressed copy in the
+working directory. Base `p` of a contig is then byte
+`offset + (p // bases) * bytes + p % bases`, so the flanks of a block of
+candidates are one fancy‑indexed gather from the mapped file.
+
+For each candidate the `--flank` bases either side are extracted
+(upper‑cased, `N` past the contig ends); every other variant of `--variants`
+(the unfiltered input VCF) that falls inside them is masked with its IUPAC
+code (`N` for each base of an indel). Per flank the GC fraction, longest
+homopolymer, masked variants and `N`s are computed on the whole block at
+once. A candidate is primer‑suitable (`Primer_ok`) when the reference base
+matches REF, both flanks are free of variants and `N`s, GC lies within
+`--gc-min`–`--gc-max` and no homopolymer is longer than `--max-homopolymer`.
+
+Output: `<prefix>_flanks.tsv`, one row per candidate VCF record (`Index`
+as in `locus_metrics.txt`; grouped by contig, written a block at a time),
+with the flanks, `Sequence` as `left[REF/ALT]right` and the metrics.
+
+```bash
+python primer_flanks.py --vcf candidates.vcf.gz --variants input.vcf.gz \\
+        --reference genome.fa --flank 75 --prefix candidates
+```
+"""
+
+import argparse, gzip, mmap, os, shutil, sys, time
+import numpy as np
+import pandas as pd
+
+IUPAC = {
+    frozenset("A"): "A", frozenset("C"): "C", frozenset("G"): "G", frozenset("T"): "T",
+    frozenset("AG"): "R", frozenset("CT"): "Y", frozenset("CG"): "S", frozenset("AT"): "W",
+    frozenset("GT"): "K", frozenset("AC"): "M", frozenset("CGT"): "B", frozenset("AGT"): "D",
+    frozenset("ACT"): "H", frozenset("ACG"): "V",
+}
+N = ord("N")
+GC = np.zeros(256, dtype=bool)
+GC[[ord("G"), ord("C")]] = True
+ACGT = np.zeros(256, dtype=bool)
+ACGT[[ord(b) for b in "ACGT"]] = True
+
+
+def open_text(path: str):
+    return gzip.open(path, "rt") if path.endswith(".gz") else open(path)
+
+
+# ------------------------------------------------ reference
+
+
+def plain_fasta(path: str) -> str:
+    """Path of an uncompressed FASTA; gzip/bgzip input is streamed to disk."""
+    with open(path, "rb") as fh:
+        if fh.read(2) != b"\x1f\x8b":
+            return path
+    out = os.path.basename(path)
+    out = out[:-3] if out.endswith(".gz") else out + ".fa"
+    if os.path.abspath(out) == os.path.abspath(path):
+        out += ".fa"
+    with gzip.open(path, "rb") as src, open(out, "wb") as dst:
+        shutil.copyfileobj(src, dst, 16 << 20)
+    print(f"Decompressed {path} → {out}")
+    return out
+
+
+def build_fai(mm: mmap.mmap) -> pd.DataFrame:
+    """`.fai` rows of a mapped FASTA, checking that line widths are uniform."""
+    arr = np.frombuffer(mm, dtype=np.uint8)
+    rows = []
+    if mm[:1] != b">":
+        sys.exit("Reference is not a FASTA file (must start with a '>' header)")
+    head = 0
+    while head >= 0:
+        eol = mm.find(b"\n", head)
+        eol = len(mm) if eol < 0 else eol
+        name = mm[head + 1 : eol].split()[0].decode()
+        start = eol + 1
+        nxt = mm.find(b"\n>", eol)
+        stop = len(mm) if nxt < 0 else nxt + 1
+        # Sequence bytes without trailing line breaks
+        end = stop
+        while end > start and arr[end - 1] in (10, 13, 32):
+            end -= 1
+        first = mm.find(b"\n", start, end)
+        if first < 0:  # one line
+            width = end - start + 1
+            bases = end - start
+        else:
+            width = first - start + 1
+            bases = width - (2 if arr[first - 1] == 13 else 1)
+        size = end - start
+        full = size // width if width else 0
+        length = full * bases + size % width if width else 0
+        breaks = 0
+        for s in range(start, end, 1 << 26):
+            breaks += int(np.count_nonzero(arr[s : min(s + (1 << 26), end)] == 10))
+        if full and (breaks != full or not (arr[start + width - 1 : end : width] == 10).all()):
+            sys.exit(f"Reference contig {name}: lines of different length (cannot index)")
+        rows.append((name, length, start, bases, width))
+        head = -1 if nxt < 0 else nxt + 1
+    return pd.DataFrame(rows, columns=["name", "length", "offset", "linebases", "linewidth"])
+
+
+def read_fai(fasta: str, mm: mmap.mmap) -> pd.DataFrame:
+    fai = fasta + ".fai"
+    if os.path.exists(fai) and os.path.getmtime(fai) >= os.path.getmtime(fasta):
+        return pd.read_csv(
+            fai, sep="\t", header=None, usecols=range(5), dtype={0: str},
+            names=["name", "length", "offset", "linebases", "linewidth"],
+        )
+    index = build_fai(mm)
+    try:
+        index.to_csv(fai, sep="\t", header=False, index=False)
+    except OSError:
+        pass
+    return index
+
+
+# ------------------------------------------------ variants
+
+
+def read_records(path: str):
+    """CHROM, POS, REF, ALT of every VCF record, in file order."""
+    chrom, pos, ref, alt = [], [], [], []
+    with open_text(path) as fh:
+        for line in fh:
+            if line.startswith("#"):
+                continue
+            f = line.split("\t", 5)
+            chrom.append(f[0])
+            pos.append(int(f[1]))
+            ref.append(f[3])
+            alt.append(f[4])
+    return np.asarray(chrom, dtype=object), np.asarray(pos, dtype=np.int64), ref, alt
+
+
+def mask_codes(ref: list, alt: list, pos: np.ndarray):
+    """Masked positions and their IUPAC code (every base of an indel is N)."""
+    out_pos, out_code = [], []
+    for p, r, a in zip(pos, ref, alt):
+        alleles = [r] + a.split(",")
+        if all(len(x) == 1 for x in alleles):
+            out_pos.append(p)
+            out_code.append(ord(IUPAC.get(frozenset(alleles), "N")))
+        else:
+            out_pos.extend(range(p, p + len(r)))
+            out_code.extend([N] * len(r))
+    return np.asarray(out_pos, dtype=np.int64), np.asarray(out_code, dtype=np.uint8)
+
+
+def variant_index(path: str) -> dict:
+    """Per contig: sorted masked positions and IUPAC codes."""
+    chrom, pos, ref, alt = read_records(path)
+    index = {}
+    codes, names = pd.factorize(chrom)
+    for c, name in enumerate(names):
+        m = np.flatnonzero(codes == c)
+        p, k = mask_codes([ref[i] for i in m], [alt[i] for i in m], pos[m])
+        order = np.argsort(p, kind="stable")
+        index[name] = (p[order], k[order])
+    return index
+
+
+# ------------------------------------------------ flanks and metrics
+
+
+def gather(arr: np.ndarray, fai_row, pos: np.ndarray, flank: int) -> np.ndarray:
+    """Upper‑case bases pos−flank … pos+flank (1‑based pos), N off the contig."""
+    p = pos[:, None] - 1 + np.arange(-flank, flank + 1)[None, :]
+    valid = (p >= 0) & (p < fai_row.length)
+    q = np.where(valid, p, 0)
+    b = arr[fai_row.offset + (q // fai_row.linebases) * fai_row.linewidth + q % fai_row.linebases]
+    b = np.where((b >= 97) & (b <= 122), b - 32, b)
+    return np.where(valid, b, N).astype(np.uint8)
+
+
+def apply_mask(seq: np.ndarray, pos: np.ndarray, flank: int, var_pos: np.ndarray, var_code: np.ndarray):
+    """Write IUPAC codes of nearby variants into `seq`; returns the mask."""
+    masked = np.zeros(seq.shape, dtype=bool)
+    lo = np.searchsorted(var_pos, pos - flank, side="left")
+    hi = np.searchsorted(var_pos, pos + flank, side="right")
+    counts = hi - lo
+    if counts.sum():
+        row = np.repeat(np.arange(pos.size), counts)
+        idx = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        col = var_pos[idx] - pos[row] + flank
+        other = col != flank
+        seq[row[other], col[other]] = var_code[idx[other]]
+        masked[row[other], col[other]] = True
+    return masked
+
+
+def longest_run(seq: np.ndarray) -> np.ndarray:
+    """Longest run of one base (A/C/G/T) in each row."""
+    run = np.where(ACGT[seq[:, 0]], 1, 0)
+    best = run.copy()
+    for j in range(1, seq.shape[1]):
+        same = (seq[:, j] == seq[:, j - 1]) & ACGT[seq[:, j]]
+        run = np.where(same, run + 1, np.where(ACGT[seq[:, j]], 1, 0))
+        np.maximum(best, run, out=best)
+    return best
+
+
+def flank_metrics(seq: np.ndarray, masked: np.ndarray, side: str) -> dict:
+    called = ACGT[seq].sum(axis=1)
+    return {
+        f"{side}_GC": GC[seq].sum(axis=1) / np.maximum(called, 1),
+        f"{side}_homopolymer": longest_run(seq),
+        f"{side}_variants": masked.sum(axis=1),
+        f"{side}_N": ((seq == N) & ~masked).sum(axis=1),
+    }
+
+
+def as_strings(seq: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(seq).view(f"S{seq.shape[1]}").ravel().astype(str)
+
+
+COLUMNS = ["Index", "CHROM", "POS", "REF", "ALT", "Primer_ok", "Contig_found", "Ref_match"]
+COLUMNS += [f"{s}_{m}" for s in ["Left", "Right"] for m in ["GC", "homopolymer", "variants", "N"]]
+COLUMNS += ["Left_flank", "Right_flank", "Sequence"]
+
+
+def annotate(arr, fai, chrom, pos, ref, alt, variants, flank, block=20_000):
+    """Yield one table of flanks and metrics per block of candidates."""
+    codes, names = pd.factorize(chrom)
+    for c, name in enumerate(names):
+        rows = np.flatnonzero(codes == c)
+        found = name in fai.index
+        for s in range(0, rows.size, block):
+            r = rows[s : s + block]
+            p = pos[r]
+            if found:
+                seq = gather(arr, fai.loc[name], p, flank)
+            else:
+                seq = np.full((r.size, 2 * flank + 1), N, dtype=np.uint8)
+            vpos, vcode = variants.get(name, (np.empty(0, np.int64), np.empty(0, np.uint8)))
+            masked = apply_mask(seq, p, flank, vpos, vcode)
+            left, right = seq[:, :flank], seq[:, flank + 1 :]
+            refs = [ref[i] for i in r]
+            alts = [alt[i] for i in r]
+            df = pd.DataFrame({"Index": r, "CHROM": name, "POS": p, "REF": refs, "ALT": alts})
+            df["Contig_found"] = int(found)
+            df["Ref_match"] = seq[:, flank] == np.array([ord(x[0].upper()) for x in refs], dtype=np.uint8)
+            df = df.assign(**flank_metrics(left, masked[:, :flank], "Left"))
+            df = df.assign(**flank_metrics(right, masked[:, flank + 1 :], "Right"))
+            ls, rs = as_strings(left), as_strings(right)
+            df["Left_flank"], df["Right_flank"] = ls, rs
+            df["Sequence"] = [f"{a}[{b}/{c}]{d}" for a, b, c, d in zip(ls, refs, alts, rs)]
+            yield df
+
+
+def suitable(df: pd.DataFrame, gc_min: float, gc_max: float, max_homopolymer: int) -> pd.Series:
+    gc_ok = lambda side: df[f"{side}_GC"].between(gc_min, gc_max)
+    return (
+        df["Ref_match"]
+        & gc_ok("Left")
+        & gc_ok("Right")
+        & (df[["Left_homopolymer", "Right_homopolymer"]].max(axis=1) <= max_homopolymer)
+        & (df[["Left_variants", "Right_variants", "Left_N", "Right_N"]].sum(axis=1) == 0)
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Reference flanks and primer suitability of candidate SNPs")
+    ap.add_argument("--vcf", required=True, help="Candidate VCF (.vcf or .vcf.gz)")
+    ap.add_argument("--variants", help="VCF of all variants, masked in the flanks (default: --vcf)")
+    ap.add_argument("--reference", required=True, help="Reference FASTA (plain, gzip or bgzip)")
+    ap.add_argument("--flank", type=int, default=75, help="Bases either side of the SNP (default: 75)")
+    ap.add_argument("--gc-min", type=float, default=0.3, help="Minimum flank GC fraction (default: 0.3)")
+    ap.add_argument("--gc-max", type=float, default=0.7, help="Maximum flank GC fraction (default: 0.7)")
+    ap.add_argument("--max-homopolymer", type=int, default=5, help="Longest homopolymer allowed (default: 5)")
+    ap.add_argument("--prefix", default="candidates", help="Output prefix")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    fasta = plain_fasta(args.reference)
+    with open(fasta, "rb") as fh:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    arr = np.frombuffer(mm, dtype=np.uint8)
+    fai = read_fai(fasta, mm).set_index("name")
+    print(f"Reference: {len(fai)} contigs, {fai['length'].sum()} bp")
+
+    chrom, pos, ref, alt = read_records(args.vcf)
+    variants = variant_index(args.variants or args.vcf)
+
+    output = f"{args.prefix}_flanks.tsv"
+    n_ok = missing = mismatch = 0
+    with open(output, "w") as out:
+        out.write("\t".join(COLUMNS) + "\n")
+        for df in annotate(arr, fai, chrom, pos, ref, alt, variants, args.flank):
+            df["Primer_ok"] = suitable(df, args.gc_min, args.gc_max, args.max_homopolymer).astype(int)
+            df["Ref_match"] = df["Ref_match"].astype(int)
+            n_ok += int(df["Primer_ok"].sum())
+            missing += int((df["Contig_found"] == 0).sum())
+            mismatch += int(((df["Ref_match"] == 0) & (df["Contig_found"] == 1)).sum())
+            df[COLUMNS].to_csv(out, sep="\t", index=False, header=False, float_format="%.4f")
+    if missing:
+        print(f"⚠️  {missing} candidates on contigs missing from the reference", file=sys.stderr)
+    if mismatch:
+        print(f"⚠️  {mismatch} candidates whose REF differs from the reference base", file=sys.stderr)
+    print(f"Done → {output}   ({n_ok} of {pos.size} candidates primer-suitable, {time.time() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
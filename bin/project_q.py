@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+project_q.py
+============
+
+Project samples onto a fixed ADMIXTURE solution restricted to a locus panel.
+
+Checking a selected panel used to mean re‑running the whole ADMIXTURE stack
+on the panel VCF. Here the pre‑selection allele frequencies are kept fixed
+
+* **.P**   – L × K allele‑frequency matrix of the best‑K pre‑selection run
+* **.ped** – PLINK genotypes the run was fitted on (same samples, same loci)
+
+and, for the panel loci only, every sample's ancestry vector q is estimated
+by maximum likelihood under the ADMIXTURE model
+
+    log L(q) = Σ_l g_l log f_l + (2 − g_l) log(1 − f_l),   f_l = Σ_k q_k P_lk
+
+with the EM update of Alexander et al. (2009) for Q at fixed P, applied to
+all samples at once as N × L × K array operations. Samples converge
+independently and are frozen once their log‑likelihood stops improving.
+
+Which allele a .P row refers to is not recorded in the .P file, so each
+panel locus is oriented by the likelihood of the full‑data .Q under both
+choices (the .Q was fitted on exactly these genotypes).
+
+The projected Q is written in CLUMPP indfile layout (`… : q1 … qK`), so it
+can replace the post‑selection CLUMPP file in `compare_admixture.py` and
+`plot_admixture.py`. With `--align` the clusters are put in the column order
+of that (pre‑selection) CLUMPP file.
+
+Usage
+-----
+```bash
+python project_q.py \\
+        --pfile mydata.5.P --qfile mydata.5.Q \\
+        --ped mydata.ped --map mydata.map \\
+        --vcf selected.vcf.gz --align best_clumpp_indfile.out \\
+        --outfile projected_clumpp_indfile.out
+```
+"""
+
+import argparse, sys, time
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from admixio import read_clumpp, read_matrix, write_clumpp
+from panel_optimizer import align_to_vcf, vcf_records
+
+EPS = 1e-6  # allele‑frequency clip, as in panel_optimizer.py
+QMIN = 1e-5  # ancestry bound (ADMIXTURE keeps Q inside the simplex)
+
+
+# ------------------------------------------------ input
+
+
+def read_ped_dosages(path: str, rows: np.ndarray) -> np.ndarray:
+    """
+    Allele dosages (N × len(rows), int8) of the PLINK .ped loci `rows`,
+    counting the first non‑missing allele seen at each locus; −1 = missing.
+    """
+    first = 6 + 2 * rows
+    second = first + 1
+    alleles = []
+    with open(path) as fh:
+        for line in fh:
+            f = np.array(line.split(), dtype=object)
+            if f.size:
+                alleles.append(np.stack([f[first], f[second]]))
+    if not alleles:
+        sys.exit(f"{path}: no samples")
+    A = np.stack(alleles, axis=1)  # 2 × N × L
+
+    called = (A != "0").all(axis=0)
+    ref = np.empty(rows.size, dtype=object)
+    for j in range(rows.size):
+        seen = A[0, called[:, j], j]
+        ref[j] = seen[0] if seen.size else "0"
+    G = (A == ref).sum(axis=0).astype(np.int8)
+    G[~called] = -1
+    return G
+
+
+# ------------------------------------------------ model
+
+
+def loglik(G, called, F):
+    """Per‑sample log‑likelihood of dosages G given expected frequencies F."""
+    F = np.clip(F, EPS, 1.0 - EPS)
+    ll = np.where(called, G * np.log(F) + (2 - G) * np.log1p(-F), 0.0)
+    return ll.sum(axis=1)
+
+
+def orient(G, called, P, Q):
+    """Flip dosages at loci whose .P row describes the other allele."""
+    F = Q @ P.T
+    Gf = 2 - G
+    F = np.clip(F, EPS, 1.0 - EPS)
+    keep = np.where(called, G * np.log(F) + (2 - G) * np.log1p(-F), 0.0).sum(axis=0)
+    flip = np.where(called, Gf * np.log(F) + (2 - Gf) * np.log1p(-F), 0.0).sum(axis=0)
+    swap = flip > keep
+    G = np.where(swap[None, :] & called, Gf, G)
+    return G, swap
+
+
+def project(G, called, P, max_iter=5000, tol=1e-6, Q0=None):
+    """
+    EM estimate of Q (N × K) at fixed P (L × K).
+    Returns (Q, per‑sample log‑likelihood, iterations).
+    """
+    N, K = G.shape[0], P.shape[1]
+    P = np.clip(P, EPS, 1.0 - EPS)
+    Gc = np.where(called, G, 0).astype(np.float64)
+    Hc = np.where(called, 2 - G, 0).astype(np.float64)
+    n2 = np.maximum(2.0 * called.sum(axis=1), 1.0)[:, None]
+
+    Q = np.full((N, K), 1.0 / K) if Q0 is None else np.array(Q0, dtype=np.float64)
+    ll = loglik(G, called, Q @ P.T)
+    active = np.arange(N)
+    for it in range(1, max_iter + 1):
+        q, g, h = Q[active], Gc[active], Hc[active]
+        F = q @ P.T
+        step = (g / F) @ P + (h / (1.0 - F)) @ (1.0 - P)
+        q = np.clip(q * step / n2[active], QMIN, None)
+        q /= q.sum(axis=1, keepdims=True)
+        new_ll = loglik(G[active], called[active], q @ P.T)
+
+        Q[active] = q
+        done = np.abs(new_ll - ll[active]) < tol * np.maximum(np.abs(new_ll), 1.0)
+        ll[active] = new_ll
+        active = active[~done]
+        if active.size == 0:
+            break
+    return Q, ll, it
+
+
+def align_columns(Q, Q_from, Q_to):
+    """
+    Permute the columns of Q (labelled like Q_from) into the cluster order
+    of Q_to, by Hungarian assignment on the K × K column correlations.
+    """
+    K = Q.shape[1]
+    C = np.corrcoef(Q_from.T, Q_to.T)[:K, K:]
+    src, dst = linear_sum_assignment(-np.nan_to_num(C))
+    out = np.empty_like(Q)
+    out[:, dst] = Q[:, src]
+    return out
+
+
+# ------------------------------------------------ main
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Project samples onto fixed ADMIXTURE .P for a locus panel"
+    )
+    ap.add_argument("--pfile", required=True, help=".P file of the pre‑selection run")
+    ap.add_argument("--qfile", required=True, help=".Q file paired with --pfile")
+    ap.add_argument("--ped", required=True, help="PLINK .ped the run was fitted on")
+    ap.add_argument("--map", required=True, help="PLINK .map of the run (rows of .P)")
+    ap.add_argument("--vcf", required=True, help="Panel VCF; its records select the loci")
+    ap.add_argument("--align", help="CLUMPP indfile whose cluster order to follow")
+    ap.add_argument("--outfile", default="projected_clumpp_indfile.out")
+    ap.add_argument("--max-iter", type=int, default=5000, help="EM iterations (default: 5000)")
+    ap.add_argument(
+        "--tol",
+        type=float,
+        default=1e-6,
+        help="Relative log‑likelihood change at convergence (default: 1e-6)",
+    )
+    args = ap.parse_args()
+
+    t0 = time.time()
+    P_all = read_matrix(args.pfile)
+    Q_pre = read_matrix(args.qfile)
+    L, K = P_all.shape
+    if Q_pre.shape[1] != K:
+        sys.exit(f"{args.qfile}: .Q columns ≠ K clusters in .P")
+
+    rows, vcf_idx = align_to_vcf(args.map, args.vcf, L)
+    if rows.size == 0:
+        sys.exit(f"No loci of {args.vcf} found in {args.map}")
+    n_panel = max(vcf_records(args.vcf).values(), default=-1) + 1
+    dropped = n_panel - np.unique(vcf_idx).size
+    if dropped:
+        print(
+            f"⚠️  {dropped} of {n_panel} panel records not in {args.map}"
+            " (e.g. removed by --ld_prune); they are left out of the projection",
+            file=sys.stderr,
+        )
+    P = P_all[rows]
+    print(f"{rows.size} panel loci matched to {args.map} (K={K})")
+
+    G = read_ped_dosages(args.ped, rows)
+    if G.shape[0] != Q_pre.shape[0]:
+        sys.exit(f"{args.ped}: {G.shape[0]} samples, but {args.qfile} has {Q_pre.shape[0]}")
+    called = G >= 0
+    G, swapped = orient(G, called, P, Q_pre)
+    print(f"Orientation: {swapped.sum()} of {rows.size} loci counted on the other allele")
+
+    Q, ll, iters = project(G, called, P, args.max_iter, args.tol)
+    rmse = np.sqrt(np.mean((Q - Q_pre) ** 2))
+    print(f"EM: {iters} iterations, mean log‑likelihood {ll.mean():.3f}, RMSE vs .Q {rmse:.4f}")
+
+    if args.align:
+        Q = align_columns(Q, Q_pre, read_clumpp(args.align))
+    write_clumpp(args.outfile, Q)
+    print(f"Done → {args.outfile}   ({Q.shape[0]} samples, {time.time() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+rank_loci.py
+============
+
+Pick the top‑N loci from the `locus_metrics.txt` of `INFOCALC`.
+
+Loci are scored on one metric (`--metric`) or on a weighted composite
+(`--weights "I_a=0.5,ORCA[2-allele]=0.5"`), each metric divided by its
+maximum over the valid loci so the weights act on a common 0–1 scale. A
+locus is valid when every metric used is present and > −9998.
+
+Only the best candidates are ever sorted: `np.partition` finds the score
+of the `4·N`‑th best locus and only loci at or above it are ordered; the
+cut is widened only when the spacing rule rejects too many.
+With `--min-spacing D` (and `--sites`, the CHROM/POS of each VCF record)
+a locus is skipped when an already selected locus on the same contig lies
+less than D bp away; selected positions are kept per contig in sorted
+lists and checked with a binary search. With `--max-r2 R` (and `--store`,
+the `.gstore` of `SNPIO_FILTER`) a locus is skipped when its r² with any
+selected locus exceeds R: genotypes of selected loci are held as packed
+sample bitsets and r² comes from popcounts of their ANDs. The number of
+loci skipped by each check goes to `--report`. With `--flanks` (the table
+of `primer_flanks.py`) loci whose flanks are unsuitable for primers are
+skipped first.
+
+Output: `top_loci.txt`, `Index<TAB><metric>` (or `composite`), best first,
+and `--report` (selected loci, loci skipped for primers, spacing and LD).
+
+```bash
+python rank_loci.py --metrics locus_metrics.txt --metric I_a --top 500 \\
+        --sites candidates.sites.tsv --min-spacing 150 \\
+        --store filtered.gstore --max-r2 0.5
+```
+"""
+
+import argparse, bisect, sys
+import numpy as np
+
+from genostore import MISSING, GenoStore, unpack
+
+COLUMNS = ["I_n", "I_a", "ORCA[1-allele]", "ORCA[2-allele]"]
+REASONS = {"primer": "primer suitability", "spacing": "spacing", "ld": "LD redundancy"}
+
+
+def read_metrics(path: str):
+    """Locus indices and an L × 4 metric array (NaN = missing)."""
+    index, values = [], []
+    with open(path) as fh:
+        header = fh.readline().split()
+        if header[1:] != COLUMNS:
+            sys.exit(f"{path}: unexpected header {header}")
+        for line in fh:
+            f = line.split()
+            if len(f) != 5 or not f[0].isdigit():
+                continue  # Command: / PriorWeights: trailer
+            index.append(int(f[0]))
+            values.append([float(x) if x != "NA" else np.nan for x in f[1:]])
+    M = np.asarray(values, dtype=np.float64).reshape(-1, 4)
+    M[M <= -9998.0] = np.nan
+    return np.asarray(index, dtype=np.int64), M
+
+
+def parse_weights(spec: str) -> dict:
+    weights = {}
+    for item in spec.split(","):
+        name, _, w = item.rpartition("=")
+        if name not in COLUMNS:
+            sys.exit(f"Unknown metric in --weights: '{name}' (one of {', '.join(COLUMNS)})")
+        weights[name] = float(w)
+    return weights
+
+
+def score(M: np.ndarray, weights: dict) -> np.ndarray:
+    """Weighted sum of max‑scaled metrics; −inf for invalid loci."""
+    cols = [COLUMNS.index(c) for c in weights]
+    sub = M[:, cols]
+    valid = ~np.isnan(sub).any(axis=1)
+    if len(cols) > 1:
+        top = np.nanmax(np.where(valid[:, None], sub, np.nan), axis=0) if valid.any() else 1.0
+        sub = sub / np.where(top > 0, top, 1.0)
+    s = sub @ np.array(list(weights.values()))
+    return np.where(valid, s, -np.inf)
+
+
+def read_sites(path: str):
+    """CHROM and POS per VCF record (line i = record i)."""
+    chrom, pos = [], []
+    with open(path) as fh:
+        for line in fh:
+            c, p = line.split("\t")[:2]
+            chrom.append(c)
+            pos.append(int(p))
+    return np.asarray(chrom, dtype=object), np.asarray(pos, dtype=np.int64)
+
+
+def read_primer_ok(path: str, index: np.ndarray) -> np.ndarray:
+    """`Primer_ok` of `primer_flanks.py` per metrics row (False when absent)."""
+    ok = {}
+    with open(path) as fh:
+        header = fh.readline().rstrip("\n").split("\t")
+        i, j = header.index("Index"), header.index("Primer_ok")
+        for line in fh:
+            f = line.split("\t")
+            ok[int(f[i])] = f[j] == "1"
+    return np.array([ok.get(int(x), False) for x in index], dtype=bool)
+
+
+class Primer:
+    """Loci whose flanks failed the primer‑suitability checks."""
+
+    name = "primer"
+
+    def __init__(self, ok: np.ndarray):
+        self.ok = ok
+
+    def rejects(self, row) -> bool:
+        return not self.ok[row]
+
+    def add(self, row):
+        pass
+
+
+class Spacing:
+    """Minimum bp between selected loci on a contig (sorted per‑contig lists)."""
+
+    name = "spacing"
+
+    def __init__(self, chrom, pos, spacing: int):
+        self.chrom, self.pos, self.spacing = chrom, pos, spacing
+        self.placed = {}
+
+    def rejects(self, row) -> bool:
+        taken = self.placed.get(self.chrom[row], [])
+        p = self.pos[row]
+        i = bisect.bisect_left(taken, p)
+        return (i < len(taken) and taken[i] - p < self.spacing) or (
+            i > 0 and p - taken[i - 1] < self.spacing
+        )
+
+    def add(self, row):
+        bisect.insort(self.placed.setdefault(self.chrom[row], []), self.pos[row])
+
+
+class Redundancy:
+    """
+    r² between a candidate and every selected locus, from bit‑packed
+    genotypes. Each locus is held as three sample bitsets (called,
+    dosage ≥ 1, dosage = 2); the sums of x, x², y, y² and xy over samples
+    called at both loci are popcounts of their ANDs, so one candidate is
+    checked against the whole selected set in a few array operations.
+    """
+
+    name = "ld"
+
+    def __init__(self, store: GenoStore, store_rows, samples, max_r2: float, capacity: int):
+        self.gs, self.rows, self.samples, self.max_r2 = store, store_rows, samples, max_r2
+        width = -(-samples.size // 8)
+        self.planes = np.zeros((3, capacity, width), dtype=np.uint8)
+        self.n = 0
+
+    def _planes(self, row):
+        codes = unpack(self.gs.packed[[self.rows[row]]], self.gs.n_samples)[0, self.samples]
+        return np.packbits(np.stack([codes != MISSING, (codes == 1) | (codes == 2), codes == 2]), axis=1)
+
+    def r2(self, row) -> np.ndarray:
+        c2, h2, d2 = self._planes(row)
+        c1, h1, d1 = (p[: self.n] for p in self.planes)
+        both = c1 & c2
+        n = popcount(both)
+        sx = popcount(h1 & c2) + popcount(d1 & c2)
+        sxx = popcount(h1 & c2) + 3 * popcount(d1 & c2)
+        sy = popcount(h2 & c1) + popcount(d2 & c1)
+        syy = popcount(h2 & c1) + 3 * popcount(d2 & c1)
+        sxy = popcount(h1 & h2) + popcount(h1 & d2) + popcount(d1 & h2) + popcount(d1 & d2)
+        cov = n * sxy - sx * sy
+        var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+        return np.divide(cov * cov, var, out=np.zeros(self.n), where=var > 0)
+
+    def rejects(self, row) -> bool:
+        return self.n > 0 and bool((self.r2(row) > self.max_r2).any())
+
+    def add(self, row):
+        self.planes[:, self.n] = self._planes(row)
+        self.n += 1
+
+
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(a: np.ndarray) -> np.ndarray:
+    """Set bits per row of a uint8 array (loci × bytes)."""
+    bits = np.bitwise_count(a) if hasattr(np, "bitwise_count") else POPCOUNT[a]  # numpy ≥ 2.0
+    return bits.sum(axis=-1, dtype=np.int64)
+
+
+def select(s: np.ndarray, top: int, checks=()) -> tuple:
+    """
+    Rows of the `top` best scores, best first, skipping loci rejected by any
+    of `checks`. Returns (rows, {check name: loci skipped}).
+    """
+    n_valid = int(np.isfinite(s).sum())
+    want = min(top, n_valid)
+    skipped = {c.name: 0 for c in checks}
+    if want <= 0:
+        return np.empty(0, dtype=np.int64), skipped
+    chosen = []
+    seen, k = 0, min(n_valid, 4 * want)
+    while len(chosen) < want:
+        # All loci scoring at least the k-th best: a prefix of the full order
+        kth = np.partition(s, s.size - k)[s.size - k]
+        part = np.flatnonzero(s >= kth)
+        order = part[np.lexsort((part, -s[part]))]  # ties by row
+        for row in order[seen:]:
+            failed = next((c for c in checks if c.rejects(row)), None)
+            if failed is not None:
+                skipped[failed.name] += 1
+                continue
+            for c in checks:
+                c.add(row)
+            chosen.append(row)
+            if len(chosen) == want:
+                break
+        if k == n_valid:
+            break
+        seen, k = order.size, min(n_valid, 2 * k)
+    return np.asarray(chosen, dtype=np.int64), skipped
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Top-N loci by metric or composite score, with primer, spacing and LD checks")
+    ap.add_argument("--metrics", required=True, help="locus_metrics.txt from infocalc")
+    ap.add_argument("--metric", default="I_a", choices=COLUMNS, help="Ranking metric (default: I_a)")
+    ap.add_argument("--weights", help="Composite score, e.g. 'I_n=0.3,I_a=0.3,ORCA[2-allele]=0.4'")
+    ap.add_argument("--top", type=int, default=500, help="Number of loci (default: 500)")
+    ap.add_argument("--sites", help="CHROM<TAB>POS per VCF record (needed for --min-spacing)")
+    ap.add_argument("--min-spacing", type=int, default=0, help="Minimum bp between selected loci on a contig")
+    ap.add_argument("--store", help=".gstore with the genotypes of the --sites records (needed for --max-r2)")
+    ap.add_argument("--max-r2", type=float, help="Skip loci with r² above this to any selected locus")
+    ap.add_argument("--flanks", help="<prefix>_flanks.tsv of primer_flanks.py; skip loci with Primer_ok = 0")
+    ap.add_argument("--report", default="rank_loci_report.tsv", help="Counts of loci skipped by each check")
+    ap.add_argument("--outfile", default="top_loci.txt")
+    args = ap.parse_args()
+
+    index, M = read_metrics(args.metrics)
+    weights = parse_weights(args.weights) if args.weights else {args.metric: 1.0}
+    s = score(M, weights)
+    label = "composite" if args.weights else args.metric
+
+    checks, chrom, pos = [], None, None
+    if args.flanks:
+        checks.append(Primer(read_primer_ok(args.flanks, index)))
+    if args.min_spacing > 0 or args.max_r2 is not None:
+        if not args.sites:
+            sys.exit("--min-spacing and --max-r2 need --sites")
+        all_chrom, all_pos = read_sites(args.sites)
+        if index.size and index.max() >= all_pos.size:
+            sys.exit(f"{args.sites}: {all_pos.size} records, but locus index {index.max()} in {args.metrics}")
+        chrom, pos = all_chrom[index], all_pos[index]
+    if args.min_spacing > 0:
+        checks.append(Spacing(chrom, pos, args.min_spacing))
+    if args.max_r2 is not None:
+        if not args.store:
+            sys.exit("--max-r2 needs --store")
+        gs = GenoStore(args.store)
+        keys = [f"{c}:{p}" for c, p in zip(all_chrom, all_pos)]
+        store_rows = gs.select_sites(keys)[index]
+        checks.append(Redundancy(gs, store_rows, gs.kept_samples(), args.max_r2, args.top))
+
+    rows, skipped = select(s, args.top, checks)
+    n_valid = int(np.isfinite(s).sum())
+    if n_valid < args.top:
+        print(f"⚠️  Only {n_valid} valid loci found, fewer than max_candidates={args.top}", file=sys.stderr)
+    elif rows.size < args.top:
+        print(f"⚠️  Only {rows.size} loci pass the primer/spacing/LD checks", file=sys.stderr)
+    n_primer, n_spacing, n_ld = (skipped.get(c, 0) for c in ("primer", "spacing", "ld"))
+    if checks:
+        print("Skipped: " + ", ".join(f"{n} loci for {REASONS[name]}" for name, n in skipped.items()))
+    with open(args.report, "w") as out:
+        out.write("Selected\tSkipped_primer\tSkipped_spacing\tSkipped_LD\n")
+        out.write(f"{rows.size}\t{n_primer}\t{n_spacing}\t{n_ld}\n")
+
+    with open(args.outfile, "w") as out:
+        out.write(f"Index\t{label}\n")
+        out.writelines(f"{index[r]}\t{s[r]:g}\n" for r in rows)
+    print(f"Done → {args.outfile}   ({rows.size} of {n_valid} valid loci, score: {label})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1052 @@
+#!/usr/bin/env python3
+"""
+render_report.py
+================
+
+All MultiQC custom‑content sections of `GENERATE_REPORT` from one process.
+
+The inputs are read once (the CLUMPP Q matrices, individuals and
+populations are shared by the admixture comparison and both barplots), and
+the independent sections are then rendered on a process pool
+(`--threads`):
+
+* `cvplot_mqc.html`                       – CV error by K (`--cv`)
+* `sample_summary_mqc.json`               – missingness and heterozygosity
+  per sample before and after filtering (`--vcf-pre/--vcf-post`,
+  `--snpio-pre/--snpio-post`)
+* `comparison_entropy_mqc.html`,
+  `comparison_regression_min_max_mqc.html`,
+  `comparison_summary_metrics_mqc.json`    – pre vs post‑selection ancestry
+  (`--clumpp-pre/--clumpp-post`, `--runs-pre/--runs-post`)
+* `admixture_pre_mqc.html`, `admixture_post_mqc.html` – ancestry barplots
+* `metrics_hist_mqc.html`, `metrics_scatter_mqc.html` – locus metrics
+  (`--metrics`, `--top-loci`)
+* `sankey_mqc.html`                        – the SNPio filtering Sankey
+
+A section is skipped when its inputs are not given. Headers come from the
+`multiqc_*.html` templates in `--assets`.
+
+Plotly figures are written as a `<div>` and a script that waits for one
+shared loader: the first section in the page adds the plotly.js `<script>`
+and every later one reuses it, so the report holds a single copy
+(none when MultiQC already provides the same plotly.js version).
+
+`plot_cv.py`, `sample_summary.py`, `compare_admixture.py`,
+`plot_admixture.py` and `plot_metrics.py` are command‑line wrappers around
+the section functions here.
+
+```bash
+python render_report.py --cv cv_output.txt --vcf-pre in.vcf.gz \\
+        --vcf-post filtered.vcf.gz --snpio-pre pre/ --snpio-post post/ \\
+        --clumpp-pre pre.q --clumpp-post post.q --runs-pre runs_pre \\
+        --runs-post runs_post --inds inds.txt --pops pops.txt \\
+        --metrics locus_metrics.txt --top-loci top_loci.txt \\
+        --assets assets/ --threads 4
+```
+"""
+
+import argparse, base64, csv, gzip, json, os, re, sys, time, uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs_version
+from plotly.subplots import make_subplots
+from scipy.stats import entropy, spearmanr
+
+from admixio import read_clumpp
+from project_q import align_columns
+
+CLUMPP_FILE = re.compile(r"(ClumppIndFile\.output\.\d+|clumpp_indfile\.out)$")
+
+
+# ------------------------------------------------ MultiQC HTML
+
+
+def parse_template(template_file):
+    """Extract metadata from the MultiQC-style HTML comment block."""
+    text = Path(template_file).read_text()
+    match = re.search(r"<!--(.*?)-->", text, re.DOTALL)
+    if not match:
+        raise ValueError(f"No <!--…--> block in {template_file}")
+    meta = {}
+    for line in match.group(1).strip().splitlines():
+        if ":" in line:
+            key, value = line.strip().split(":", 1)
+            meta[key.strip()] = value.strip().strip("\"'")
+    return meta
+
+
+def build_comment(meta):
+    lines = ["<!--"]
+    for key, value in meta.items():
+        lines.append(f'{key}: "{value}"')
+    lines.append("-->")
+    return "\n".join(lines)
+
+
+def header(template_file):
+    """Template text to put before a section ('' without a template)."""
+    return Path(template_file).read_text() if template_file else ""
+
+
+def plotlyjs_url():
+    try:
+        from plotly.io._utils import plotly_cdn_url
+
+        return plotly_cdn_url()
+    except ImportError:
+        return f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+
+# Sections share one plotly.js: the first figure script in the page starts the
+# download, later ones wait on the same promise.
+LOADER = """window.gtseqPlotly = window.gtseqPlotly || new Promise(function (resolve) {
+    if (window.Plotly && window.Plotly.version === '%(version)s') { resolve(); return; }
+    var s = document.createElement('script');
+    s.src = '%(url)s';
+    s.charset = 'utf-8';
+    s.onload = function () { resolve(); };
+    document.head.appendChild(s);
+});"""
+
+
+def figure_html(fig, post_script=None):
+    """
+    `<div>` + script drawing `fig` once the shared plotly.js is loaded;
+    `post_script` runs after drawing, with `{plot_id}` set to the div id.
+    """
+    plot_id = str(uuid.uuid4())
+    loader = LOADER % {"version": get_plotlyjs_version(), "url": plotlyjs_url()}
+    after = post_script.replace("{plot_id}", plot_id) if post_script else ""
+    return (
+        f'<div id="{plot_id}" class="plotly-graph-div" style="width:100%;"></div>\n'
+        "<script type=\"text/javascript\">\n"
+        f"{loader}\n"
+        "window.gtseqPlotly.then(function () {\n"
+        f"    var fig = {fig.to_json()};\n"
+        f"    Plotly.newPlot('{plot_id}', fig.data, fig.layout, {{responsive: true}}).then(function () {{\n"
+        f"{after}\n"
+        "    });\n"
+        "});\n"
+        "</script>\n"
+    )
+
+
+def write_section(output, head, body):
+    Path(output).write_text(head + body)
+    return output
+
+
+# ------------------------------------------------ shared inputs
+
+
+def read_lines(path):
+    with open(path) as fh:
+        return [line.strip() for line in fh if line.strip()]
+
+
+def vcf_samples(path):
+    """Sample names of a (b)gzipped or plain VCF, from its #CHROM line."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt") as fh:
+        for line in fh:
+            if line.startswith("#CHROM"):
+                return line.rstrip("\n").split("\t")[9:]
+            if not line.startswith("#"):
+                break
+    sys.exit(f"{path}: no #CHROM header line")
+
+
+def find_file(root, *names):
+    """First file under `root` (symlinks followed) with one of `names`, by priority."""
+    found = {}
+    for dirpath, _, files in os.walk(root, followlinks=True):
+        for f in sorted(files):
+            if f in names and f not in found:
+                found[f] = os.path.join(dirpath, f)
+    for name in names:
+        if name in found:
+            return found[name]
+    return None
+
+
+def find_glob(root, pattern):
+    """First file under `root` (symlinks followed) whose name matches `pattern`."""
+    rx = re.compile(pattern)
+    for dirpath, _, files in os.walk(root, followlinks=True):
+        for f in sorted(files):
+            if rx.fullmatch(f):
+                return os.path.join(dirpath, f)
+    return None
+
+
+def find_q_files(paths):
+    """CLUMPP indfiles among `paths`, searching directories recursively; by K."""
+    found = {}
+    for path in map(Path, paths):
+        files = sorted(f for f in path.rglob("*") if CLUMPP_FILE.search(f.name)) if path.is_dir() else [path]
+        for f in files:
+            q = read_clumpp(f)
+            found[q.shape[1]] = q
+    return dict(sorted(found.items()))
+
+
+def read_cv(path):
+    """`cv_output.txt` of CVSUM (K Mean StDev), sorted by K."""
+    df = pd.read_csv(path, sep=r"\s+")
+    df["K"] = pd.to_numeric(df["K"], errors="raise")
+    return df.sort_values("K")
+
+
+def load_whitespace_table(path):
+    """
+    Reads a whitespace-delimited table and skips malformed lines.
+    Returns DataFrame with first column=int, rest=float.
+    """
+    df = pd.read_csv(path, sep=r"\s+", comment="#", on_bad_lines="skip", low_memory=False)
+    cols = list(df.columns)
+    # trailer lines (Command:, PriorWeights:) have a non-integer first field
+    first = pd.to_numeric(df[cols[0]], errors="coerce")
+    keep = (first >= 0) & (first % 1 == 0)
+    df = df[keep].reset_index(drop=True)
+    df[cols[0]] = first[keep].astype(int).to_numpy()
+    for c in cols[1:]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+# ------------------------------------------------ CV error
+
+
+def cv_plot(cv, output, header_comment):
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=cv["K"],
+            y=cv["Mean"],
+            error_y=dict(type="data", array=cv["StDev"], visible=True),
+            mode="lines+markers",
+            name="Mean CV Error",
+            marker=dict(size=8),
+            line=dict(width=2),
+        )
+    )
+    fig.update_layout(
+        title="Cross-validation Error by K",
+        xaxis_title="K",
+        yaxis_title="Mean CV Error",
+        template="plotly_white",
+    )
+    return write_section(output, header_comment + "\n", figure_html(fig))
+
+
+# ------------------------------------------------ sample summary
+
+HOMOZYGOUS = ["A", "C", "G", "T", "N"]
+
+# Strings pandas reads as NaN by default (the original dropna() semantics)
+NA_STRINGS = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+]
+
+
+def load_missingness(file):
+    return pd.read_csv(file, header=None, names=["Missing"])
+
+
+def compute_heterozygosity(file):
+    """
+    Per-sample heterozygosity: non-homozygous calls / non-missing calls.
+
+    The SNPio genotype matrix is streamed one sample row at a time; calls
+    are tallied with a Counter over the locus columns, so neither a
+    DataFrame of the matrix nor per-cell Python work is needed.
+    """
+    with open(file, newline="") as fh:
+        reader = csv.reader(fh)
+        head = next(reader)
+        if head == ["SampleID", "Heterozygosity"]:
+            # Precomputed from the genotype store (individual_heterozygosity.csv)
+            return pd.read_csv(file).set_index("SampleID")
+
+        sample_col = head.index("SampleID")
+        locus_idx = [
+            i for i, c in enumerate(head) if c not in ("SampleID", "Population")
+        ]
+        loci = itemgetter(*locus_idx) if len(locus_idx) > 1 else (
+            lambda row: (row[locus_idx[0]],)
+        )
+
+        samples, het = [], []
+        for row in reader:
+            if not row:
+                continue
+            calls = loci(row)
+            tally = Counter(calls)
+            called = len(calls) - sum(tally[na] for na in NA_STRINGS)
+            hom = sum(tally[base] for base in HOMOZYGOUS)
+            samples.append(row[sample_col])
+            het.append((called - hom) / called if called > 0 else 0)
+
+    return pd.DataFrame({"SampleID": samples, "Heterozygosity": het}).set_index(
+        "SampleID"
+    )
+
+
+def sample_table(inds_pre, inds_post, miss_pre, miss_post, het_pre, het_post):
+    """Missingness and heterozygosity per sample, pre and post filtering."""
+    df = pd.DataFrame({"Sample": inds_pre})
+    df.set_index("Sample", inplace=True)
+
+    df["Missing_Pre"] = load_missingness(miss_pre)["Missing"].values
+    miss_post_series = pd.Series(
+        load_missingness(miss_post)["Missing"].values, index=pd.Index(inds_post, name="Sample")
+    )
+    df["Missing_Post"] = miss_post_series.reindex(df.index)
+
+    df["Heterozygosity_Pre"] = compute_heterozygosity(het_pre)["Heterozygosity"]
+    df["Heterozygosity_Post"] = compute_heterozygosity(het_post)["Heterozygosity"].reindex(df.index)
+    return df.reset_index()
+
+
+def write_mqc_json(df, metadata, output_path):
+    """
+    Write a MultiQC-style table JSON with one row per sample,
+    including all metadata fields from the header.
+    """
+    rows = df.set_index(df["Sample"].astype(str)).drop(columns="Sample")
+    data_block = rows.to_dict(orient="index")
+
+    # Build base structure
+    json_obj = {
+        "data": data_block,
+        "pconfig": {
+            "id": metadata.get("id", metadata.get("section_name", "summary_plot")),
+            "title": metadata.get("section_name", "Sample Summary Table"),
+            "ylab": "Value",
+            "xlab": "Metric",
+            "xDecimals": False,
+            "tt_label": "Metric",
+            "min": 0,
+            "max": 1,
+            "scale": "YlGnBu"
+        }
+    }
+
+    # Add all top-level metadata fields
+    for key, value in metadata.items():
+        if key != "pconfig":  # Already handled above
+            json_obj[key] = value
+
+    with open(output_path, "w") as f:
+        json.dump(json_obj, f, indent=2)
+    return output_path
+
+
+def sample_summary(inds_pre, inds_post, miss_pre, miss_post, het_pre, het_post, output, template=None):
+    df = sample_table(inds_pre, inds_post, miss_pre, miss_post, het_pre, het_post)
+    if template:
+        return write_mqc_json(df, parse_template(template), output)
+    df.to_csv(output, sep="\t", index=False)
+    return output
+
+
+# ------------------------------------------------ pre vs post admixture
+
+
+def regression(x, y):
+    """Slope and r of y on x, for the columns of two N × m arrays."""
+    xc, yc = x - x.mean(axis=0), y - y.mean(axis=0)
+    sxx, syy, sxy = (xc * xc).sum(axis=0), (yc * yc).sum(axis=0), (xc * yc).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sxy / sxx, sxy / np.sqrt(sxx * syy)
+
+
+def compute_metrics(q_pre, q_post):
+    k_equal = q_pre.shape[1] == q_post.shape[1]
+    pre_max = q_pre.max(axis=1)
+    pre_min = q_pre.min(axis=1)
+    post_max = q_post.max(axis=1)
+    post_min = q_post.min(axis=1)
+
+    slope, r = regression(np.column_stack([pre_max, pre_min]), np.column_stack([post_max, post_min]))
+
+    ent_pre = entropy(q_pre, axis=1)
+    ent_post = entropy(q_post, axis=1)
+    ent_corr = spearmanr(ent_pre, ent_post).correlation
+
+    frac_conf_pre = np.mean(pre_max < 0.9)
+    frac_conf_post = np.mean(post_max < 0.9)
+    frac_conf_diff = frac_conf_post - frac_conf_pre
+
+    mean_ent_pre = np.mean(ent_pre)
+    mean_ent_post = np.mean(ent_post)
+    delta_entropy = mean_ent_post - mean_ent_pre
+
+    metrics = {
+        "R² (Max Assignment)": r[0] ** 2,
+        "Slope (Max Assignment)": slope[0],
+        "R² (Min Assignment)": r[1] ** 2,
+        "Slope (Min Assignment)": slope[1],
+        "Spearman Correlation (Entropy)": ent_corr,
+        "Mean Entropy (Pre)": mean_ent_pre,
+        "Mean Entropy (Post)": mean_ent_post,
+        "Delta Entropy": delta_entropy,
+        "% Admixed (Pre)": frac_conf_pre,
+        "% Admixed (Post)": frac_conf_post,
+        "Delta % Admixed": frac_conf_diff,
+    }
+
+    # Same K: put the post clusters in the pre cluster order, then compare
+    # the matrices cell by cell and cluster by cluster
+    if k_equal:
+        k = q_pre.shape[1]
+        aligned = align_columns(q_post, q_post, q_pre)
+        r_cluster = np.diag(np.corrcoef(q_pre.T, aligned.T)[:k, k:]) if k > 1 else np.array([np.nan])
+        metrics["RMSE (Aligned Q)"] = np.sqrt(np.mean((q_pre - aligned) ** 2))
+        metrics["Mean Cluster r"] = np.nanmean(r_cluster) if np.isfinite(r_cluster).any() else np.nan
+        metrics["Min Cluster r"] = np.nanmin(r_cluster) if np.isfinite(r_cluster).any() else np.nan
+
+    metrics = {k: float(v) for k, v in metrics.items()}
+    return metrics, pre_max, post_max, pre_min, post_min, ent_pre, ent_post
+
+
+def compare_runs(runs_pre: dict, runs_post: dict) -> dict:
+    """Metrics for every K run both before and after selection."""
+    rows = {}
+    for k in sorted(set(runs_pre) & set(runs_post) - {1}):
+        if runs_pre[k].shape[0] != runs_post[k].shape[0]:
+            print(f"⚠️  K={k}: {runs_pre[k].shape[0]} vs {runs_post[k].shape[0]} individuals; skipped", file=sys.stderr)
+            continue
+        rows[f"K={k}"] = compute_metrics(runs_pre[k], runs_post[k])[0]
+    return rows
+
+
+def make_entropy_plot(ent_pre, ent_post, individuals, populations, output_html, template=None):
+    df = pd.DataFrame(
+        {
+            "Pre_Entropy": ent_pre,
+            "Post_Entropy": ent_post,
+            "Individual": individuals,
+            "Population": populations,
+        }
+    )
+    fig = px.scatter(
+        df,
+        x="Pre_Entropy",
+        y="Post_Entropy",
+        hover_name="Individual",
+        color="Population",
+        labels={"Pre_Entropy": "Pre Entropy", "Post_Entropy": "Post Entropy"},
+        title="Comparison of Assignment Entropy",
+    )
+    head = header(template)
+    return write_section(output_html, head + "\n" if head else "", figure_html(fig))
+
+
+def make_side_by_side_regression(
+    pre_max, post_max, pre_min, post_min, individuals, populations, output_html, template=None
+):
+    df = pd.DataFrame(
+        {
+            "Max_Pre": pre_max,
+            "Max_Post": post_max,
+            "Min_Pre": pre_min,
+            "Min_Post": post_min,
+            "Individual": individuals,
+            "Population": populations,
+        }
+    )
+
+    fig = make_subplots(
+        rows=1, cols=2, subplot_titles=("Max Assignment", "Min Assignment")
+    )
+
+    for pop in df["Population"].unique():
+        subdf = df[df["Population"] == pop]
+        fig.add_trace(
+            go.Scatter(
+                x=subdf["Max_Pre"],
+                y=subdf["Max_Post"],
+                mode="markers",
+                name=pop,
+                marker=dict(size=6),
+                text=subdf["Individual"],
+                hoverinfo="text",
+            ),
+            row=1,
+            col=1,
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=subdf["Min_Pre"],
+                y=subdf["Min_Post"],
+                mode="markers",
+                name=pop,
+                marker=dict(size=6),
+                text=subdf["Individual"],
+                hoverinfo="text",
+                showlegend=False,
+            ),
+            row=1,
+            col=2,
+        )
+
+    fig.update_xaxes(title_text="Pre", row=1, col=1)
+    fig.update_yaxes(title_text="Post", row=1, col=1)
+    fig.update_xaxes(title_text="Pre", row=1, col=2)
+    fig.update_yaxes(title_text="Post", row=1, col=2)
+    fig.update_layout(
+        title_text="Regression Comparison of Max and Min Assignments",
+        height=500,
+        width=1000,
+    )
+    head = header(template)
+    return write_section(output_html, head + "\n" if head else "", figure_html(fig))
+
+
+def write_summary_json(rows: dict, output_path: str):
+    data_block = {
+        row: {str(k): (None if np.isnan(v) else v) for k, v in metrics.items()}
+        for row, metrics in rows.items()
+    }
+
+    json_obj = {
+        "id": "admixture_summary",
+        "parent_id": "genetic_structure",
+        "section_name": "Summary of Filtering Effects on Admixture",
+        "description": "Metrics summarizing the effect of filtering on ADMIXTURE-based assignment, for the best K and for every K run both before and after selection (post clusters aligned to pre clusters).",
+        "plot_type": "table",
+        "pconfig": {
+            "id": "admixture_summary_plot",
+            "title": "Filtering Metrics Summary",
+            "ylab": "Value",
+            "xlab": "Metric",
+            "xDecimals": False,
+            "tt_label": "Metric",
+        },
+        "data": data_block,
+    }
+
+    with open(output_path, "w") as f:
+        json.dump(json_obj, f, indent=2)
+    return output_path
+
+
+def compare_admixture(q_pre, q_post, individuals, populations, prefix,
+                      runs_pre=None, runs_post=None, entropy_header=None, regression_header=None):
+    """Entropy and min/max plots, and the summary table (best K and every shared K)."""
+    metrics, pre_max, post_max, pre_min, post_min, ent_pre, ent_post = compute_metrics(
+        q_pre, q_post
+    )
+
+    print("=== Summary Metrics ===")
+    for k, v in metrics.items():
+        print(f"{k}: {v:.4f}" if isinstance(v, float) else f"{k}: {v}")
+
+    outputs = [
+        make_entropy_plot(ent_pre, ent_post, individuals, populations,
+                          f"{prefix}_entropy_mqc.html", entropy_header),
+        make_side_by_side_regression(pre_max, post_max, pre_min, post_min, individuals, populations,
+                                     f"{prefix}_regression_min_max_mqc.html", regression_header),
+    ]
+
+    rows = {"Best K": metrics}
+    if runs_pre and runs_post:
+        per_k = compare_runs(find_q_files(runs_pre), find_q_files(runs_post))
+        print(f"=== Per-K comparison ({', '.join(per_k) or 'no K in common'}) ===")
+        if per_k:
+            print(pd.DataFrame(per_k).T.to_string(float_format="%.4f"))
+        rows.update(per_k)
+    outputs.append(write_summary_json(rows, f"{prefix}_summary_metrics_mqc.json"))
+    return outputs
+
+
+# ------------------------------------------------ ancestry barplots
+
+
+def q_frame(q, individuals, populations):
+    """Q matrix with `Cluster i`, Individual and Population columns."""
+    if not (len(individuals) == len(populations) == len(q)):
+        raise ValueError("Mismatch in number of rows across input files.")
+    q_df = pd.DataFrame(q, columns=[f"Cluster {i+1}" for i in range(q.shape[1])])
+    q_df["Individual"] = list(individuals)
+    q_df["Population"] = list(populations)
+    return q_df
+
+
+def make_plot(df, output_html, template_file=None):
+    # Melt to long format
+    df_long = df.melt(
+        id_vars=["Individual", "Population"],
+        var_name="Cluster",
+        value_name="Proportion",
+    )
+
+    # Sort ancestry segments by proportion within each individual
+    df_long = df_long.sort_values(
+        by=["Individual", "Proportion"], ascending=[True, False]
+    )
+
+    # Maintain input order of individuals
+    df_long["Individual"] = pd.Categorical(
+        df_long["Individual"], categories=df["Individual"], ordered=True
+    )
+
+    # Create BrBg color scale
+    brbg_scale = px.colors.diverging.Spectral
+    num_clusters = df.shape[1] - 2  # subtract Individual and Population
+    color_seq = px.colors.sample_colorscale(
+        brbg_scale, [i / max(1, num_clusters - 1) for i in range(num_clusters)]
+    )
+
+    # Plot
+    fig = px.bar(
+        df_long,
+        x="Individual",
+        y="Proportion",
+        color="Cluster",
+        color_discrete_sequence=color_seq,
+        hover_data=["Individual", "Population", "Cluster", "Proportion"],
+    )
+
+    # Remove spacing and borders between bars
+    fig.update_traces(marker_line_width=0)
+
+    # Population tick labels
+    pop_counts = df["Population"].value_counts(sort=False)
+    pop_positions = pop_counts.cumsum() - pop_counts / 2
+
+    fig.update_layout(
+        barmode="stack",
+        xaxis=dict(
+            tickmode="array",
+            tickvals=pop_positions.values,
+            ticktext=pop_positions.index,
+            showgrid=False,
+            title="Population",
+        ),
+        yaxis=dict(
+            title="Ancestry Proportion",
+            range=[0, 1],
+            showgrid=False,
+        ),
+        margin=dict(t=60, b=100),
+        title=dict(text="ADMIXTURE Ancestry Barplot", x=0.5),
+        legend_title="Cluster",
+        template="simple_white",
+    )
+
+    write_section(output_html, header(template_file), figure_html(fig))
+    print(f"✅ Plot saved to: {output_html}")
+    return output_html
+
+
+def sort_samples(q: np.ndarray, populations: np.ndarray) -> np.ndarray:
+    """
+    Order individuals by population (in order of first appearance), then by
+    dominant cluster and its proportion, so each population reads as blocks.
+    """
+    pop_codes = pd.factorize(populations)[0]
+    dominant = q.argmax(axis=1)
+    return np.lexsort((-q[np.arange(len(q)), dominant], dominant, pop_codes))
+
+
+def bin_samples(populations: np.ndarray, max_columns: int):
+    """
+    Start offsets of column bins over sorted individuals: at most about
+    `max_columns` bins, shared between populations by size, never
+    crossing a population boundary.
+    """
+    codes, names = pd.factorize(populations)
+    sizes = np.bincount(codes)
+    ends = np.cumsum(sizes)
+    per_pop = np.maximum(1, np.round(max_columns * sizes / sizes.sum()).astype(int))
+    per_pop = np.minimum(per_pop, sizes)
+    starts = [
+        e - n + np.linspace(0, n, b, endpoint=False).astype(int)
+        for e, n, b in zip(ends, sizes, per_pop)
+    ]
+    return np.concatenate(starts), names, per_pop
+
+
+def make_large_plot(df, output_html, template_file=None, max_columns=2000):
+    """
+    Compact barplot for many individuals: individuals sorted within
+    populations, averaged into at most `max_columns` column bins, one bar
+    trace per cluster holding float32 arrays (base64 typed arrays with
+    plotly ≥ 6), and population boundaries drawn as lines.
+    """
+    clusters = [c for c in df.columns if c.startswith("Cluster ")]
+    q = df[clusters].to_numpy(dtype=np.float64)
+    populations = df["Population"].astype(str).to_numpy()
+    individuals = df["Individual"].astype(str).to_numpy()
+
+    order = sort_samples(q, populations)
+    q, populations, individuals = q[order], populations[order], individuals[order]
+    n = len(q)
+
+    if n > max_columns:
+        starts, pop_names, per_pop = bin_samples(populations, max_columns)
+        counts = np.diff(np.append(starts, n))
+        q = np.add.reduceat(q, starts, axis=0) / counts[:, None]
+        col_pops = np.repeat(pop_names, per_pop)
+        label = np.array(
+            [f"{p}: {individuals[s]} … {individuals[s + c - 1]} ({c} individuals)"
+             for p, s, c in zip(col_pops, starts, counts)]
+        )
+    else:
+        col_pops, label = populations, np.char.add(np.char.add(individuals, " – "), populations)
+
+    x = np.arange(len(q), dtype=np.int32)
+    color_seq = px.colors.sample_colorscale(
+        px.colors.diverging.Spectral, [i / max(1, len(clusters) - 1) for i in range(len(clusters))]
+    )
+    fig = go.Figure()
+    for k, name in enumerate(clusters):
+        fig.add_trace(
+            go.Bar(
+                x=x,
+                y=np.round(q[:, k], 4).astype(np.float32),
+                name=name,
+                marker=dict(color=color_seq[k], line_width=0),
+                # Column labels on the first trace only; the unified hover shows them once
+                customdata=label if k == 0 else None,
+                hovertemplate=("%{customdata}<br>" if k == 0 else "") + name + ": %{y:.3f}<extra></extra>",
+            )
+        )
+
+    # Population boundaries and centred labels
+    change = np.flatnonzero(col_pops[1:] != col_pops[:-1]) + 1
+    bounds = np.concatenate([[0], change, [len(q)]])
+    centres = (bounds[:-1] + bounds[1:]) / 2 - 0.5
+    for b in change:
+        fig.add_vline(x=b - 0.5, line_width=1, line_color="black")
+
+    fig.update_layout(
+        barmode="stack",
+        bargap=0,
+        hovermode="x unified",
+        xaxis=dict(
+            tickmode="array",
+            tickvals=centres,
+            ticktext=col_pops[bounds[:-1]],
+            showgrid=False,
+            title="Population" + (f" ({n} individuals in {len(q)} bins)" if len(q) < n else ""),
+            range=[-0.5, len(q) - 0.5],
+        ),
+        yaxis=dict(title="Ancestry Proportion", range=[0, 1], showgrid=False),
+        margin=dict(t=60, b=100),
+        title=dict(text="ADMIXTURE Ancestry Barplot", x=0.5),
+        legend_title="Cluster",
+        template="simple_white",
+    )
+
+    write_section(output_html, header(template_file), figure_html(fig))
+    print(f"✅ Plot saved to: {output_html} ({n} individuals, {len(q)} columns)")
+    return output_html
+
+
+def admixture_barplot(df, output_html, template_file=None, large_n=1000, max_columns=2000):
+    """Per-individual barplot, or the compact one above `large_n` individuals."""
+    if len(df) > large_n:
+        return make_large_plot(df, output_html, template_file, max_columns)
+    return make_plot(df, output_html, template_file)
+
+
+# ------------------------------------------------ locus metrics
+
+
+def histogram_figure(metrics_df, metric_cols, n_bins=30):
+    """Selected/unselected counts per metric as bar traces, common bins."""
+    fig = go.Figure()
+    buttons = []
+    sel = metrics_df["selected"].to_numpy()
+    for i, col in enumerate(metric_cols):
+        values = metrics_df[col].to_numpy()
+        mn, mx = values.min(), values.max()
+        edges = np.linspace(mn, mx, n_bins + 1) if mx > mn else np.array([mn - 0.5, mn + 0.5])
+        centres = ((edges[:-1] + edges[1:]) / 2).astype(np.float32)
+        width = float(edges[1] - edges[0])
+        for name, mask in (("Unselected", ~sel), ("Selected", sel)):
+            counts, _ = np.histogram(values[mask], bins=edges)
+            fig.add_trace(go.Bar(
+                x=centres,
+                y=counts.astype(np.int32),
+                width=width,
+                name=name,
+                opacity=0.6,
+                visible=(i == 0),
+                hovertemplate=f"{col}: %{{x:.4g}}<br>Count: %{{y}}<extra>{name}</extra>",
+            ))
+        vis = [False] * (len(metric_cols) * 2)
+        vis[2*i] = True
+        vis[2*i+1] = True
+        buttons.append(dict(
+            label=col,
+            method='update',
+            args=[
+                {'visible': vis},
+                {
+                    'xaxis.title.text': col,
+                    'yaxis.title.text': 'Count'
+                }
+            ]
+        ))
+
+    fig.update_layout(
+        updatemenus=[dict(
+            buttons=buttons,
+            direction='down',
+            showactive=True,
+            x=0.1, y=1.15
+        )],
+        barmode='overlay',
+        bargap=0,
+        template='plotly_white',
+        margin={'t':80,'b':40},
+        xaxis=dict(title=metric_cols[0]),
+        yaxis=dict(title='Count')
+    )
+    return fig
+
+
+def encode_f32(values):
+    """Base64 of little-endian float32, decoded by the scatter's axis script."""
+    return base64.b64encode(np.asarray(values, dtype="<f4").tobytes()).decode("ascii")
+
+
+# Axis dropdowns only name a column; this script restyles both traces from the
+# one shared data block instead of each button carrying its own copy.
+SCATTER_JS = """
+var gd = document.getElementById('{plot_id}');
+var block = %s;
+var decode = function (s) {
+    var b = atob(s), u = new Uint8Array(b.length);
+    for (var i = 0; i < b.length; i++) { u[i] = b.charCodeAt(i); }
+    return new Float32Array(u.buffer);
+};
+var cols = {};
+Object.keys(block.unselected).forEach(function (c) {
+    cols[c] = [decode(block.unselected[c]), decode(block.selected[c])];
+});
+var axes = {x: block.x, y: block.y};
+gd.on('plotly_buttonclicked', function (e) {
+    var axis = e.button.args[0], col = e.button.args[1];
+    if (!(col in cols)) { return; }
+    axes[axis] = col;
+    var data = {}, layout = {};
+    data[axis] = cols[col];
+    layout[axis + 'axis.title.text'] = col;
+    layout['title.text'] = axes.x + ' vs ' + axes.y + block.note;
+    Plotly.update(gd, data, layout, [0, 1]);
+});
+"""
+
+
+def scatter_figure(metrics_df, metric_cols, max_points=50000, seed=1):
+    """
+    WebGL scatter of two metrics with X/Y dropdowns; returns (figure,
+    post_script). Above `max_points` unselected loci, a random subset of
+    them is drawn (selected loci are always shown).
+    """
+    x0, y0 = metric_cols[0], metric_cols[1] if len(metric_cols)>1 else metric_cols[0]
+    df_u = metrics_df.loc[~metrics_df.selected]
+    df_s = metrics_df.loc[ metrics_df.selected]
+    note = ""
+    if len(df_u) > max_points:
+        keep = np.sort(np.random.default_rng(seed).choice(len(df_u), max_points, replace=False))
+        note = f" ({max_points} of {len(df_u)} unselected loci shown)"
+        df_u = df_u.iloc[keep]
+    idx = metrics_df.columns[0]
+
+    fig = go.Figure()
+    for name, df in (("Unselected", df_u), ("Selected", df_s)):
+        fig.add_trace(go.Scattergl(
+            x=df[x0].to_numpy(np.float32),
+            y=df[y0].to_numpy(np.float32),
+            customdata=df[idx].to_numpy(np.int32),
+            mode='markers',
+            marker=dict(size=4 if name == "Unselected" else 6),
+            name=name,
+            hovertemplate="Locus %{customdata}<br>x: %{x:.4g}<br>y: %{y:.4g}<extra>" + name + "</extra>",
+        ))
+
+    x_buttons = [dict(label=x, method='skip', args=['x', x]) for x in metric_cols]
+    y_buttons = [dict(label=y, method='skip', args=['y', y]) for y in metric_cols]
+
+    fig.update_layout(
+        updatemenus=[
+            dict(buttons=x_buttons, direction='down', x=0.1, y=1.15, showactive=True),
+            dict(buttons=y_buttons, direction='down', x=0.4, y=1.15, showactive=True,
+                 active=metric_cols.index(y0))
+        ],
+        title=dict(text=f'{x0} vs {y0}{note}'),
+        xaxis=dict(title=x0),
+        yaxis=dict(title=y0),
+        template='plotly_white',
+        margin={'t':80,'b':40}
+    )
+    block = {
+        "x": x0,
+        "y": y0,
+        "note": note,
+        "unselected": {c: encode_f32(df_u[c]) for c in metric_cols},
+        "selected": {c: encode_f32(df_s[c]) for c in metric_cols},
+    }
+    return fig, SCATTER_JS % json.dumps(block)
+
+
+def metrics_frame(metrics_df, top_df):
+    """Metrics sorted by locus, `selected` flag, loci with a negative metric dropped."""
+    idx = metrics_df.columns[0]
+    metrics_df = metrics_df.sort_values(idx)
+    metrics_df['selected'] = metrics_df[idx].isin(top_df.iloc[:,0])
+    # filter negative
+    metric_cols = [c for c in metrics_df.columns if c not in (idx, 'selected')]
+    metrics_df = metrics_df[(metrics_df[metric_cols] >= 0).all(axis=1)]
+    return metrics_df, metric_cols
+
+
+def metrics_histogram(metrics_df, metric_cols, output, template=None):
+    fig = histogram_figure(metrics_df, metric_cols)
+    write_section(output, header(template), figure_html(fig))
+    print(f'✅ {output}')
+    return output
+
+
+def metrics_scatter(metrics_df, metric_cols, output, template=None, max_points=50000):
+    fig, script = scatter_figure(metrics_df, metric_cols, max_points)
+    write_section(output, header(template), figure_html(fig, post_script=script))
+    print(f'✅ {output}')
+    return output
+
+
+# ------------------------------------------------ SNPio Sankey
+
+
+def sankey(snpio_dir, output, template=None):
+    """The SNPio filtering Sankey page under the section header."""
+    html = find_glob(snpio_dir, r"filtering_results_sankey.*\.html")
+    if html is None:
+        print(f"⚠️  No filtering_results_sankey*.html under {snpio_dir}; Sankey skipped", file=sys.stderr)
+        return None
+    return write_section(output, header(template), Path(html).read_text())
+
+
+# ------------------------------------------------ driver
+
+
+def run(task):
+    func, args, kwargs = task
+    return func(*args, **kwargs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render all MultiQC report sections in one process")
+    ap.add_argument("--cv", help="cv_output.txt (K Mean StDev) of the all-loci runs")
+    ap.add_argument("--vcf-pre", help="VCF before filtering (sample names)")
+    ap.add_argument("--vcf-post", help="VCF after filtering (sample names)")
+    ap.add_argument("--snpio-pre", help="SNPio output directory before filtering")
+    ap.add_argument("--snpio-post", help="SNPio output directory after filtering")
+    ap.add_argument("--clumpp-pre", help="Best-K CLUMPP indfile before selection")
+    ap.add_argument("--clumpp-post", help="Best-K CLUMPP indfile after selection")
+    ap.add_argument("--runs-pre", nargs="+", help="CLUMPP indfiles (or directories) of every pre-selection K")
+    ap.add_argument("--runs-post", nargs="+", help="CLUMPP indfiles (or directories) of every post-selection K")
+    ap.add_argument("--inds", help="Individuals, one per line (rows of the CLUMPP files)")
+    ap.add_argument("--pops", help="Population of each individual, one per line")
+    ap.add_argument("--metrics", help="Locus metrics of INFOCALC")
+    ap.add_argument("--top-loci", help="Selected loci (Index, score)")
+    ap.add_argument("--assets", default=".", help="Directory with the multiqc_*.html templates")
+    ap.add_argument("--large_n", type=int, default=1000,
+                    help="Above this many individuals, draw the compact sorted barplot (default: 1000)")
+    ap.add_argument("--max_columns", type=int, default=2000,
+                    help="In the compact barplot, average individuals into at most this many columns (default: 2000)")
+    ap.add_argument("--max-points", type=int, default=50000,
+                    help="Unselected loci drawn in the metric scatter; above this a random subset (default: 50000)")
+    ap.add_argument("--threads", type=int, default=1, help="Worker processes (default: 1)")
+    ap.add_argument("--outdir", default=".", help="Output directory")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    os.makedirs(args.outdir, exist_ok=True)
+    out = lambda name: os.path.join(args.outdir, name)
+    asset = lambda name: os.path.join(args.assets, name)
+    tasks = []
+
+    if args.cv:
+        comment = build_comment(parse_template(asset("multiqc_cv.html")))
+        tasks.append((cv_plot, (read_cv(args.cv), out("cvplot_mqc.html"), comment), {}))
+
+    if args.vcf_pre and args.vcf_post and args.snpio_pre and args.snpio_post:
+        dirs = (args.snpio_pre, args.snpio_post)
+        # Prefer per-sample heterozygosity from the genotype store; fall back
+        # to the SNPio genotype matrix
+        inputs = [find_file(d, "individual_missingness.csv") for d in dirs] + [
+            find_file(d, "individual_heterozygosity.csv", "pop_individ_locus_missingness.csv") for d in dirs
+        ]
+        if None in inputs:
+            sys.exit("Missing individual_missingness.csv or heterozygosity input under the SNPio directories")
+        tasks.append((
+            sample_summary,
+            (vcf_samples(args.vcf_pre), vcf_samples(args.vcf_post), *inputs, out("sample_summary_mqc.json")),
+            {"template": asset("multiqc_sample_stats.html")},
+        ))
+
+    if args.inds and args.pops and (args.clumpp_pre or args.clumpp_post):
+        individuals, populations = read_lines(args.inds), read_lines(args.pops)
+        q = {s: read_clumpp(f) for s, f in (("pre", args.clumpp_pre), ("post", args.clumpp_post)) if f}
+        if len(q) == 2:
+            tasks.append((
+                compare_admixture,
+                (q["pre"], q["post"], individuals, populations, out("comparison")),
+                {
+                    "runs_pre": args.runs_pre,
+                    "runs_post": args.runs_post,
+                    "entropy_header": asset("multiqc_entropy.html"),
+                    "regression_header": asset("multiqc_min_max.html"),
+                },
+            ))
+        for stage, matrix in q.items():
+            tasks.append((
+                admixture_barplot,
+                (q_frame(matrix, individuals, populations), out(f"admixture_{stage}_mqc.html"),
+                 asset(f"multiqc_admixture_{stage}.html"), args.large_n, args.max_columns),
+                {},
+            ))
+
+    if args.metrics and args.top_loci:
+        metrics_df, metric_cols = metrics_frame(
+            load_whitespace_table(args.metrics), load_whitespace_table(args.top_loci)
+        )
+        tasks.append((metrics_histogram, (metrics_df, metric_cols, out("metrics_hist_mqc.html")),
+                      {"template": asset("multiqc_metrics_histogram.html")}))
+        tasks.append((metrics_scatter, (metrics_df, metric_cols, out("metrics_scatter_mqc.html")),
+                      {"template": asset("multiqc_metrics_pairwise.html"), "max_points": args.max_points}))
+
+    if args.snpio_pre:
+        tasks.append((sankey, (args.snpio_pre, out("sankey_mqc.html")), {"template": asset("multiqc_sankey.html")}))
+
+    print(f"Inputs loaded ({time.time() - t0:.1f} s); rendering {len(tasks)} sections")
+    if args.threads > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(run, tasks))
+    else:
+        results = [run(t) for t in tasks]
+
+    written = []
+    for r in results:
+        written += r if isinstance(r, list) else [r] if r else []
+    print(f"Done → {', '.join(written)}   ({time.time() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
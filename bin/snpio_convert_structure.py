@@ -1,7 +1,53 @@
 #!/usr/bin/env python3
+"""
+snpio_convert_structure.py
+==========================
+
+Write the labeled two‑row STRUCTURE file used by INFOCALC
+
+    0   1   2   …                      (one header field per locus)
+    sample  pop  a1  a1  …             (first allele of each genotype)
+    sample  pop  a2  a2  …             (second allele)
+
+with alleles coded as in SNPio (A=1, C=2, G=3, T=4, missing = -9) and `pop`
+the number of the sample's `Kx` group in the popmap. The file is produced
+in one pass straight from the genotype array: blocks of samples are turned
+into text with array lookups and written out (gzipped with `--gzip`), so
+there is no intermediate unlabeled file and no per‑token Python work.
+
+Genotypes come from the `.gstore` written by `snpio_filter.py` (`--store`,
+the VCF is then only read for its CHROM/POS columns) or, without it, from
+SNPio's `VCFReader`. Per‑sample missingness and heterozygosity are written
+to `<prefix>_output/gtdata/reports/`; in VCF mode SNPio's full
+`missingness_reports()` runs as well unless `--skip-missingness` is given.
+"""
 import argparse
+import gzip
 import os
-from snpio import VCFReader
+
+import numpy as np
+import pandas as pd
+
+from genostore import IUPAC_BITS, GenoStore, iupac_to_bits, read_vcf_sites
+
+# Base bitmask (A=1, C=2, G=4, T=8) → STRUCTURE allele code; 0 = missing
+BASE_CODE = np.zeros(16, dtype=np.uint8)
+BASE_CODE[[1, 2, 4, 8]] = [1, 2, 3, 4]
+
+# IUPAC bitmask → (first, second) allele codes, lower code first as SNPio does
+BITS_TO_ALLELES = np.zeros((16, 2), dtype=np.uint8)
+for _bits in range(1, 16):
+    _codes = [BASE_CODE[b] for b in (1, 2, 4, 8) if _bits & b]
+    if len(_codes) == 1:
+        BITS_TO_ALLELES[_bits] = _codes * 2
+    elif len(_codes) == 2:
+        BITS_TO_ALLELES[_bits] = _codes
+
+# Allele code → "\t<code>" as bytes; NUL bytes are padding and dropped
+FIELDS = np.array(
+    [list(b"\t-9"), list(b"\t1\0"), list(b"\t2\0"), list(b"\t3\0"), list(b"\t4\0")],
+    dtype=np.uint8,
+)
 
 
 def get_prefix_from_vcf_path(vcf_path):
@@ -21,15 +67,133 @@ def parse_popmap(popmap_path):
     return popmap
 
 
+def format_rows(labels, alleles) -> bytes:
+    """
+    STRUCTURE text for a block of rows: `labels` are the "sample\\tpop"
+    prefixes, `alleles` the matching rows × loci allele codes (0 = missing).
+    """
+    prefix = np.zeros((len(labels), max(map(len, labels))), dtype=np.uint8)
+    for i, label in enumerate(labels):
+        prefix[i, : len(label)] = np.frombuffer(label, dtype=np.uint8)
+    body = FIELDS[alleles].reshape(len(labels), -1)
+    newline = np.full((len(labels), 1), ord("\n"), dtype=np.uint8)
+    text = np.concatenate([prefix, body, newline], axis=1)
+    return text[text != 0].tobytes()
+
+
+def write_structure(path, n_loci, blocks, popmap, compress=False):
+    """
+    Write the labeled STRUCTURE file from `blocks` of
+    (sample names, first alleles, second alleles), each allele array being
+    samples × loci codes. Returns per‑sample Missing / Heterozygosity.
+    """
+    opener = gzip.open if compress else open
+    stats = []
+    with opener(path, "wb") as fout:
+        fout.write(("\t".join(map(str, range(n_loci))) + "\n").encode())
+        for names, first, second in blocks:
+            labels = []
+            for name in names:
+                if name not in popmap:
+                    raise ValueError(f"Sample {name} not found in popmap")
+                label = f"{name}\t{popmap[name]}".encode()
+                labels += [label, label]
+            rows = np.empty((2 * len(names), n_loci), dtype=np.uint8)
+            rows[0::2], rows[1::2] = first, second
+            fout.write(format_rows(labels, rows))
+
+            missing = (first == 0).sum(axis=1)
+            het = (first != second).sum(axis=1)  # over all loci, as sample_stats
+            stats.append(
+                pd.DataFrame(
+                    {
+                        "SampleID": names,
+                        "Missing": missing / max(n_loci, 1),
+                        "Heterozygosity": het / max(n_loci, 1),
+                    }
+                )
+            )
+    if not stats:
+        return pd.DataFrame(columns=["SampleID", "Missing", "Heterozygosity"])
+    return pd.concat(stats, ignore_index=True)
+
+
+def write_sample_reports(stats, prefix, missingness=True):
+    """individual_missingness.csv (as SNPio writes it) and individual_heterozygosity.csv."""
+    reports = os.path.join(f"{prefix}_output", "gtdata", "reports")
+    os.makedirs(reports, exist_ok=True)
+    if missingness:
+        stats["Missing"].round(2).to_csv(
+            os.path.join(reports, "individual_missingness.csv"), index=False, header=False
+        )
+    stats[["SampleID", "Heterozygosity"]].to_csv(
+        os.path.join(reports, "individual_heterozygosity.csv"), index=False
+    )
+
+
+def store_blocks(store, sites, samples, block):
+    """(names, first, second) blocks from 2‑bit store codes."""
+    a1 = BASE_CODE[IUPAC_BITS[store.sites["A1"].str[0].map(ord).to_numpy()[sites]]]
+    a2 = BASE_CODE[IUPAC_BITS[store.sites["A2"].str[0].map(ord).to_numpy()[sites]]]
+    lo, hi = np.minimum(a1, a2), np.maximum(a1, a2)
+    # 2‑bit code (A1/A1, A1/A2, A2/A2, missing) → allele per locus
+    first_of = np.stack([a1, lo, a2, np.zeros_like(a1)])
+    second_of = np.stack([a1, hi, a2, np.zeros_like(a1)])
+    cols = np.arange(sites.size)
+    names = store.samples["sample"].to_numpy()
+    for idx, codes in store.iter_sample_codes(sites, samples, block):
+        yield names[idx], first_of[codes, cols], second_of[codes, cols]
+
+
+def snp_data_blocks(snp_data, samples, block):
+    """(names, first, second) blocks from a SNPio IUPAC alignment."""
+    for s in range(0, len(samples), block):
+        pair = BITS_TO_ALLELES[iupac_to_bits(snp_data[s : s + block])]
+        yield np.asarray(samples[s : s + block]), pair[..., 0], pair[..., 1]
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Create STRUCTURE input from VCF with labeled populations"
     )
     parser.add_argument("--vcf", required=True, help="Path to VCF file")
     parser.add_argument("--popmap", required=True, help="Path to popmap (sample\\tKx)")
+    parser.add_argument(
+        "--store",
+        help="Genotype store (.gstore) written by snpio_filter.py; when given, "
+        "genotypes are read from it and the VCF is only used for its sites",
+    )
+    parser.add_argument(
+        "--gzip", action="store_true", help="Write <prefix>.labeled.stru.gz"
+    )
+    parser.add_argument(
+        "--skip-missingness",
+        action="store_true",
+        help="Do not run SNPio's missingness_reports() (VCF mode); the "
+        "per-sample missingness/heterozygosity CSVs are still written",
+    )
+    parser.add_argument(
+        "--block", type=int, default=256, help="Samples formatted per block (default: 256)"
+    )
     args = parser.parse_args()
 
     prefix = get_prefix_from_vcf_path(args.vcf)
+    popmap = parse_popmap(args.popmap)
+    output = f"{prefix}.labeled.stru" + (".gz" if args.gzip else "")
+
+    if args.store:
+        store = GenoStore(args.store)
+        sites = store.select_sites(read_vcf_sites(args.vcf))
+        # Same samples and order as VCFReader(force_popmap=True) on the
+        # filtered VCF: store order, restricted to kept samples in the popmap
+        in_popmap = store.samples["sample"].isin(popmap).to_numpy()
+        samples = np.intersect1d(store.kept_samples(), np.flatnonzero(in_popmap))
+        blocks = store_blocks(store, sites, samples, args.block)
+        stats = write_structure(output, sites.size, blocks, popmap, args.gzip)
+        write_sample_reports(stats, prefix)
+        return
+
+    from snpio import VCFReader
 
     # Read VCF using snpio
     gd = VCFReader(
@@ -44,48 +208,12 @@ def main():
     )
 
     # generate missingness reports
-    gd.missingness_reports()
-
-    # convert to structure format
-    output_raw = f"{prefix}.stru"
-    gd.write_structure(output_raw)
-
-    popmap = parse_popmap(args.popmap)
-    output_final = f"{prefix}.labeled.stru"
-
-    with open(output_raw, "r") as fin, open(output_final, "w") as fout:
-        # Peek at first line to determine number of loci
-        first_line = fin.readline()
-        if not first_line:
-            raise ValueError("STRUCTURE file is empty")
-
-        num_loci = len(first_line.strip().split()) - 2
-        fout.write("\t".join(str(i) for i in range(num_loci)) + "\n")
-
-        # Process the rest of the file (including the first line)
-        fin.seek(0)
-        while True:
-            line1 = fin.readline()
-            line2 = fin.readline()
-            if not line2:
-                break  # EOF or malformed pair
-
-            parts1 = line1.strip().split()
-            parts2 = line2.strip().split()
-            sample = parts1[0]
-
-            if sample != parts2[0]:
-                raise ValueError(f"Mismatched pair: {sample} vs {parts2[0]}")
-
-            pop_id = popmap.get(sample)
-            if pop_id is None:
-                raise ValueError(f"Sample {sample} not found in popmap")
-
-            parts1[1] = str(pop_id)
-            parts2[1] = str(pop_id)
+    if not args.skip_missingness:
+        gd.missingness_reports()
 
-            fout.write("\t".join(parts1) + "\n")
-            fout.write("\t".join(parts2) + "\n")
+    blocks = snp_data_blocks(gd.snp_data, gd.samples, args.block)
+    stats = write_structure(output, gd.snp_data.shape[1], blocks, popmap, args.gzip)
+    write_sample_reports(stats, prefix, missingness=args.skip_missingness)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 import argparse
 import os
+
+import h5py
 from snpio import NRemover2, VCFReader
 
+from genostore import GenoStore, write_store
+
 
 def get_prefix_from_vcf_path(vcf_path):
     basename = os.path.basename(vcf_path)
@@ -80,6 +84,32 @@ def main():
     output_vcf = f"{prefix}.filter.vcf"
     gd_filt.write_vcf(output_vcf)
 
+    # Persist the unfiltered genotypes once as a 2-bit store, with the
+    # filter outcome as keep flags, so later steps need not re-parse VCF
+    with h5py.File(gd.vcf_attributes_fn, "r") as h5:
+        chrom = h5["chrom"][:].astype(str)
+        pos = h5["pos"][:]
+        ref = h5["ref"][:].astype(str)
+    store = write_store(
+        f"{prefix}.gstore",
+        gd.snp_data,
+        gd.samples,
+        gd.populations,
+        chrom,
+        pos,
+        ref=ref,
+        kept_samples=nrm.sample_indices,
+        kept_sites=nrm.loci_indices,
+    )
+
+    # Per-sample heterozygosity of the unfiltered data, next to SNPio's
+    # missingness reports
+    stats = GenoStore(store).sample_stats()
+    stats[["SampleID", "Heterozygosity"]].to_csv(
+        os.path.join(f"{prefix}_output", "gtdata", "reports", "individual_heterozygosity.csv"),
+        index=False,
+    )
+
 
 if __name__ == "__main__":
     main()
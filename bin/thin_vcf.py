@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+thin_vcf.py
+===========
+
+Subset a VCF to a fixed number of records for the best‑K sweep.
+
+* **random** – a uniform random sample of records (`--seed`)
+* **thin**   – records spread evenly along the genome: the subset size is
+  shared between chromosomes in proportion to their SNP span, and on each
+  chromosome the record nearest to each of a set of evenly spaced positions
+  is kept
+
+Records keep their input order. The VCF is read twice (positions, then the
+selected records), so memory does not grow with its size.
+
+```bash
+python thin_vcf.py --vcf filtered.vcf.gz --size 20000 --method thin \\
+        --output filtered_subset.vcf
+```
+"""
+
+import argparse, gzip, sys, time
+import numpy as np
+import pandas as pd
+
+
+def open_text(path: str):
+    return gzip.open(path, "rt") if path.endswith(".gz") else open(path)
+
+
+def read_positions(path: str):
+    """CHROM and POS of every record, in file order."""
+    chroms, pos = [], []
+    with open_text(path) as fh:
+        for line in fh:
+            if line.startswith("#"):
+                continue
+            f = line.split("\t", 2)
+            chroms.append(f[0])
+            pos.append(int(f[1]))
+    return np.asarray(chroms, dtype=object), np.asarray(pos, dtype=np.int64)
+
+
+def pick_random(n: int, size: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(n, size=size, replace=False))
+
+
+def share(spans: np.ndarray, size: int) -> np.ndarray:
+    """Split `size` over chromosomes in proportion to span (largest remainder)."""
+    exact = size * spans / spans.sum()
+    out = np.floor(exact).astype(np.int64)
+    rest = size - out.sum()
+    out[np.argsort(out - exact)[:rest]] += 1
+    return out
+
+
+def pick_thinned(chroms: np.ndarray, pos: np.ndarray, size: int) -> np.ndarray:
+    codes, names = pd.factorize(chroms)
+    members = [np.flatnonzero(codes == c) for c in range(len(names))]
+    spans = np.array([pos[m].max() - pos[m].min() + 1 for m in members], dtype=np.float64)
+    quota = np.minimum(share(spans, size), [m.size for m in members])
+
+    keep = []
+    for m, q in zip(members, quota):
+        if q == 0:
+            continue
+        order = m[np.argsort(pos[m], kind="stable")]
+        p = pos[order]
+        targets = np.linspace(p[0], p[-1], q)
+        j = np.clip(np.searchsorted(p, targets), 1, p.size - 1)
+        j -= (targets - p[j - 1]) < (p[j] - targets)
+        keep.append(order[np.unique(np.clip(j, 0, p.size - 1))])
+    keep = np.unique(np.concatenate(keep)) if keep else np.empty(0, dtype=np.int64)
+
+    # Records that fell on the same target: top up evenly from the rest
+    short = size - keep.size
+    if short > 0:
+        rest = np.setdiff1d(np.arange(pos.size), keep)
+        keep = np.union1d(keep, rest[np.linspace(0, rest.size - 1, short).round().astype(np.int64)])
+    return keep
+
+
+def write_subset(vcf: str, keep: np.ndarray, output: str):
+    wanted = np.zeros(int(keep.max()) + 1 if keep.size else 0, dtype=bool)
+    wanted[keep] = True
+    i = 0
+    with open_text(vcf) as fh, open(output, "w") as out:
+        for line in fh:
+            if line.startswith("#"):
+                out.write(line)
+                continue
+            if i >= wanted.size:
+                break
+            if wanted[i]:
+                out.write(line)
+            i += 1
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Subset a VCF to N random or evenly spaced records")
+    ap.add_argument("--vcf", required=True, help="Input VCF (.vcf or .vcf.gz)")
+    ap.add_argument("--size", type=int, required=True, help="Number of records to keep")
+    ap.add_argument("--method", choices=["random", "thin"], default="random")
+    ap.add_argument("--seed", type=int, default=1, help="Random seed (default: 1)")
+    ap.add_argument("--output", required=True, help="Output VCF (uncompressed)")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    chroms, pos = read_positions(args.vcf)
+    n = pos.size
+    if n == 0:
+        sys.exit(f"{args.vcf}: no records")
+    if args.size >= n:
+        keep = np.arange(n)
+        print(f"⚠️  --size {args.size} ≥ {n} records; keeping all", file=sys.stderr)
+    elif args.method == "random":
+        keep = pick_random(n, args.size, args.seed)
+    else:
+        keep = pick_thinned(chroms, pos, args.size)
+
+    write_subset(args.vcf, keep, args.output)
+    print(f"Done → {args.output}   ({keep.size} of {n} records, {args.method}, {time.time() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+process ADMIXTURE_GATHER {
+    tag "$meta.id"
+    label 'process_single'
+
+    container 'docker.io/mussmann/admixpipe:3.2'
+
+    input:
+    tuple val(meta), path(results, stageAs: 'prep/*'), path(prep_files, stageAs: 'prep/*')
+    tuple val(meta2), path(run_files, stageAs: 'runs/*')
+
+    output:
+    tuple val(meta), path("results.zip"),      emit: results
+    tuple val(meta), path("${meta.id}*.stdout"),         emit: logs
+    tuple val(meta), path("${meta.id}*.Q"),              emit: qfiles
+    tuple val(meta), path("${meta.id}*.P"),              emit: pfiles
+    path "versions.yml",     emit: versions
+
+    script:
+    def prefix = meta.id
+    """
+    # K=1 runs of ADMIXTURE_PREP keep AdmixPipe's names
+    cp -L prep/${prefix}* .
+
+    # Name the scattered runs the way AdmixPipe named the K=1 replicates
+    if   [ -e prep/${prefix}.1_1.Q ]; then style=replicate
+    elif [ -e prep/${prefix}_1.1.Q ]; then style=run
+    elif [ -e prep/${prefix}.1.Q ];   then style=single
+    else
+        echo "❌ No K=1 .Q file from ADMIXTURE_PREP in prep/" >&2
+        exit 1
+    fi
+
+    : > scattered.txt
+    for f in runs/${prefix}.*_*.*; do
+        name=\$(basename "\$f")
+        ext=\${name##*.}
+        kr=\${name#${prefix}.}
+        kr=\${kr%.*}
+        k=\${kr%_*}
+        r=\${kr#*_}
+        case \$style in
+            replicate) out=${prefix}.\${k}_\${r}.\$ext ;;
+            run)       out=${prefix}_\${r}.\${k}.\$ext ;;
+            single)    out=${prefix}.\${k}.\$ext ;;
+        esac
+        cp -L "\$f" "\$out"
+        echo "\$out" >> scattered.txt
+    done
+
+    # results.zip (read by submitClumpak.py): K=1 archive plus every scattered
+    # file whose extension AdmixPipe archived, in the same folder
+    python3 - <<-'END_PYTHON'
+    import os, zipfile
+
+    with open("scattered.txt") as fh:
+        scattered = sorted(line.strip() for line in fh if line.strip())
+    with zipfile.ZipFile("prep/results.zip") as src, \\
+         zipfile.ZipFile("results.zip", "w", zipfile.ZIP_DEFLATED) as dst:
+        folders = {}
+        for info in src.infolist():
+            dst.writestr(info, src.read(info.filename))
+            if not info.is_dir():
+                ext = os.path.splitext(info.filename)[1]
+                folders.setdefault(ext, os.path.dirname(info.filename))
+        for name in scattered:
+            ext = os.path.splitext(name)[1]
+            if ext in folders:
+                dst.write(name, os.path.join(folders[ext], name))
+    END_PYTHON
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python3 --version | sed 's/Python //g')
+    END_VERSIONS
+    """
+}
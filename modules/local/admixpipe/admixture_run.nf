@@ -0,0 +1,38 @@
+process ADMIXTURE_RUN {
+    tag "${meta.id} K=${k} rep=${rep}"
+    label 'process_admixture'
+
+    container 'docker.io/mussmann/admixpipe:3.2'
+
+    input:
+    tuple val(meta), path(bed), path(bim), path(fam), val(k), val(rep)
+
+    output:
+    tuple val(meta), path("${meta.id}.${k}_${rep}.{Q,P,stdout}"), emit: runs
+    path "versions.yml",     emit: versions
+
+    script:
+    def args   = task.ext.args ?: ''
+    def seed   = task.ext.seed ?: 1000 * k + rep
+
+    """
+    set -o pipefail
+
+    # The stdout holds the CV error and log-likelihood read by distructRerun.py
+    admixture \\
+        -j${task.cpus} \\
+        -s ${seed} \\
+        ${args} \\
+        ${bed} \\
+        ${k} \\
+        | tee ${meta.id}.${k}_${rep}.stdout
+
+    mv ${bed.baseName}.${k}.Q ${meta.id}.${k}_${rep}.Q
+    mv ${bed.baseName}.${k}.P ${meta.id}.${k}_${rep}.P
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        Admixture: 1.30
+    END_VERSIONS
+    """
+}
@@ -7,6 +7,7 @@ process ADMIXTUREPIPELINE {
     input:
     tuple val(meta), path(vcf)
     tuple val(meta2), path(popmap)
+    val(krange)                      // [ mink, maxk ]
 
     output:
     tuple val(meta), path("results.zip"),      emit: results
@@ -22,7 +23,7 @@ process ADMIXTUREPIPELINE {
 
     script:
     def args   = task.ext.args ?: ''
-    def maxk   = params.maxk ?: 3
+    def (mink, maxk) = krange
 
     """
     # Dynamically add admixpipe paths if present in the container
@@ -34,7 +35,7 @@ process ADMIXTUREPIPELINE {
         -m ${popmap} \\
         -v ${vcf} \\
         -n ${task.cpus} \\
-        -k 1 \\
+        -k ${mink} \\
         -K ${maxk} \\
         -C 1.0 \\
         -S 0.0 \\
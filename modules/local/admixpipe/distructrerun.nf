@@ -11,6 +11,7 @@ process DISTRUCT {
     tuple val(meta4), path(inds)
     tuple val(meta5), path(logs)
     tuple val(meta6), path(clumpak)
+    val(krange)                      // [ mink, maxk ]
 
     output:
     tuple val(meta), path("MajorClusterRuns.txt"), emit: major_clusters
@@ -24,7 +25,7 @@ process DISTRUCT {
 
     script:
     def args   = task.ext.args ?: ''
-    def maxk   = params.maxk ?: 3
+    def (mink, maxk) = krange
 
     """
     # Dynamically add admixpipe paths if present in the container
@@ -35,7 +36,7 @@ process DISTRUCT {
     distructRerun.py \\
     -a ./ \\
     -d ${clumpak} \\
-    -k 1 \\
+    -k ${mink} \\
     -K ${maxk} \\
     -r \\
     ${args}
@@ -0,0 +1,37 @@
+process CLUMPP_ALIGN {
+    tag "$meta.id"
+    label 'process_low'
+
+    container "docker.io/tkchafin/plotly:1.1"
+
+    input:
+        tuple val(meta), path(qfiles)
+        tuple val(meta2), path(logs)
+        tuple val(meta3), path(pops)
+
+    output:
+        tuple val(meta), path("best_results")        , emit: best_results
+        tuple val(meta), path("MajorClusterRuns.txt"), emit: major_clusters
+        tuple val(meta), path("cv_output.txt")       , emit: cv_output
+        tuple val(meta), path("ll_output.txt")       , emit: ll_output
+        path("versions.yml")                         , emit: versions
+
+    script:
+    def args   = task.ext.args ?: ''
+    """
+    clumpp_align.py \\
+        --qfiles ${qfiles} \\
+        --logs ${logs} \\
+        --pops ${pops} \\
+        --threshold ${params.clumpp_threshold} \\
+        --threads ${task.cpus} \\
+        ${args}
+
+    scipy_version=\$(python3 -c 'import scipy; print(scipy.__version__)')
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        scipy: \${scipy_version}
+    END_VERSIONS
+    """
+}
@@ -2,10 +2,7 @@ process INFOCALC{
     tag "$meta.id"
     label 'process_single'
 
-    conda "conda-forge::perl=5.32"
-    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
-        'https://depot.galaxyproject.org/singularity/perl:5.32' :
-        'biocontainers/perl:5.32' }"
+    container "docker.io/tkchafin/plotly:1.1"
 
     input:
         tuple val(meta), path(structure)
@@ -21,19 +18,22 @@ process INFOCALC{
     # Read best K
     K=\$(cat ${bestk_file})
 
-    # Run infocalc.pl (assumes it's in PATH or cwd)
-    infocalc.pl \\
-    -input ${structure} \\
-    -column 2 \\
-    -numpops \$K \\
-    -output "locus_metrics.txt" \\
+    # Genotype-mode infocalc.py (drop-in for infocalc.pl; the labeled
+    # STRUCTURE file has two label columns: sample and population)
+    infocalc.py \\
+    --stru ${structure} \\
+    --column 2 \\
+    --label-cols 2 \\
+    --numpops \$K \\
+    --outfile "locus_metrics.txt" \\
     ${args}
 
-    # Log version manually
+    numpy_version=\$(python3 -c 'import numpy; print(numpy.__version__)')
+
     cat <<-END_VERSIONS > versions.yml
     "${task.process}":
         infocalc: 1.1
-        perl: \$(perl -v | grep "v5" | head -n1 | sed 's/^.*(v/v/' | sed 's/).*//')
+        numpy: \${numpy_version}
     END_VERSIONS
     """
 }
@@ -0,0 +1,37 @@
+process LD_PRUNE {
+    tag "$meta.id"
+    label 'process_low'
+
+    container "docker.io/tkchafin/plotly:1.1"
+
+    input:
+        tuple val(meta), path(vcf)
+        tuple val(meta2), path(gstore)
+
+    output:
+        tuple val(meta), path("${meta.id}_pruned.vcf")       , emit: vcf
+        tuple val(meta), path("${meta.id}_pruned.prune.out") , emit: removed
+        tuple val(meta), path("${meta.id}_pruned_report.tsv"), emit: report
+        path("versions.yml")                                 , emit: versions
+
+    script:
+    def args   = task.ext.args ?: ''
+    """
+    ld_prune.py \\
+        --vcf ${vcf} \\
+        --store ${gstore} \\
+        --window ${params.ld_window} \\
+        --step ${params.ld_step} \\
+        --r2 ${params.ld_r2} \\
+        --threads ${task.cpus} \\
+        --prefix ${meta.id}_pruned \\
+        ${args}
+
+    numpy_version=\$(python3 -c 'import numpy; print(numpy.__version__)')
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        numpy: \${numpy_version}
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,52 @@
+process PANEL_OPTIMIZER {
+    tag "$meta.id"
+    label 'process_medium'
+
+    container "docker.io/tkchafin/plotly:1.1"
+
+    input:
+        tuple val(meta), path(pfiles)
+        tuple val(meta2), path(qfiles)
+        tuple val(meta3), path(admix_map)
+        tuple val(meta4), path(vcf)
+        tuple val(meta5), path(bestk_file)
+
+    output:
+        tuple val(meta), path("top_loci.txt"), emit: top_loci
+        path "versions.yml", emit: versions
+
+    script:
+    def args       = task.ext.args ?: ''
+    def objective  = params.panel_objective ?: "orca"
+    def candidates = params.max_candidates ?: 500
+    """
+    # Read best K
+    K=\$(cat ${bestk_file})
+
+    # ADMIXTURE .P/.Q for the best K (first replicate when several exist)
+    pfile=\$(ls *.P | grep -E "\\.\${K}(_[0-9]+)?\\.P\$" | sort -V | head -n 1)
+    if [ -z "\$pfile" ]; then
+        echo "❌ No .P file for K=\$K" >&2
+        exit 1
+    fi
+    qfile="\${pfile%.P}.Q"
+
+    panel_optimizer.py \\
+        --pfile \$pfile \\
+        --qfile \$qfile \\
+        --map ${admix_map} \\
+        --vcf ${vcf} \\
+        --panel-size ${candidates} \\
+        --objective ${objective} \\
+        --outfile top_loci.txt \\
+        ${args}
+
+    numpy_version=\$(python3 -c 'import numpy; print(numpy.__version__)')
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        panel_optimizer: 1.0
+        numpy: \${numpy_version}
+    END_VERSIONS
+    """
+}
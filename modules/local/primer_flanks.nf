@@ -0,0 +1,38 @@
+process PRIMER_FLANKS {
+    tag "$meta.id"
+    label 'process_low'
+
+    container "docker.io/tkchafin/plotly:1.1"
+
+    input:
+        tuple val(meta), path(vcf)
+        tuple val(meta2), path(variants)
+        tuple val(meta3), path(reference)
+
+    output:
+        tuple val(meta), path("${meta.id}_flanks.tsv"), emit: flanks
+        path("versions.yml")                          , emit: versions
+
+    script:
+    def args   = task.ext.args ?: ''
+    def flank  = params.primer_length ?: 75
+    """
+    primer_flanks.py \\
+        --vcf ${vcf} \\
+        --variants ${variants} \\
+        --reference ${reference} \\
+        --flank ${flank} \\
+        --gc-min ${params.primer_gc_min} \\
+        --gc-max ${params.primer_gc_max} \\
+        --max-homopolymer ${params.primer_max_homopolymer} \\
+        --prefix ${meta.id} \\
+        ${args}
+
+    numpy_version=\$(python3 -c 'import numpy; print(numpy.__version__)')
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        numpy: \${numpy_version}
+    END_VERSIONS
+    """
+}
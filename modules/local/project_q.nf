@@ -0,0 +1,54 @@
+process PROJECT_Q {
+    tag "$meta.id"
+    label 'process_low'
+
+    container "docker.io/tkchafin/plotly:1.1"
+
+    input:
+        tuple val(meta), path(pfiles)
+        tuple val(meta2), path(qfiles)
+        tuple val(meta3), path(admix_map)
+        tuple val(meta4), path(ped)
+        tuple val(meta5), path(bestk_file)
+        tuple val(meta6), path(clumpp_pre)
+        tuple val(meta7), path(vcf)
+
+    output:
+        tuple val(meta7), path("projected_clumpp_indfile.out"), emit: clumpp
+        path "versions.yml", emit: versions
+
+    script:
+    def args = task.ext.args ?: ''
+    """
+    # Read best K
+    K=\$(cat ${bestk_file})
+
+    # ADMIXTURE .P/.Q for the best K (first replicate when several exist)
+    pfile=\$(ls *.P | grep -E "\\.\${K}(_[0-9]+)?\\.P\$" | sort -V | head -n 1)
+    if [ -z "\$pfile" ]; then
+        echo "❌ No .P file for K=\$K" >&2
+        exit 1
+    fi
+    qfile="\${pfile%.P}.Q"
+
+    project_q.py \\
+        --pfile \$pfile \\
+        --qfile \$qfile \\
+        --ped ${ped} \\
+        --map ${admix_map} \\
+        --vcf ${vcf} \\
+        --align ${clumpp_pre} \\
+        --outfile projected_clumpp_indfile.out \\
+        ${args}
+
+    numpy_version=\$(python3 -c 'import numpy; print(numpy.__version__)')
+    scipy_version=\$(python3 -c 'import scipy; print(scipy.__version__)')
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        project_q: 1.0
+        numpy: \${numpy_version}
+        scipy: \${scipy_version}
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,33 @@
+process COMPARE_CV {
+    tag "$meta.id"
+    label 'process_single'
+
+    container "docker.io/tkchafin/plotly:1.1"
+
+    input:
+        tuple val(meta), path(cv_subset, stageAs: 'subset/*')
+        tuple val(meta2), path(cv_full, stageAs: 'full/*')
+
+    output:
+        path("cv_subset_mqc.html"), emit: cv_html
+        path("cv_subset.tsv")     , emit: cv_tsv
+        path("versions.yml")      , emit: versions
+
+    script:
+    def args   = task.ext.args ?: ''
+    """
+    compare_cv.py \\
+        --subset ${cv_subset} \\
+        --full ${cv_full} \\
+        --template ${baseDir}/assets/multiqc_cv_subset.html \\
+        --prefix cv_subset \\
+        ${args}
+
+    plotly_version=\$(python3 -c 'import plotly; print(plotly.__version__)')
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        plotly: \${plotly_version}
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,54 @@
+process PANEL_CURVE {
+    tag "$meta.id"
+    label 'process_low'
+
+    container "docker.io/tkchafin/plotly:1.1"
+
+    input:
+        tuple val(meta), path(pfiles)
+        tuple val(meta2), path(qfiles)
+        tuple val(meta3), path(admix_map)
+        tuple val(meta4), path(bestk_file)
+        tuple val(meta5), path(vcf)
+        tuple val(meta6), path(top_loci)
+
+    output:
+        path("panel_curve_mqc.html"), emit: curve_html
+        path("panel_curve.tsv")     , emit: curve_tsv
+        path("versions.yml")        , emit: versions
+
+    script:
+    def args       = task.ext.args ?: ''
+    def candidates = params.max_candidates ?: 500
+    """
+    # Read best K
+    K=\$(cat ${bestk_file})
+
+    # ADMIXTURE .P/.Q for the best K (first replicate when several exist)
+    pfile=\$(ls *.P | grep -E "\\.\${K}(_[0-9]+)?\\.P\$" | sort -V | head -n 1)
+    if [ -z "\$pfile" ]; then
+        echo "❌ No .P file for K=\$K" >&2
+        exit 1
+    fi
+    qfile="\${pfile%.P}.Q"
+
+    panel_curve.py \\
+        --pfile \$pfile \\
+        --qfile \$qfile \\
+        --map ${admix_map} \\
+        --vcf ${vcf} \\
+        --top-loci ${top_loci} \\
+        --max-size ${candidates} \\
+        --threads ${task.cpus} \\
+        --template ${baseDir}/assets/multiqc_panel_curve.html \\
+        --prefix panel_curve \\
+        ${args}
+
+    plotly_version=\$(python3 -c 'import plotly; print(plotly.__version__)')
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        plotly: \${plotly_version}
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,56 @@
+process RENDER_REPORT {
+    label 'process_low'
+
+    container "docker.io/tkchafin/plotly:1.1"
+
+    input:
+        tuple val(meta),   path(cv_file)
+        tuple val(meta2),  path(vcf_pre,     stageAs: 'vcf_pre/*')
+        tuple val(meta3),  path(vcf_post,    stageAs: 'vcf_post/*')
+        tuple val(meta4),  path(snpio_pre,   stageAs: 'snpio_pre/*')
+        tuple val(meta5),  path(snpio_post,  stageAs: 'snpio_post/*')
+        tuple val(meta6),  path(clumpp_pre,  stageAs: 'pre.q')
+        tuple val(meta7),  path(clumpp_post, stageAs: 'post.q')
+        tuple val(meta8),  path(runs_pre,    stageAs: 'runs_pre/*')
+        tuple val(meta9),  path(runs_post,   stageAs: 'runs_post/*')
+        tuple val(meta10), path(inds,        stageAs: 'individuals.txt')
+        tuple val(meta11), path(pops,        stageAs: 'populations.txt')
+        tuple val(meta12), path(metrics)
+        tuple val(meta13), path(top_loci)
+
+    output:
+        path("*_mqc.html")  , emit: mqc_html
+        path("*_mqc.json")  , emit: mqc_json
+        path("versions.yml"), emit: versions
+
+    script:
+    def args = task.ext.args ?: ''
+    """
+    render_report.py \\
+        --cv ${cv_file} \\
+        --vcf-pre ${vcf_pre} \\
+        --vcf-post ${vcf_post} \\
+        --snpio-pre snpio_pre \\
+        --snpio-post snpio_post \\
+        --clumpp-pre pre.q \\
+        --clumpp-post post.q \\
+        --runs-pre runs_pre \\
+        --runs-post runs_post \\
+        --inds individuals.txt \\
+        --pops populations.txt \\
+        --metrics ${metrics} \\
+        --top-loci ${top_loci} \\
+        --assets ${baseDir}/assets \\
+        --threads ${task.cpus} \\
+        ${args}
+
+    plotly_version=\$(python3 -c 'import plotly; print(plotly.__version__)')
+    pandas_version=\$(python3 -c 'import pandas; print(pandas.__version__)')
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        plotly: \${plotly_version}
+        pandas: \${pandas_version}
+    END_VERSIONS
+    """
+}
@@ -0,0 +1,27 @@
+process SITE_INDEX {
+    tag "$meta.id"
+    label 'process_single'
+
+    conda "${moduleDir}/environment.yml"
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://community-cr-prod.seqera.io/docker/registry/v2/blobs/sha256/5a/5acacb55c52bec97c61fd34ffa8721fce82ce823005793592e2a80bf71632cd0/data' :
+        'community.wave.seqera.io/library/bcftools:1.21--4335bec1d7b44d11' }"
+
+    input:
+    tuple val(meta), path(vcf)
+
+    output:
+    tuple val(meta), path("${meta.id}.sites.tsv"), emit: sites
+    path "versions.yml", emit: versions
+
+    script:
+    """
+    # One line per VCF record, in file order: line i+1 is record index i
+    bcftools query -f '%CHROM\\t%POS\\n' ${vcf} > ${meta.id}.sites.tsv
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        bcftools: \$(bcftools --version 2>&1 | head -n1 | sed 's/^.*bcftools //; s/ .*\$//')
+    END_VERSIONS
+    """
+}
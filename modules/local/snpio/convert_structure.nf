@@ -8,9 +8,10 @@ process SNPIO_CONVERT_STRUCTURE {
     tuple val(meta), path(vcf)
     tuple val(meta2), path(tbi)
     tuple val(meta3), path(popmap)
+    tuple val(meta4), path(gstore)
 
     output:
-    tuple val(meta), path("*.labeled.stru"), emit: structure
+    tuple val(meta), path("*.labeled.stru{,.gz}"), emit: structure
     tuple val(meta), path("*_output"), emit: snpio_output
     path "versions.yml",     emit: versions
 
@@ -21,6 +22,7 @@ process SNPIO_CONVERT_STRUCTURE {
     snpio_convert_structure.py \\
         --vcf ${vcf} \\
         --popmap ${popmap} \\
+        --store ${gstore} \\
         ${args}
 
     cat <<-END_VERSIONS > versions.yml
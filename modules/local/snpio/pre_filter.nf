@@ -13,6 +13,7 @@ process SNPIO_PRE_FILTER {
     tuple val(meta), path("${meta.id}.filter.nremover.vcf.gz"), emit: filtered_vcf
     tuple val(meta), path("${meta.id}.filter.nremover.vcf.gz.tbi"), emit: filtered_tbi
     tuple val(meta), path("*_output"), emit: snpio_output
+    tuple val(meta), path("*.gstore"), emit: gstore
     path "versions.yml",     emit: versions
 
     script:
@@ -1,6 +1,6 @@
 process SUBSET_BY_INDEX {
     tag "$meta.id"
-    label 'process_medium'
+    label 'process_single'
 
     conda "${moduleDir}/environment.yml"
     container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
@@ -11,30 +11,73 @@ process SUBSET_BY_INDEX {
     tuple val(meta), path(vcf)
     tuple val(meta2), path(tbi)
     tuple val(meta3), path(top_loci)
+    tuple val(meta4), path(sites)
+    tuple val(meta5), path(flanks)
 
     output:
     tuple val(meta), path("${meta.id}.selected.vcf.gz"), emit: vcf
-    tuple val(meta), path("${meta.id}.selected.vcf.gz.tbi"), emit: tbi, optional: true
+    tuple val(meta), path("${meta.id}.selected.vcf.gz.tbi"), emit: tbi
+    tuple val(meta), path("${meta.id}.selected.flanks.tsv"), emit: flanks, optional: true
     path "versions.yml", emit: versions
 
     script:
+    def flanks_in = flanks ? "${flanks}" : ''
     """
-    echo "📋 Mapping VCF records to CHROM:POS..."
-    bcftools query -f '%CHROM\t%POS\\n' ${vcf} > all_sites.txt
+    echo "🧮 Mapping top_loci.txt indices to sites..."
+    # Index i (0-based VCF record) is line i+1 of the site index; stop
+    # reading it after the last selected record. wanted.txt keeps each
+    # selected record as CHROM, POS and its rank among the records at that
+    # position, so records sharing a position are told apart below.
+    : > wanted.txt
+    awk -F'\\t' -v OFS='\\t' '
+        NR == FNR { if (\$1 ~ /^[0-9]+\$/) { keep[\$1 + 1]; if (\$1 + 1 > last) last = \$1 + 1 }; next }
+        FNR > last { exit }
+        { k = \$1 ":" \$2; n = ++seen[k] }
+        FNR in keep {
+            print \$1, \$2, n > "wanted.txt"
+            if (!(k in listed)) { listed[k]; print \$1, \$2 }
+        }
+    ' ${top_loci} ${sites} > regions.txt
 
-    echo "🧮 Selecting top loci from top_loci.txt..."
-    awk 'NR==FNR{keep[\$1]; next} (FNR) in keep' ${top_loci} all_sites.txt > targets.txt
+    if [ -s regions.txt ]; then
+        echo "🔍 Extracting \$(wc -l < wanted.txt) records through the index..."
+        # --regions-overlap pos: only records whose POS is listed, not
+        # indels spanning it; the awk keeps the selected record(s) among
+        # those sharing a POS
+        bcftools view \\
+            --regions-file regions.txt \\
+            --regions-overlap pos \\
+            --output-type v \\
+            ${vcf} \\
+        | awk -F'\\t' '
+            NR == FNR { want[\$1 ":" \$2 ":" \$3]; next }
+            /^#/ { print; next }
+            { k = \$1 ":" \$2; n = ++seen[k] }
+            (k ":" n) in want
+        ' wanted.txt - \\
+        | bcftools view --output-type z --output ${meta.id}.selected.vcf.gz -
+    else
+        echo "⚠️  No loci selected; writing a header-only VCF"
+        bcftools view --header-only --output-type z --output ${meta.id}.selected.vcf.gz ${vcf}
+    fi
 
-    echo "🔍 Filtering VCF using bcftools view with targets..."
-    bcftools view \\
-        --targets-file targets.txt \\
-        --output-type z \\
-        --output ${meta.id}.selected.vcf.gz \\
-        --threads ${task.cpus} \\
-        ${vcf}
+    n_out=\$(bcftools view --no-header ${meta.id}.selected.vcf.gz | wc -l)
+    if [ "\$n_out" -ne "\$(wc -l < wanted.txt)" ]; then
+        echo "❌ Extracted \$n_out records, expected \$(wc -l < wanted.txt)" >&2
+        exit 1
+    fi
 
     echo "📦 Indexing selected VCF..."
-    bcftools index ${meta.id}.selected.vcf.gz
+    bcftools index --tbi ${meta.id}.selected.vcf.gz
+
+    # Flanks are only computed with --primer_filter
+    if [ -n "${flanks_in}" ]; then
+        echo "🧬 Extracting flanks of the selected records..."
+        awk -F'\\t' '
+            NR == FNR { if (\$1 ~ /^[0-9]+\$/) keep[\$1]; next }
+            FNR == 1 || (\$1 in keep)
+        ' ${top_loci} ${flanks_in} > ${meta.id}.selected.flanks.tsv
+    fi
 
     cat <<-END_VERSIONS > versions.yml
     "${task.process}":
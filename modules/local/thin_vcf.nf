@@ -0,0 +1,30 @@
+process THIN_VCF {
+    tag "$meta.id"
+    label 'process_single'
+
+    container "docker.io/tkchafin/plotly:1.1"
+
+    input:
+        tuple val(meta), path(vcf)
+
+    output:
+        tuple val(meta), path("${meta.id}_subset.vcf"), emit: vcf
+        path("versions.yml")                       , emit: versions
+
+    script:
+    def args   = task.ext.args ?: ''
+    """
+    thin_vcf.py \\
+        --vcf ${vcf} \\
+        --size ${params.bestk_subset} \\
+        --method ${params.bestk_subset_method} \\
+        --output ${meta.id}_subset.vcf \\
+        ${args}
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python3 --version | sed 's/Python //g')
+        numpy: \$(python3 -c 'import numpy; print(numpy.__version__)')
+    END_VERSIONS
+    """
+}
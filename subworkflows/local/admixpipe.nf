@@ -5,15 +5,20 @@
 include { TABIX_BGZIP } from '../../modules/nf-core/tabix/bgzip/main'
 include { TABIX_TABIX } from '../../modules/nf-core/tabix/tabix/main'
 include { ADMIXTUREPIPELINE } from '../../modules/local/admixpipe/admixturepipeline.nf'
+include { ADMIXTURE_PREP } from '../../modules/local/admixpipe/admixture_prep.nf'
+include { ADMIXTURE_RUN } from '../../modules/local/admixpipe/admixture_run.nf'
+include { ADMIXTURE_GATHER } from '../../modules/local/admixpipe/admixture_gather.nf'
 include { CLUMPAK } from '../../modules/local/admixpipe/submitclumpak.nf'
 include { CVSUM } from '../../modules/local/admixpipe/cvsum.nf'
 include { DISTRUCT } from '../../modules/local/admixpipe/distructrerun.nf'
+include { CLUMPP_ALIGN } from '../../modules/local/clumpp_align.nf'
 include { BESTK } from '../../modules/local/bestK.nf'
 
 workflow ADMIXPIPE {
     take:
     vcf         // [ val(meta), *.vcf or *.vcf.gz ]
     ch_popmap   // [ val(meta), popmap file ]
+    krange      // [ mink, maxk ] value channel: K values to run
 
     main:
     ch_versions = Channel.empty()
@@ -35,51 +40,127 @@ workflow ADMIXPIPE {
         | mix( ch_vcf_branch.vcf )
         | set { ch_vcf }
 
-    // Pass to ADMIXTURE pipeline
-    ADMIXTUREPIPELINE(
-        ch_vcf,
-        ch_popmap
-    )
-    ch_versions = ch_versions.mix( ADMIXTUREPIPELINE.out.versions )
+    if (params.admixture_scatter) {
+        // Convert once and run K=1, then one task per (K, replicate)
+        ADMIXTURE_PREP(
+            ch_vcf,
+            ch_popmap
+        )
+        ch_versions = ch_versions.mix( ADMIXTURE_PREP.out.versions )
 
-    // Run CLUMPAK
-    CLUMPAK(
-        ADMIXTUREPIPELINE.out.results,
-        ADMIXTUREPIPELINE.out.inds,
-        ADMIXTUREPIPELINE.out.pops
-    )
-    ch_versions = ch_versions.mix( CLUMPAK.out.versions )
-
-    // Run Distruct
-    DISTRUCT(
-        ADMIXTUREPIPELINE.out.pfiles,
-        ADMIXTUREPIPELINE.out.qfiles,
-        ADMIXTUREPIPELINE.out.pops,
-        ADMIXTUREPIPELINE.out.inds,
-        ADMIXTUREPIPELINE.out.logs,
-        CLUMPAK.out.output
-    )
+        ch_k = krange.flatMap { mink, maxk -> mink <= maxk ? (Math.max(mink, 2)..maxk).toList() : [] }
+        ADMIXTURE_PREP.out.bed
+            | combine( ch_k )
+            | combine( Channel.fromList( (1..params.admixture_reps).toList() ) )
+            | ADMIXTURE_RUN
+        ch_versions = ch_versions.mix( ADMIXTURE_RUN.out.versions.first() )
 
-    // Compute best K from crossval
-    CVSUM(
-        DISTRUCT.out.cv,
-        DISTRUCT.out.loglik
-    )
-    ch_versions = ch_versions.mix( CVSUM.out.versions )
+        // Gather the runs into AdmixPipe's output layout
+        ADMIXTURE_RUN.out.runs
+            | groupTuple
+            | map { meta, files -> [ meta, files.flatten() ] }
+            | set { ch_runs }
+
+        ADMIXTURE_PREP.out.results
+            | join( ADMIXTURE_PREP.out.qfiles )
+            | join( ADMIXTURE_PREP.out.pfiles )
+            | join( ADMIXTURE_PREP.out.logs )
+            | map { meta, results, qfiles, pfiles, logs -> [ meta, results, [ qfiles, pfiles, logs ].flatten() ] }
+            | set { ch_prep }
+
+        ADMIXTURE_GATHER(
+            ch_prep,
+            ch_runs
+        )
+        ch_versions = ch_versions.mix( ADMIXTURE_GATHER.out.versions )
+
+        ch_results = ADMIXTURE_GATHER.out.results
+        ch_logs    = ADMIXTURE_GATHER.out.logs
+        ch_qfiles  = ADMIXTURE_GATHER.out.qfiles
+        ch_pfiles  = ADMIXTURE_GATHER.out.pfiles
+        ch_pops    = ADMIXTURE_PREP.out.pops
+        ch_inds    = ADMIXTURE_PREP.out.inds
+        ch_map     = ADMIXTURE_PREP.out.map
+        ch_ped     = ADMIXTURE_PREP.out.ped
+    } else {
+        // Pass to ADMIXTURE pipeline
+        ADMIXTUREPIPELINE(
+            ch_vcf,
+            ch_popmap,
+            krange
+        )
+        ch_versions = ch_versions.mix( ADMIXTUREPIPELINE.out.versions )
+
+        ch_results = ADMIXTUREPIPELINE.out.results
+        ch_logs    = ADMIXTUREPIPELINE.out.logs
+        ch_qfiles  = ADMIXTUREPIPELINE.out.qfiles
+        ch_pfiles  = ADMIXTUREPIPELINE.out.pfiles
+        ch_pops    = ADMIXTUREPIPELINE.out.pops
+        ch_inds    = ADMIXTUREPIPELINE.out.inds
+        ch_map     = ADMIXTUREPIPELINE.out.map
+        ch_ped     = ADMIXTUREPIPELINE.out.ped
+    }
+
+    if (params.clumpp_engine == 'python') {
+        // Align replicates, pick the major mode of each K and summarise
+        // CV error in one process (no CLUMPAK, CLUMPP or distruct)
+        CLUMPP_ALIGN(
+            ch_qfiles,
+            ch_logs,
+            ch_pops
+        )
+        ch_versions = ch_versions.mix( CLUMPP_ALIGN.out.versions )
+
+        ch_best_results = CLUMPP_ALIGN.out.best_results
+        ch_cv_output    = CLUMPP_ALIGN.out.cv_output
+    } else {
+        // Run CLUMPAK
+        CLUMPAK(
+            ch_results,
+            ch_inds,
+            ch_pops
+        )
+        ch_versions = ch_versions.mix( CLUMPAK.out.versions )
+
+        // Run Distruct
+        DISTRUCT(
+            ch_pfiles,
+            ch_qfiles,
+            ch_pops,
+            ch_inds,
+            ch_logs,
+            CLUMPAK.out.output,
+            krange
+        )
+
+        // Compute best K from crossval
+        CVSUM(
+            DISTRUCT.out.cv,
+            DISTRUCT.out.loglik
+        )
+        ch_versions = ch_versions.mix( CVSUM.out.versions )
+
+        ch_best_results = DISTRUCT.out.best_results
+        ch_cv_output    = CVSUM.out.cv_output
+    }
 
     // Fetch results for the best K value
     BESTK(
-        CVSUM.out.cv_output,
-        DISTRUCT.out.best_results
+        ch_cv_output,
+        ch_best_results
     )
     ch_versions = ch_versions.mix( BESTK.out.versions )
 
     emit:
-    best_results = DISTRUCT.out.best_results
+    best_results = ch_best_results
     bestK        = BESTK.out.bestK_file
     bestK_clumpp = BESTK.out.bestK_clumpp
-    inds         = ADMIXTUREPIPELINE.out.inds
-    pops         = ADMIXTUREPIPELINE.out.pops
-    cv_file      = CVSUM.out.cv_output
+    inds         = ch_inds
+    pops         = ch_pops
+    pfiles       = ch_pfiles
+    qfiles       = ch_qfiles
+    admix_map    = ch_map
+    ped          = ch_ped
+    cv_file      = ch_cv_output
     versions     = ch_versions
 }
@@ -5,6 +5,7 @@ include { INFER_POPULATIONS } from '../../modules/local/infer_populations.nf'
 include { SNPIO_CONVERT_STRUCTURE } from '../../modules/local/snpio/convert_structure.nf'
 include { INFOCALC } from '../../modules/local/infocalc.nf'
 include { RANK_LOCI } from '../../modules/local/rank_loci.nf'
+include { PANEL_OPTIMIZER } from '../../modules/local/panel_optimizer.nf'
 include { SUBSET_BY_INDEX } from '../../modules/local/subset_by_index.nf'
 
 
@@ -15,6 +16,12 @@ workflow SELECT_CANDIDATES {
     inds        // [ val(meta), *.inds ]
     clumppfile  // [ val(meta), best_clumpp_indfile.out ]
     bestk       // [ val(meta), bestK.txt ]
+    pfiles      // [ val(meta), *.P ]
+    qfiles      // [ val(meta), *.Q ]
+    admix_map   // [ val(meta), *.map ]
+    gstore      // [ val(meta), *.gstore ]
+    sites       // [ val(meta), *.sites.tsv ] CHROM/POS of each vcf record
+    flanks      // [ val(meta), *_flanks.tsv ] reference flanks and primer metrics of each vcf record ([] without --primer_filter)
 
     main:
     ch_versions = Channel.empty()
@@ -26,10 +33,12 @@ workflow SELECT_CANDIDATES {
 
     // Convert subsetted VCF to Structure format
     // and subset VCF to samples used for ADMIXTURE
+    // (genotypes are read from the SNPIO_FILTER genotype store)
     SNPIO_CONVERT_STRUCTURE(
         vcf,
         tbi,
-        INFER_POPULATIONS.out.popmap
+        INFER_POPULATIONS.out.popmap,
+        gstore
     )
     ch_versions = ch_versions.mix( SNPIO_CONVERT_STRUCTURE.out.versions )
 
@@ -41,23 +50,44 @@ workflow SELECT_CANDIDATES {
     ch_versions = ch_versions.mix( INFOCALC.out.versions )
 
     // Get indices for top loci
-    RANK_LOCI(
-        INFOCALC.out.metrics
-    )
-    ch_versions = ch_versions.mix( INFOCALC.out.versions )
+    if ( params.panel_method == 'greedy' ) {
+        // Greedy multi-locus selection (Rosenberg 2005) on the best-K .P/.Q
+        PANEL_OPTIMIZER(
+            pfiles,
+            qfiles,
+            admix_map,
+            vcf,
+            bestk
+        )
+        ch_versions = ch_versions.mix( PANEL_OPTIMIZER.out.versions )
+        ch_top_loci = PANEL_OPTIMIZER.out.top_loci
+    } else {
+        RANK_LOCI(
+            INFOCALC.out.metrics,
+            sites,
+            gstore,
+            flanks
+        )
+        ch_versions = ch_versions.mix( RANK_LOCI.out.versions )
+        ch_top_loci = RANK_LOCI.out.top_loci
+    }
 
     // Subset selected loci and output new VCF
     SUBSET_BY_INDEX(
         vcf,
         tbi,
-        RANK_LOCI.out.top_loci
+        ch_top_loci,
+        sites,
+        flanks
     )
+    ch_versions = ch_versions.mix( SUBSET_BY_INDEX.out.versions )
 
     emit:
     vcf          = SUBSET_BY_INDEX.out.vcf
     tbi          = SUBSET_BY_INDEX.out.tbi
+    flanks       = SUBSET_BY_INDEX.out.flanks
     snpio_output = SNPIO_CONVERT_STRUCTURE.out.snpio_output
     metrics      = INFOCALC.out.metrics
-    top_loci     = RANK_LOCI.out.top_loci
+    top_loci     = ch_top_loci
     versions     = ch_versions
 }
@@ -118,8 +118,7 @@ workflow PIPELINE_INITIALISATION {
     //
     // Prepare reference
     //
-    Channel
-        .fromPath(reference)
+    (reference ? Channel.fromPath(reference) : Channel.empty())
         .map { file ->
             def meta = [id: file.simpleName]
             return [meta, file]
@@ -208,6 +207,94 @@ def validateInputParameters() {
     if (!(params.ranking_metric in valid_metrics)) {
         log.error "Invalid value for --ranking_metric: '${params.ranking_metric}'. Must be one of: ${valid_metrics.join(', ')}"
     }
+
+    // Validate the composite ranking weights and spacing
+    if (params.ranking_weights) {
+        params.ranking_weights.toString().tokenize(',').each { item ->
+            def (name, weight) = item.tokenize('=') + [null]
+            if (!(name in valid_metrics) || !weight || !(weight ==~ /[0-9.eE+-]+/)) {
+                log.error "Invalid entry in --ranking_weights: '${item}'. Use metric=weight with metric one of: ${valid_metrics.join(', ')}"
+            }
+        }
+    }
+    if (!(params.min_spacing instanceof Integer) || params.min_spacing < 0) {
+        log.error "Invalid value for --min_spacing: '${params.min_spacing}'. It must be a non-negative integer."
+    }
+    if (params.max_r2 != null && (!(params.max_r2 instanceof Number) || params.max_r2 < 0 || params.max_r2 > 1)) {
+        log.error "Invalid value for --max_r2: '${params.max_r2}'. It must be a number between 0 and 1."
+    }
+
+    // Validate the primer-suitability checks
+    if (!(params.primer_gc_min instanceof Number) || !(params.primer_gc_max instanceof Number) ||
+        params.primer_gc_min < 0 || params.primer_gc_max > 1 || params.primer_gc_min > params.primer_gc_max) {
+        log.error "Invalid values for --primer_gc_min/--primer_gc_max: '${params.primer_gc_min}'/'${params.primer_gc_max}'. They must be fractions with primer_gc_min ≤ primer_gc_max."
+    }
+    if (!(params.primer_max_homopolymer instanceof Integer) || params.primer_max_homopolymer < 1) {
+        log.error "Invalid value for --primer_max_homopolymer: '${params.primer_max_homopolymer}'. It must be a positive integer."
+    }
+
+    // Validate panel selection method and objective
+    def valid_methods = ['rank', 'greedy']
+    if (!(params.panel_method in valid_methods)) {
+        log.error "Invalid value for --panel_method: '${params.panel_method}'. Must be one of: ${valid_methods.join(', ')}"
+    }
+    def valid_objectives = ['orca', 'accuracy']
+    if (!(params.panel_objective in valid_objectives)) {
+        log.error "Invalid value for --panel_objective: '${params.panel_objective}'. Must be one of: ${valid_objectives.join(', ')}"
+    }
+    def valid_validations = ['admixture', 'projection']
+    if (!(params.panel_validation in valid_validations)) {
+        log.error "Invalid value for --panel_validation: '${params.panel_validation}'. Must be one of: ${valid_validations.join(', ')}"
+    }
+
+    // The primer filter takes its flanks from the reference
+    if (params.primer_filter && !params.reference) {
+        log.error "--primer_filter requires --reference (a .fasta, or .loci/.loci.gz for denovo RADseq)."
+    }
+
+    // Validate the two-phase best-K settings
+    if (!(params.bestk_subset instanceof Integer) || params.bestk_subset < 0) {
+        log.error "Invalid value for --bestk_subset: '${params.bestk_subset}'. It must be a non-negative integer (0 = off)."
+    }
+    def valid_subset_methods = ['random', 'thin']
+    if (!(params.bestk_subset_method in valid_subset_methods)) {
+        log.error "Invalid value for --bestk_subset_method: '${params.bestk_subset_method}'. Must be one of: ${valid_subset_methods.join(', ')}"
+    }
+
+    // Validate the LD pruning settings
+    if (params.ld_prune) {
+        if (!(params.ld_window instanceof Integer) || params.ld_window < 2) {
+            log.error "Invalid value for --ld_window: '${params.ld_window}'. It must be an integer of at least 2."
+        }
+        if (!(params.ld_step instanceof Integer) || params.ld_step < 1) {
+            log.error "Invalid value for --ld_step: '${params.ld_step}'. It must be a positive integer."
+        }
+        if (!(params.ld_r2 instanceof Number) || params.ld_r2 < 0 || params.ld_r2 > 1) {
+            log.error "Invalid value for --ld_r2: '${params.ld_r2}'. It must be a number between 0 and 1."
+        }
+    }
+
+    // Validate the ADMIXTURE scatter settings
+    if (params.admixture_scatter) {
+        if (!(params.admixture_reps instanceof Integer) || params.admixture_reps < 1) {
+            log.error "Invalid value for --admixture_reps: '${params.admixture_reps}'. It must be a positive integer."
+        }
+        if (!(params.admixture_cv instanceof Integer) || params.admixture_cv < 2) {
+            log.error "Invalid value for --admixture_cv: '${params.admixture_cv}'. It must be an integer of at least 2."
+        }
+        if (params.maxk instanceof Integer && params.maxk < 2) {
+            log.error "Invalid value for --maxk: '${params.maxk}'. --admixture_scatter needs a maxk of at least 2."
+        }
+    }
+
+    // Validate the replicate alignment engine
+    def valid_engines = ['clumpak', 'python']
+    if (!(params.clumpp_engine in valid_engines)) {
+        log.error "Invalid value for --clumpp_engine: '${params.clumpp_engine}'. Must be one of: ${valid_engines.join(', ')}"
+    }
+    if (!(params.clumpp_threshold instanceof Number) || params.clumpp_threshold < 0 || params.clumpp_threshold > 1) {
+        log.error "Invalid value for --clumpp_threshold: '${params.clumpp_threshold}'. It must be a number between 0 and 1."
+    }
 }
 //
 // Generate methods description for MultiQC
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Equivalence of `infocalc.py --stru` with Rosenberg's `bin/infocalc.pl`.
+
+`tests/infocalc/fixture.stru` is a small STRUCTURE file in the Perl
+script's layout (five label columns, population name in column 3, -9 for
+missing data): three populations of six individuals and 14 loci, with two
+monomorphic loci (L00, L01), a fixed difference (L02), a private allele
+(L03), biallelic loci (L04–L06), multi‑allelic loci with missing data
+(L07–L13) and a locus never observed in one population (L13).
+
+The expected tables were written by the Perl script:
+
+    perl bin/infocalc.pl -column 3 -numpops 3 -input fixture.stru \\
+        -output fixture.infocalc_pl.txt
+    perl bin/infocalc.pl -column 3 -numpops 3 -input fixture.stru \\
+        -output fixture.weighted.infocalc_pl.txt -weightfile fixture.weights
+
+I_n and both ORCA columns must agree to the printed precision (%10g).
+I_a is compared where Perl computes it. Where Perl prints −9999 (or a
+value within a few units of it), its eq. 14 evaluation hit a zero
+denominator — every monomorphic locus, and loci with repeated population
+frequencies. There `infocalc.py` is compared with `exact_Ia`, the same
+eq. 14 sum evaluated in 120‑digit decimal arithmetic with tied
+frequencies split by 1e-30. With a weightfile both print NA.
+
+    python -m pytest tests/test_infocalc_stru.py
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from decimal import Decimal, localcontext
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(HERE, "infocalc")
+INFOCALC = os.path.join(HERE, "..", "bin", "infocalc.py")
+RTOL = 1e-5  # %10g prints six significant digits
+BAD = -9999.0  # infocalc.pl's zero-denominator marker
+
+
+def read_table(path):
+    """Locus → (I_n, I_a or None, ORCA1, ORCA2), in file order."""
+    rows = {}
+    with open(path) as fh:
+        next(fh)
+        for line in fh:
+            fields = line.split()
+            if not fields or fields[0] in ("Command:", "PriorWeights:"):
+                break
+            name, I_n, I_a, orca1, orca2 = fields
+            rows[name] = (
+                float(I_n),
+                None if I_a == "NA" else float(I_a),
+                float(orca1),
+                float(orca2),
+            )
+    return rows
+
+
+def read_frequencies(path, label_cols=5, column=3):
+    """Locus → {allele: [relative frequency in each population]}."""
+    with open(path) as fh:
+        loci = fh.readline().split()
+        rows = [line.split() for line in fh if line.strip()]
+    pops = sorted({row[column - 1] for row in rows})
+    counts = [defaultdict(lambda: defaultdict(int)) for _ in loci]
+    for row in rows:
+        for locus, allele in enumerate(row[label_cols:]):
+            if allele != "-9":
+                counts[locus][allele][row[column - 1]] += 1
+    freqs = {}
+    for name, alleles in zip(loci, counts):
+        size = {p: sum(a[p] for a in alleles.values()) for p in pops}
+        freqs[name] = {
+            allele: [Decimal(n[p]) / size[p] if size[p] else Decimal(0) for p in pops]
+            for allele, n in alleles.items()
+        }
+    return freqs
+
+
+def exact_Ia(freqs, eps=Decimal("1e-30")):
+    """
+    Rosenberg's eq. 14 as infocalc.pl evaluates it, in 120‑digit decimals:
+    sum over alleles of p̄(1 − ln p̄ − H_K) + Σ_i φ(p_i) / (K Π_k≠i (p_i − p_k)),
+    φ(x) = x^K ln x. Node i is shifted by i·eps so tied frequencies have a
+    nonzero denominator; the divided difference moves by O(eps).
+    """
+    with localcontext() as ctx:
+        ctx.prec = 120
+        total = Decimal(0)
+        for p in freqs.values():
+            K = len(p)
+            H_K = sum(Decimal(1) / i for i in range(1, K + 1))
+            pbar = sum(p) / K
+            total += pbar * (1 - pbar.ln() - H_K)
+            x = [pi + i * eps for i, pi in enumerate(p)]
+            for i, xi in enumerate(x):
+                if xi == 0:
+                    continue
+                denom = K
+                for k, xk in enumerate(x):
+                    if k != i:
+                        denom *= xi - xk
+                total += xi**K * xi.ln() / denom
+        return float(total)
+
+
+def run_infocalc(tmp_path, *extra):
+    out = tmp_path / "locus_metrics.txt"
+    subprocess.run(
+        [
+            sys.executable, INFOCALC,
+            "--stru", os.path.join(DATA, "fixture.stru"),
+            "--column", "3", "--label-cols", "5", "--numpops", "3",
+            "--outfile", str(out), *extra,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return read_table(out)
+
+
+def close(a, b):
+    return abs(a - b) <= RTOL * max(abs(a), abs(b)) + 1e-9
+
+
+@pytest.mark.parametrize(
+    "expected, extra",
+    [
+        ("fixture.infocalc_pl.txt", ()),
+        (
+            "fixture.weighted.infocalc_pl.txt",
+            ("--weightfile", os.path.join(DATA, "fixture.weights")),
+        ),
+    ],
+)
+def test_matches_infocalc_pl(tmp_path, expected, extra):
+    perl = read_table(os.path.join(DATA, expected))
+    py = run_infocalc(tmp_path, *extra)
+    freqs = read_frequencies(os.path.join(DATA, "fixture.stru"))
+
+    assert list(py) == list(perl)
+    for locus, (In_pl, Ia_pl, o1_pl, o2_pl) in perl.items():
+        In, Ia, o1, o2 = py[locus]
+        assert close(In, In_pl), (locus, "I_n", In, In_pl)
+        assert close(o1, o1_pl), (locus, "ORCA[1-allele]", o1, o1_pl)
+        assert close(o2, o2_pl), (locus, "ORCA[2-allele]", o2, o2_pl)
+        if Ia_pl is None:
+            assert Ia is None, (locus, "I_a", Ia)
+        elif abs(Ia_pl - BAD) < 10:
+            # Perl's -9999: infocalc.py gives the real value instead
+            ref = exact_Ia(freqs[locus])
+            assert close(Ia, ref), (locus, "I_a", Ia, ref)
+        else:
+            assert close(Ia, Ia_pl), (locus, "I_a", Ia, Ia_pl)
+
+
+def test_exact_Ia_matches_infocalc_pl():
+    """The decimal reference agrees with Perl wherever Perl computes I_a."""
+    perl = read_table(os.path.join(DATA, "fixture.infocalc_pl.txt"))
+    freqs = read_frequencies(os.path.join(DATA, "fixture.stru"))
+    checked = 0
+    for locus, (_, Ia_pl, _, _) in perl.items():
+        if abs(Ia_pl - BAD) >= 10:
+            ref = exact_Ia(freqs[locus])
+            assert close(ref, Ia_pl), (locus, "I_a", ref, Ia_pl)
+            checked += 1
+    assert checked
+
+
+def test_monomorphic_loci_are_zero(tmp_path):
+    py = run_infocalc(tmp_path)
+    for locus in ("L00", "L01"):
+        assert py[locus][:2] == (0.0, 0.0)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -11,12 +11,19 @@ include { softwareVersionsToYAML } from '../subworkflows/nf-core/utils_nfcore_pi
 include { methodsDescriptionText } from '../subworkflows/local/utils_nfcore_acamel-gtseqdesign_pipeline/main.nf'
 include { ADMIXPIPE as ADMIXPIPE_PRE } from '../subworkflows/local/admixpipe.nf'
 include { ADMIXPIPE as ADMIXPIPE_POST } from '../subworkflows/local/admixpipe.nf'
+include { ADMIXPIPE as ADMIXPIPE_SWEEP } from '../subworkflows/local/admixpipe.nf'
+include { THIN_VCF } from '../modules/local/thin_vcf.nf'
+include { LD_PRUNE } from '../modules/local/ld_prune.nf'
+include { SITE_INDEX } from '../modules/local/site_index.nf'
+include { PRIMER_FLANKS } from '../modules/local/primer_flanks.nf'
+include { COMPARE_CV } from '../modules/local/report/compare_cv.nf'
 include { SELECT_CANDIDATES } from '../subworkflows/local/select_candidates.nf'
 include { GENERATE_REPORT } from '../subworkflows/local/generate_report.nf'
 include { SNPIO_PRE_FILTER as SNPIO_FILTER } from '../modules/local/snpio/pre_filter.nf'
 include { LIST_CHROMS } from '../modules/local/list_chroms.nf'
 include { GENERATE_CONSENSUS } from '../modules/local/generate_consensus.nf'
 include { FILTER_POSITIONS } from '../modules/local/filter_positions.nf'
+include { PROJECT_Q } from '../modules/local/project_q.nf'
 include { CUSTOMIZE_REPORT } from '../modules/local/report/customize_report.nf'
 
 /*
@@ -43,7 +50,7 @@ workflow ACAMEL_GTSEQDESIGN {
     //
     ch_reference
         .branch {
-            loci: it[1].name.endsWith('.loci')
+            loci: it[1].name.endsWith('.loci') || it[1].name.endsWith('.loci.gz')
             fasta: true
         }
         .set { ch_ref_to_process }
@@ -66,16 +73,71 @@ workflow ACAMEL_GTSEQDESIGN {
     ch_filtered_vcf = SNPIO_FILTER.out.filtered_vcf.map { meta, file -> tuple(meta + [id: "${meta.id}_filtered"], file) }
     ch_filtered_tbi = SNPIO_FILTER.out.filtered_tbi.map { meta, file -> tuple(meta + [id: "${meta.id}_filtered"], file) }
     ch_snpio_output = SNPIO_FILTER.out.snpio_output.map { meta, dir -> tuple(meta + [id: "${meta.id}_filtered"], dir) }
+    ch_gstore = SNPIO_FILTER.out.gstore.map { meta, dir -> tuple(meta + [id: "${meta.id}_filtered"], dir) }
+
+    //
+    // Optional LD pruning of the loci passed to ADMIXTURE; candidate
+    // selection still uses every filtered locus
+    //
+    if ( params.ld_prune ) {
+        LD_PRUNE(
+            ch_filtered_vcf,
+            ch_gstore
+        )
+        ch_versions = ch_versions.mix(LD_PRUNE.out.versions)
+        ch_admix_vcf = LD_PRUNE.out.vcf.map { meta, file -> tuple(meta + [id: "${meta.id}_pruned"], file) }
+    } else {
+        ch_admix_vcf = ch_filtered_vcf
+    }
 
     //
     // Run admixture pipeline on full (filtered) dataset
     //
+    // With --bestk_subset the K sweep runs on a subset of loci first, and
+    // only the chosen K (and K±1 with --bestk_neighbors) runs on all loci
+    ch_krange_all = Channel.value( [ 1, params.maxk ] )
+    if ( params.bestk_subset ) {
+        THIN_VCF( ch_admix_vcf )
+        ch_versions = ch_versions.mix(THIN_VCF.out.versions)
+        ch_subset_vcf = THIN_VCF.out.vcf.map { meta, file -> tuple(meta + [id: "${meta.id}_subset"], file) }
+
+        ADMIXPIPE_SWEEP(
+            ch_subset_vcf,
+            ch_popmap,
+            ch_krange_all
+        )
+        ch_versions = ch_versions.mix(ADMIXPIPE_SWEEP.out.versions)
+
+        ch_krange_pre = ADMIXPIPE_SWEEP.out.bestK
+            .map { meta, file ->
+                def k = file.text.trim() as Integer
+                params.bestk_neighbors ? [ Math.max(k - 1, 1), Math.min(k + 1, params.maxk) ] : [ k, k ]
+            }
+            .first()
+    } else {
+        ch_krange_pre = ch_krange_all
+    }
+
     ADMIXPIPE_PRE(
-        ch_filtered_vcf,
-        ch_popmap
+        ch_admix_vcf,
+        ch_popmap,
+        ch_krange_pre
     )
     ch_versions = ch_versions.mix(ADMIXPIPE_PRE.out.versions)
 
+    // CV error of the K sweep on the subset vs the runs on all loci
+    if ( params.bestk_subset ) {
+        COMPARE_CV(
+            ADMIXPIPE_SWEEP.out.cv_file,
+            ADMIXPIPE_PRE.out.cv_file
+        )
+        ch_versions = ch_versions.mix(COMPARE_CV.out.versions)
+        ch_multiqc_files = ch_multiqc_files.mix(COMPARE_CV.out.cv_html)
+        ch_cv_file = ADMIXPIPE_SWEEP.out.cv_file
+    } else {
+        ch_cv_file = ADMIXPIPE_PRE.out.cv_file
+    }
+
     //
     // Denovo assembly handling
     //
@@ -102,6 +164,26 @@ workflow ACAMEL_GTSEQDESIGN {
         ch_candidates_tbi = ch_filtered_tbi
     }
 
+    // Site index of the candidate VCF (record index -> CHROM/POS), built once
+    SITE_INDEX( ch_candidates )
+    ch_versions = ch_versions.mix(SITE_INDEX.out.versions)
+
+    //
+    // Reference flanks of every candidate (nearby input variants masked)
+    // and primer suitability, used by the ranking with --primer_filter
+    //
+    if ( params.primer_filter ) {
+        PRIMER_FLANKS(
+            ch_candidates,
+            ch_vcf,
+            ch_ref_ready
+        )
+        ch_versions = ch_versions.mix(PRIMER_FLANKS.out.versions)
+        ch_flanks = PRIMER_FLANKS.out.flanks
+    } else {
+        ch_flanks = Channel.value([[id: 'no_flanks'], []])
+    }
+
     //
     // Compute locus-wise importance metrics
     //
@@ -110,7 +192,13 @@ workflow ACAMEL_GTSEQDESIGN {
         ch_candidates_tbi,
         ADMIXPIPE_PRE.out.inds,
         ADMIXPIPE_PRE.out.bestK_clumpp,
-        ADMIXPIPE_PRE.out.bestK
+        ADMIXPIPE_PRE.out.bestK,
+        ADMIXPIPE_PRE.out.pfiles,
+        ADMIXPIPE_PRE.out.qfiles,
+        ADMIXPIPE_PRE.out.admix_map,
+        ch_gstore,
+        SITE_INDEX.out.sites,
+        ch_flanks
     )
     ch_versions = ch_versions.mix(SELECT_CANDIDATES.out.versions)
     ch_selected_vcf = SELECT_CANDIDATES.out.vcf.map { meta, file -> tuple(meta + [id: meta.id.replaceFirst(/_filtered$/, '_selected')], file) }
@@ -118,13 +206,37 @@ workflow ACAMEL_GTSEQDESIGN {
     ch_selected_snpio_output = SELECT_CANDIDATES.out.snpio_output.map { meta, dir -> tuple(meta + [id: meta.id.replaceFirst(/_filtered$/, '_selected')], dir) }
 
     //
-    // Run admixture pipeline on selected candidates
+    // Validate the selected panel: either re-run the admixture pipeline on
+    // the selected candidates, or project samples onto the pre-selection
+    // ADMIXTURE solution restricted to the panel loci
     //
-    ADMIXPIPE_POST(
-        ch_selected_vcf,
-        ch_popmap
-    )
-    ch_versions = ch_versions.mix(ADMIXPIPE_POST.out.versions)
+    if ( params.panel_validation == 'projection' ) {
+        PROJECT_Q(
+            ADMIXPIPE_PRE.out.pfiles,
+            ADMIXPIPE_PRE.out.qfiles,
+            ADMIXPIPE_PRE.out.admix_map,
+            ADMIXPIPE_PRE.out.ped,
+            ADMIXPIPE_PRE.out.bestK,
+            ADMIXPIPE_PRE.out.bestK_clumpp,
+            ch_selected_vcf
+        )
+        ch_versions = ch_versions.mix(PROJECT_Q.out.versions)
+        ch_post_clumpp = PROJECT_Q.out.clumpp
+        ch_post_runs   = PROJECT_Q.out.clumpp
+        ch_post_inds   = ADMIXPIPE_PRE.out.inds
+        ch_post_pops   = ADMIXPIPE_PRE.out.pops
+    } else {
+        ADMIXPIPE_POST(
+            ch_selected_vcf,
+            ch_popmap,
+            ch_krange_all
+        )
+        ch_versions = ch_versions.mix(ADMIXPIPE_POST.out.versions)
+        ch_post_clumpp = ADMIXPIPE_POST.out.bestK_clumpp
+        ch_post_runs   = ADMIXPIPE_POST.out.best_results
+        ch_post_inds   = ADMIXPIPE_POST.out.inds
+        ch_post_pops   = ADMIXPIPE_POST.out.pops
+    }
 
     //
     // Generate figures for the report
@@ -136,15 +248,22 @@ workflow ACAMEL_GTSEQDESIGN {
         ch_filtered_tbi,
         ch_selected_vcf,
         ch_selected_tbi,
-        ADMIXPIPE_PRE.out.cv_file,
+        ch_cv_file,
         ch_snpio_output,
         ch_selected_snpio_output,
         ADMIXPIPE_PRE.out.bestK_clumpp,
-        ADMIXPIPE_POST.out.bestK_clumpp,
-        ADMIXPIPE_POST.out.inds,
-        ADMIXPIPE_POST.out.pops,
+        ch_post_clumpp,
+        ADMIXPIPE_PRE.out.best_results,
+        ch_post_runs,
+        ch_post_inds,
+        ch_post_pops,
         SELECT_CANDIDATES.out.metrics,
-        SELECT_CANDIDATES.out.top_loci
+        SELECT_CANDIDATES.out.top_loci,
+        ch_candidates,
+        ADMIXPIPE_PRE.out.pfiles,
+        ADMIXPIPE_PRE.out.qfiles,
+        ADMIXPIPE_PRE.out.admix_map,
+        ADMIXPIPE_PRE.out.bestK
     )
     ch_versions = ch_versions.mix( GENERATE_REPORT.out.versions )
     ch_multiqc_files = ch_multiqc_files.mix( GENERATE_REPORT.out.mqc_files )